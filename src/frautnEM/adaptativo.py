@@ -0,0 +1,240 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Muestreo adaptativo (quadtree) del potencial en un plano, para graficar
+equipotenciales.
+
+Se parte de una grilla gruesa y se subdivide cada celda en cuatro solo si
+está cerca de una carga, si tiene valores no finitos o si la cruza alguno
+de los niveles a graficar. Las celdas que llegan al paso fino tienen sus
+cuatro vértices evaluados, de modo que las equipotenciales que pasan por
+ellas son las mismas que con la grilla fina completa; el resto de la
+grilla se completa interpolando (bilinealmente) los vértices de cada celda
+sin subdividir, por donde no pasa ningún nivel.
+"""
+
+import math
+
+import numpy as np
+
+
+# Celdas por eje, aproximadamente, de la grilla inicial.
+CELDAS = 16
+
+# Se refinan las celdas a menos de CERCA diagonales de una carga.
+CERCA = 2.0
+
+# Con menos puntos por eje se evalúa la grilla completa: el quadtree termina
+# evaluando buena parte de ella y su recorrido cuesta más de lo que ahorra.
+MINIMO = 300
+
+# Pares (celda, carga) por bloque al buscar cargas cercanas.
+_PARES = 2**20
+
+# Pasos de los niveles (por una potencia de diez), como MaxNLocator.
+_PASOS = np.array([0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.6, 0.8, 1, 1.5, 2, 2.5, 3, 4, 5, 6, 8, 10, 15])
+
+
+def niveles(n, vmin, vmax):
+    """
+    Los niveles que elige contour(..., levels=n) para datos entre vmin y vmax.
+
+    Es el algoritmo de matplotlib (MaxNLocator(n + 1) y el recorte de
+    ContourSet._autolev) hecho con NumPy, para no importar matplotlib al
+    calcular: el paso es el menor de 1, 1.5, 2, 2.5, 3, 4, 5, 6, 8 o 10 por
+    una potencia de diez que cubre el rango con a lo sumo n + 1 intervalos.
+    """
+    lo, hi = _noSingular(float(vmin), float(vmax))
+    partes = n + 1
+    rango = hi - lo
+    medio = (hi + lo) / 2
+    if abs(medio) / rango < 100:
+        corrimiento = 0.0
+    else:
+        corrimiento = math.copysign(10 ** (math.log10(abs(medio)) // 1), medio)
+    escala = 10 ** (math.log10(rango / partes) // 1)
+    a, b = lo - corrimiento, hi - corrimiento
+    pasos = _PASOS * escala
+    grandes = np.nonzero(pasos >= (b - a) / partes)[0]
+    ultimo = grandes[0] if len(grandes) else len(pasos) - 1
+    for paso in pasos[:ultimo + 1][::-1]:
+        base = (a // paso) * paso
+        tol = _tolerancia(paso, corrimiento)
+        d, r = divmod(a - base, paso)
+        bajo = d + 1 if abs(r / paso - 1) < tol else d
+        d, r = divmod(b - base, paso)
+        alto = d if abs(r / paso) < tol else d + 1
+        lev = np.arange(bajo, alto + 1) * paso + base
+        if ((lev <= b) & (lev >= a)).sum() >= 1:
+            break
+    lev = lev + corrimiento
+    # Igual que ContourSet._autolev: se quitan los niveles sobrantes.
+    debajo = np.nonzero(lev < vmin)[0]
+    i0 = debajo[-1] if len(debajo) else 0
+    encima = np.nonzero(lev > vmax)[0]
+    i1 = encima[0] + 1 if len(encima) else len(lev)
+    if i1 - i0 < 3:
+        i0, i1 = 0, len(lev)
+    return lev[i0:i1]
+
+
+def potencial(eje, evaluar, cargas, lv=10, cerca=CERCA, celdas=CELDAS, minimo=MINIMO):
+    """
+    Potencial en la grilla eje x eje evaluando solo donde hace falta.
+
+    Parameters
+    ----------
+    eje : array
+        Valores equiespaciados de las dos coordenadas del plano (u, v).
+    evaluar : callable
+        evaluar(u, v) devuelve el potencial en los puntos (u, v) del plano.
+    cargas : array (N, 3)
+        Cargas en coordenadas del plano: (u, v, distancia al plano).
+    lv : int o list
+        Niveles de las equipotenciales, como en contour.
+    cerca, celdas, minimo : (opcional)
+        Ver CERCA, CELDAS y MINIMO.
+
+    Returns
+    -------
+    Vmat : array (n, n)
+        Vmat[i, j] es el potencial en (eje[j], eje[i]), como con np.meshgrid.
+    lv : array
+        Los niveles (elegidos como contour si lv es un entero).
+    evaluados : int
+        Cantidad de puntos en que se evaluó el potencial.
+    """
+    eje = np.asarray(eje, dtype=float)
+    cargas = np.asarray(cargas, dtype=float).reshape(-1, 3)
+    n = len(eje)
+    if n < max(minimo, 3):
+        u, v = np.meshgrid(eje, eje)
+        Vmat = np.reshape(evaluar(u.ravel(), v.ravel()), u.shape)
+        return Vmat, _niveles(lv, Vmat), Vmat.size
+
+    h = eje[1] - eje[0]
+    s0 = 2**max(int(np.log2((n - 1) / celdas)), 0)
+    # La grilla se extiende hasta un múltiplo del paso grueso.
+    N = -(-(n - 1) // s0) * s0 + 1
+    coord = np.concatenate((eje, eje[-1] + h * np.arange(1, N - n + 1)))
+    Vg = np.zeros((N, N))
+    hecho = np.zeros((N, N), dtype=bool)
+
+    def calcular(i, j):
+        ind = np.unique(np.ravel_multi_index((i, j), (N, N)))
+        ind = ind[~hecho.ravel()[ind]]
+        if len(ind):
+            i, j = np.unravel_index(ind, (N, N))
+            Vg[i, j] = evaluar(coord[j], coord[i])
+            hecho[i, j] = True
+
+    g = np.arange(0, N, s0)
+    calcular(*(a.ravel() for a in np.meshgrid(g, g, indexing='ij')))
+    ci, cj = (a.ravel() for a in np.meshgrid(g[:-1], g[:-1], indexing='ij'))
+
+    def cercanas(i, j, s):
+        # Distancia (en 3D) del centro de cada celda a la carga más cercana.
+        lado = s * h
+        cu, cv = coord[j] + lado / 2, coord[i] + lado / 2
+        limite = 2 * (cerca * lado)**2
+        res = np.zeros(len(i), dtype=bool)
+        m = max(_PARES // max(len(cargas), 1), 1)
+        for a in range(0, len(i), m):
+            d2 = ((cu[a:a+m, None] - cargas[:, 0])**2 + (cv[a:a+m, None] - cargas[:, 1])**2
+                  + cargas[:, 2]**2)
+            res[a:a+m] = (d2 < limite).any(axis=1)
+        return res
+
+    def refinar(lv):
+        """Recorre el árbol desde la grilla gruesa; devuelve las hojas (i, j, s)."""
+        hojas = []
+        i, j, s = ci, cj, s0
+        while len(i) and s > 1:
+            vert = np.stack((Vg[i, j], Vg[i + s, j], Vg[i, j + s], Vg[i + s, j + s]))
+            r = ~np.isfinite(vert).all(axis=0) | cercanas(i, j, s)
+            if lv is not None:
+                with np.errstate(invalid='ignore'):
+                    lo, hi = vert.min(axis=0), vert.max(axis=0)
+                r |= np.searchsorted(lv, hi, 'right') > np.searchsorted(lv, lo, 'left')
+            hojas.append((i[~r], j[~r], s))
+            i, j = i[r], j[r]
+            t = s // 2
+            calcular(np.concatenate((i + t, i, i + t, i + s, i + t)),
+                     np.concatenate((j, j + t, j + t, j + t, j + s)))
+            i, j = np.concatenate((i, i + t, i, i + t)), np.concatenate((j, j, j + t, j + t))
+            s = t
+        return hojas
+
+    # Primero se refina solo cerca de las cargas, donde están los extremos
+    # del potencial, para elegir los niveles; después, por los niveles.
+    if isinstance(lv, (int, np.integer)):
+        refinar(None)
+        lv = niveles(lv, *_extremos(Vg[hecho]))
+    else:
+        lv = np.sort(np.asarray(lv, dtype=float))
+    hojas = refinar(lv)
+
+    for i, j, s in hojas:
+        if len(i) == 0:
+            continue
+        a = np.arange(s + 1)
+        f = a / s
+        ii, jj = np.broadcast_arrays(i[:, None, None] + a[None, :, None],
+                                     j[:, None, None] + a[None, None, :])
+        fi, fj = f[None, :, None], f[None, None, :]
+        V00, V10 = Vg[i, j][:, None, None], Vg[i + s, j][:, None, None]
+        V01, V11 = Vg[i, j + s][:, None, None], Vg[i + s, j + s][:, None, None]
+        interp = ((1 - fi) * (1 - fj) * V00 + fi * (1 - fj) * V10
+                  + (1 - fi) * fj * V01 + fi * fj * V11)
+        libre = ~hecho[ii, jj]
+        Vg[ii[libre], jj[libre]] = interp[libre]
+
+    return Vg[:n, :n], lv, int(hecho.sum())
+
+
+def _extremos(v):
+    v = v[np.isfinite(v)]
+    return (v.min(), v.max()) if len(v) else (0.0, 1.0)
+
+
+def _niveles(lv, Vmat):
+    if isinstance(lv, (int, np.integer)):
+        return niveles(lv, *_extremos(Vmat.ravel()))
+    return np.asarray(lv, dtype=float)
+
+
+def _noSingular(vmin, vmax, expandir=1e-13, minimo=1e-14):
+    # Como matplotlib.transforms.nonsingular: ensancha un rango nulo.
+    if not (np.isfinite(vmin) and np.isfinite(vmax)):
+        return -expandir, expandir
+    if vmax < vmin:
+        vmin, vmax = vmax, vmin
+    mayor = max(abs(vmin), abs(vmax))
+    if mayor < (1e6 / minimo) * np.finfo(float).tiny:
+        return -expandir, expandir
+    if vmax - vmin <= mayor * minimo:
+        if vmax == 0 and vmin == 0:
+            return -expandir, expandir
+        return vmin - expandir * abs(vmin), vmax + expandir * abs(vmax)
+    return vmin, vmax
+
+
+def _tolerancia(paso, corrimiento):
+    # Con un corrimiento grande respecto del paso se pierde precisión.
+    if corrimiento:
+        return min(0.4999, max(1e-10, 10 ** (np.log10(abs(corrimiento) / paso) - 12)))
+    return 1e-10
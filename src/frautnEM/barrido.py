@@ -0,0 +1,183 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Barridos de parámetros: el campo de muchas variantes de un mismo sistema
+de cargas en una misma grilla.
+
+Las K configuraciones se reciben apiladas en un arreglo (K, N, 4) y se
+evalúan todas juntas, por bloques de (configuraciones, puntos, cargas) que
+no superan max_bytes de temporarios. Cada bloque del resultado se escribe
+una sola vez, de modo que el resultado puede ser un np.memmap en disco:
+
+    Qs = variantes(Q, 0, r=np.linspace((-1, 0, 0), (1, 0, 0), 200))
+    R = evaluar(X, Y, Z, Qs, calcV=True, archivo='barrido.npy')
+    R[37, 1]   # Ei de la configuración 37.
+"""
+
+import numpy as np
+
+from . import nucleo
+from . import perfil
+
+
+def variantes(Q, i, r=None, q=None):
+    """
+    Configuraciones que difieren de Q en la carga i.
+
+    Parameters
+    ----------
+    Q : list o ChargeSet
+        Configuración de base, de N cargas.
+    i : int
+        Índice de la carga que cambia.
+    r : array (K, 3) (opcional)
+        Posiciones de la carga i, por ejemplo a lo largo de una recta.
+    q : array (K,) (opcional)
+        Valores de la carga i.
+
+    Returns
+    -------
+    array (K, N, 4)
+    """
+    C = nucleo.cargas(Q)
+    K = len(r) if r is not None else len(q)
+    Qs = np.repeat(C[None], K, axis=0)
+    if r is not None:
+        Qs[:, i, 1:] = r
+    if q is not None:
+        Qs[:, i, 0] = q
+    return Qs
+
+
+@perfil.medido
+def evaluar(x, y, z, Qs, calcV=False, calcE=True, max_bytes=None, out=None, archivo=None,
+            dtype=None):
+    """
+    Potencial y/o campo de K configuraciones de cargas en los mismos puntos.
+
+    Parameters
+    ----------
+    x, y, z : array
+        Puntos de campo, comunes a todas las configuraciones (como en Ef).
+    Qs : array (K, N, 4)
+        Las configuraciones, de la forma [q, x, y, z] cada carga; las que
+        tienen menos cargas se completan con cargas nulas (en cualquier
+        posición: no contribuyen aunque coincidan con un punto de campo).
+    calcV, calcE : bool
+        Qué magnitudes calcular.
+    max_bytes : int (opcional)
+        Memoria máxima para los temporarios de cada bloque.
+    out : array (opcional)
+        Arreglo contiguo de forma (K, C) + forma de los puntos, por ejemplo
+        un np.memmap, donde escribir el resultado.
+    archivo : str (opcional)
+        Si no se pasa out, el resultado se crea como un .npy mapeado en
+        memoria en este archivo (np.load(archivo, mmap_mode='r') lo lee).
+    dtype : (opcional)
+        Tipo del resultado que se crea: float (por defecto) o np.float32.
+
+    Returns
+    -------
+    array (K, C) + forma de los puntos
+        Las C componentes calculadas de cada configuración, en el orden
+        V, Ei, Ej, Ek.
+    """
+    shape, P = nucleo.puntos(x, y, z)
+    Qs = np.asarray(Qs, dtype=float)
+    if Qs.ndim != 3 or Qs.shape[2] != 4:
+        raise ValueError(f"Qs debe tener forma (K, N, 4), no {Qs.shape}")
+    K, N, _ = Qs.shape
+    M = len(P)
+    perfil.contar(M, N, K)
+    C = int(calcV) + 3 * int(calcE)
+    forma = (K, C) + shape
+    if out is None:
+        dtype = float if dtype is None else dtype
+        if archivo is None:
+            out = np.empty(forma, dtype)
+        else:
+            out = np.lib.format.open_memmap(archivo, mode='w+', dtype=dtype, shape=forma)
+    elif np.shape(out) != forma:
+        raise ValueError(f"out debe tener forma {forma}, no {np.shape(out)}")
+    R = np.reshape(out, (K, C, M))
+    if R.size and not np.shares_memory(R, out):
+        raise ValueError("out debe ser un arreglo contiguo")
+
+    # Coordenadas contiguas; la constante de Coulomb va en las cargas.
+    Pt = np.ascontiguousarray(P.T)
+    Ct = np.ascontiguousarray(Qs.transpose(2, 0, 1))
+    Ct[0] *= nucleo.k
+    kb, m, n = bloques(K, M, N, max_bytes)
+    temporarios = np.empty((6, kb * m * n))
+    fila = np.empty(kb * m)
+
+    for a in range(0, K, kb):
+        for i in range(0, M, m):
+            px, py, pz = (c[None, i:i+m, None] for c in Pt)
+            kk, mm = len(Ct[0, a:a+kb]), px.shape[1]
+            acumulado = np.zeros((C, kk, mm))
+            f = fila[:kk * mm].reshape(kk, mm, 1)
+            for j in range(0, N, n):
+                q, cx, cy, cz = (c[a:a+kb, None, j:j+n] for c in Ct)
+                nn = q.shape[-1]
+                dx, dy, dz, r2, t, r = (b[:kk * mm * nn].reshape(kk, mm, nn) for b in temporarios)
+                np.subtract(px, cx, out=dx)
+                np.subtract(py, cy, out=dy)
+                np.subtract(pz, cz, out=dz)
+                np.multiply(dx, dx, out=r2)
+                np.multiply(dy, dy, out=t)
+                r2 += t
+                np.multiply(dz, dz, out=t)
+                r2 += t
+                np.sqrt(r2, out=r)
+                # Las cargas nulas se omiten: en un punto de campo darían 0/0.
+                nulas = q == 0
+                llenas = None if not nulas.any() else ~nulas
+                c = 0
+                if calcV:
+                    # Suma sobre las cargas de q / r, como producto matricial.
+                    _dividir(1, r, t, llenas)
+                    np.matmul(t, np.swapaxes(q, 1, 2), out=f)
+                    acumulado[0] += f[:, :, 0]
+                    c = 1
+                if calcE:
+                    w = np.multiply(r, r2, out=r2)
+                    w = _dividir(q, w, t, llenas)
+                    for d in (dx, dy, dz):
+                        np.matmul(d[:, :, None, :], w[:, :, :, None], out=f[..., None])
+                        acumulado[c] += f[:, :, 0]
+                        c += 1
+            R[a:a+kb, :, i:i+m] = acumulado.transpose(1, 0, 2)
+    return out
+
+
+def _dividir(a, b, out, donde):
+    """a / b en out, con ceros fuera de la máscara donde (si no es None)."""
+    if donde is None:
+        return np.divide(a, b, out=out)
+    out[...] = 0
+    return np.divide(a, b, out=out, where=donde)
+
+
+def bloques(K, M, N, max_bytes=None):
+    """
+    Configuraciones, puntos y cargas por bloque: como nucleo.bloques, con
+    las configuraciones que quepan cuando un bloque abarca todos los puntos.
+    """
+    m, n = nucleo.bloques(M, N, max_bytes)
+    kb = max(min(K, nucleo.bloques(M * K, N, max_bytes)[0] // max(m, 1)), 1) if m == M else 1
+    return kb, m, n
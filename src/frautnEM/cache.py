@@ -0,0 +1,197 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Caché de campos calculados, opcional.
+
+Con activarCache(), las funciones calcular... de puntuales (y los gráficos
+que las usan) guardan cada FieldResult bajo una clave formada por el
+contenido de las cargas y los parámetros de la grilla y del cálculo. Si
+vuelven a recibir las mismas cargas y la misma grilla, devuelven el
+resultado guardado sin evaluar el campo.
+
+    from frautnEM import cache
+    c = cache.activarCache(max_bytes=512 * 2**20, directorio='campos')
+    plotEf(Q)
+    plotEf(Q, title='Otro título')   # No vuelve a calcular el campo.
+    c.estadisticas()
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .cargas import ChargeSet
+from .resultados import FieldResult
+
+
+class FieldCache:
+    """
+    Caché LRU de FieldResult, limitado por memoria.
+
+    Parameters
+    ----------
+    max_bytes : int (opcional)
+        Memoria máxima de los resultados guardados; al superarla se
+        descartan los usados hace más tiempo.
+    directorio : str (opcional)
+        Si se informa, cada resultado también se guarda en disco (como .npz)
+        y los que no están en memoria se buscan allí (mapeados en memoria).
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, directorio=None):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        if directorio is not None:
+            os.makedirs(directorio, exist_ok=True)
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    @staticmethod
+    def clave(tipo, Q, parametros):
+        """Clave del resultado de tipo dado para las cargas Q y los parámetros."""
+        h = hashlib.sha1(tipo.encode())
+        h.update(ChargeSet.desde(Q).huella.encode())
+        h.update(json.dumps(parametros, sort_keys=True, default=repr).encode())
+        return h.hexdigest()
+
+    def obtener(self, clave):
+        """Devuelve el resultado guardado bajo clave, o None."""
+        with self._lock:
+            F = self._datos.get(clave)
+            if F is not None:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return F
+        archivo = self._archivo(clave)
+        if archivo is not None and os.path.exists(archivo):
+            F = FieldResult.cargar(archivo)
+            with self._lock:
+                self.aciertos_disco += 1
+            self._agregar(clave, F)
+            return F
+        with self._lock:
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave, F):
+        """Guarda F bajo clave (en memoria y, si hay directorio, en disco)."""
+        for a in F._presentes().values():
+            if isinstance(a, np.ndarray):
+                a.flags.writeable = False
+        archivo = self._archivo(clave)
+        if archivo is not None and not os.path.exists(archivo):
+            self._escribir(archivo, F)
+        self._agregar(clave, F)
+
+    def _escribir(self, archivo, F):
+        # Se escribe en un temporario del mismo directorio y se renombra, para
+        # que otro proceso (u otro hilo) nunca lea un .npz a medio escribir.
+        fd, temporario = tempfile.mkstemp(suffix='.tmp', dir=self.directorio)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                F.guardar(f)
+            os.replace(temporario, archivo)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    def _agregar(self, clave, F):
+        n = F.nbytes
+        if n > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._datos:
+                self._bytes -= self._datos.pop(clave).nbytes
+            self._datos[clave] = F
+            self._bytes += n
+            while self._bytes > self.max_bytes:
+                _, viejo = self._datos.popitem(last=False)
+                self._bytes -= viejo.nbytes
+                self.desalojos += 1
+
+    def _archivo(self, clave):
+        if self.directorio is None:
+            return None
+        return os.path.join(self.directorio, clave + '.npz')
+
+    def limpiar(self):
+        """Vacía la memoria del caché (no borra los archivos en disco)."""
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        """Aciertos, fallos, desalojos y memoria ocupada."""
+        with self._lock:
+            return {'aciertos': self.aciertos,
+                    'aciertos_disco': self.aciertos_disco,
+                    'fallos': self.fallos,
+                    'desalojos': self.desalojos,
+                    'entradas': len(self._datos),
+                    'bytes': self._bytes,
+                    'max_bytes': self.max_bytes}
+
+    def __len__(self):
+        return len(self._datos)
+
+
+# Caché en uso; None si está desactivado (por defecto).
+_activo = None
+
+
+def activarCache(max_bytes=256 * 2**20, directorio=None):
+    """Activa el caché de campos y lo devuelve. Ver FieldCache."""
+    global _activo
+    _activo = FieldCache(max_bytes, directorio)
+    return _activo
+
+
+def desactivarCache():
+    """Desactiva el caché de campos."""
+    global _activo
+    _activo = None
+
+
+def cacheActivo():
+    """El caché en uso, o None."""
+    return _activo
+
+
+def consultar(tipo, Q, parametros, calcular):
+    """
+    Devuelve el resultado guardado para (tipo, Q, parametros) o, si no está
+    o el caché está desactivado, el de calcular() (que se guarda).
+    """
+    cache = _activo
+    if cache is None:
+        return calcular()
+    clave = cache.clave(tipo, Q, parametros)
+    F = cache.obtener(clave)
+    if F is None:
+        F = calcular()
+        cache.guardar(clave, F)
+    return F
@@ -0,0 +1,186 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Conjunto de cargas puntuales guardado en arreglos contiguos de NumPy.
+"""
+
+import hashlib
+
+import numpy as np
+
+
+class ChargeSet:
+    """
+    Conjunto de cargas puntuales.
+
+    Reemplaza a la lista Q = [[q1,x1,y1,z1], ..., [qN,xN,yN,zN]]; todas las
+    funciones que reciben Q aceptan indistintamente la lista, un arreglo de
+    forma (N, 4) o un ChargeSet.
+
+    La lista puede incluir también distribuciones continuas (ver
+    distribuciones), que se guardan aparte en cuerpos: las cargas puntuales
+    (len, q, x, ..., C) son solo las de la lista, y caja, carga y dipolo
+    incluyen a los cuerpos.
+
+    Los datos se guardan en un arreglo de forma (4, N), de sólo lectura, de
+    modo que q, x, y, z son contiguos. Los datos derivados (caja, carga
+    total, momento dipolar) se calculan una sola vez.
+
+    Parameters
+    ----------
+    Q : list, array (N, 4) o ChargeSet
+        Cargas de la forma [q, x, y, z], en coulomb y metros.
+
+    Examples
+    --------
+    >>> cs = ChargeSet([[1e-9, 1, 0, 0], [-1e-9, -1, 0, 0]])
+    >>> cs.carga
+    0.0
+    >>> cs.dipolo
+    array([2.e-09, 0.e+00, 0.e+00])
+    """
+
+    def __init__(self, Q):
+        cuerpos = ()
+        if isinstance(Q, ChargeSet):
+            T, cuerpos = Q.T, Q.cuerpos
+        else:
+            if _esCuerpo(Q):
+                Q = [Q]
+            if isinstance(Q, (list, tuple)) and any(_esCuerpo(e) for e in Q):
+                cuerpos = tuple(e for e in Q if _esCuerpo(e))
+                Q = [e for e in Q if not _esCuerpo(e)]
+            T = np.array(Q, dtype=float).reshape(-1, 4).T
+        self.cuerpos = tuple(cuerpos)
+        self.T = np.ascontiguousarray(T)
+        self.T.flags.writeable = False
+        self._cache = {}
+
+    @classmethod
+    def desde(cls, Q):
+        """Devuelve Q si ya es un ChargeSet; si no, lo convierte."""
+        return Q if isinstance(Q, cls) else cls(Q)
+
+    @classmethod
+    def desdeArreglos(cls, q, r, cuerpos=()):
+        """
+        ChargeSet a partir de las cargas q (N,) y las posiciones r (N, 3), con
+        las distribuciones continuas cuerpos (opcional).
+        """
+        q = np.asarray(q, dtype=float)
+        r = np.asarray(r, dtype=float).reshape(-1, 3)
+        cs = cls(np.column_stack((np.broadcast_to(q, len(r)), r)))
+        cs.cuerpos = tuple(cuerpos)
+        return cs
+
+    # Columnas, todas contiguas.
+    @property
+    def q(self):
+        return self.T[0]
+
+    @property
+    def x(self):
+        return self.T[1]
+
+    @property
+    def y(self):
+        return self.T[2]
+
+    @property
+    def z(self):
+        return self.T[3]
+
+    @property
+    def C(self):
+        """Las cargas como arreglo de forma (N, 4): [q, x, y, z]."""
+        return self.T.T
+
+    @property
+    def r(self):
+        """Las posiciones, de forma (N, 3)."""
+        return self.T[1:].T
+
+    @property
+    def caja(self):
+        """Caja que contiene a las cargas: [[xmin, ymin, zmin], [xmax, ymax, zmax]]."""
+        if 'caja' not in self._cache:
+            cajas = [c.caja for c in self.cuerpos]
+            if len(self):
+                cajas.append(np.stack((self.T[1:].min(axis=1), self.T[1:].max(axis=1))))
+            if cajas:
+                caja = np.stack((np.min([c[0] for c in cajas], axis=0),
+                                 np.max([c[1] for c in cajas], axis=0)))
+            else:
+                caja = np.zeros((2, 3))
+            self._cache['caja'] = caja
+        return self._cache['caja']
+
+    @property
+    def carga(self):
+        """Carga total en coulomb."""
+        if 'carga' not in self._cache:
+            self._cache['carga'] = float(self.q.sum()) + sum(c.carga for c in self.cuerpos)
+        return self._cache['carga']
+
+    @property
+    def dipolo(self):
+        """Momento dipolar respecto del origen, en C.m."""
+        if 'dipolo' not in self._cache:
+            self._cache['dipolo'] = self.T[1:] @ self.q + sum(c.dipolo for c in self.cuerpos)
+        return self._cache['dipolo']
+
+    @property
+    def huella(self):
+        """Hash del contenido de las cargas (sirve de clave de caché)."""
+        if 'huella' not in self._cache:
+            h = hashlib.sha1(self.T.tobytes())
+            for c in self.cuerpos:
+                h.update(repr(c).encode())
+            self._cache['huella'] = h.hexdigest()
+        return self._cache['huella']
+
+    @property
+    def positivas(self):
+        """Máscara de las cargas positivas."""
+        if 'positivas' not in self._cache:
+            self._cache['positivas'] = self.q > 0
+        return self._cache['positivas']
+
+    def __len__(self):
+        return self.T.shape[1]
+
+    def __iter__(self):
+        # Compatibilidad con el código que recorre Q como lista.
+        return iter(self.C.tolist())
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return self.C[i].tolist()
+        return ChargeSet(self.C[i])
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.C, dtype=dtype)
+
+    def __repr__(self):
+        if self.cuerpos:
+            return f"ChargeSet({self.C.tolist() + list(self.cuerpos)!r})"
+        return f"ChargeSet({self.C.tolist()!r})"
+
+
+def _esCuerpo(e):
+    """True si e es una distribución continua de carga (algo con campo() y carga)."""
+    return callable(getattr(e, 'campo', None)) and hasattr(e, 'carga')
@@ -0,0 +1,202 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Movimiento de cargas puntuales bajo sus fuerzas de Coulomb.
+
+Las posiciones y velocidades de todas las cargas avanzan a la vez con el
+método de velocity-Verlet; las fuerzas de cada paso se calculan con
+energia.fuerzas (todos los pares, celdas u octree). Opcionalmente hay un
+campo externo uniforme, un amortiguamiento proporcional a la velocidad y
+cargas fijas, que actúan sobre las demás pero no se mueven. Las
+distribuciones continuas de Q también quedan fijas.
+
+La trayectoria se obtiene cuadro por cuadro con un generador, sin guardar
+los anteriores, o escrita en un arreglo que puede ser un .npy en disco:
+
+    for c in trayectoria(Q, masas=1e-6, dt=1e-3, pasos=5000, cada=50):
+        dibujar(c.r)                  # c.t, c.r, c.v, c.U, c.K
+    R = simular(Q, 1e-6, 1e-3, 100000, cada=100, archivo='tray.npy')
+    R[-1]                             # posiciones del último cuadro
+"""
+
+import numpy as np
+
+from . import energia
+from . import nucleo
+from . import perfil
+from .cargas import ChargeSet
+
+
+class Cuadro:
+    """
+    Estado del sistema en un instante.
+
+    t : tiempo en segundos.
+    paso : cantidad de pasos hechos hasta t.
+    r, v : array (N, 3), posiciones y velocidades (copias).
+    U, K : energía potencial (de Coulomb y en el campo externo, respecto del
+        origen) y cinética, en joules; None si no se pidieron energias.
+    """
+
+    __slots__ = ('t', 'paso', 'r', 'v', 'U', 'K')
+
+    def __init__(self, t, paso, r, v, U=None, K=None):
+        self.t, self.paso, self.r, self.v, self.U, self.K = t, paso, r, v, U, K
+
+    def __repr__(self):
+        return f"Cuadro(t={self.t:g}, paso={self.paso}, N={len(self.r)})"
+
+
+def trayectoria(Q, masas, dt, pasos, v0=None, fijas=None, amortiguamiento=0.0,
+                E0=None, cada=1, energias=False, method='directo', corte=None, theta=0.5,
+                max_bytes=None):
+    """
+    Genera los cuadros de la trayectoria de las cargas Q.
+
+    Parameters
+    ----------
+    Q : list o ChargeSet
+        Cargas de la forma [q, x, y, z] en su posición inicial.
+    masas : float o array (N,)
+        Masa de cada carga, en kg.
+    dt : float
+        Paso de tiempo, en segundos.
+    pasos : int
+        Cantidad de pasos.
+    v0 : array (N, 3) (opcional)
+        Velocidades iniciales en m/s; por defecto, en reposo.
+    fijas : array (opcional)
+        Máscara (N,) o índices de las cargas que no se mueven.
+    amortiguamiento : float (opcional)
+        Coeficiente gamma, en 1/s, de la fuerza -gamma m v.
+    E0 : array (3,) (opcional)
+        Campo externo uniforme, en N/C.
+    cada : int (opcional)
+        Se genera un cuadro cada tantos pasos (y el inicial).
+    energias : bool (opcional)
+        Calcula U y K en cada cuadro; U sale del mismo recorrido de los
+        pares que las fuerzas de ese paso.
+    method, corte, theta, max_bytes : (opcional)
+        Cálculo de las fuerzas, como en energia.fuerzas.
+
+    Yields
+    ------
+    Cuadro
+    """
+    Q = ChargeSet.desde(Q)
+    q = Q.q.copy()
+    r = Q.r.copy()
+    N = len(q)
+    v = np.zeros((N, 3)) if v0 is None else np.array(v0, dtype=float)
+    if v.shape != (N, 3):
+        raise ValueError(f"v0 debe tener forma ({N}, 3), no {v.shape}")
+    m = np.broadcast_to(np.asarray(masas, dtype=float), (N,))
+    moviles = np.ones(N, dtype=bool)
+    if fijas is not None:
+        moviles[fijas] = False
+    if (m[moviles] <= 0).any():
+        raise ValueError("las masas de las cargas que se mueven deben ser positivas")
+    # Con inversa de la masa nula, las fijas no se aceleran.
+    inversa = np.zeros(N)
+    inversa[moviles] = 1 / m[moviles]
+    v[~moviles] = 0
+    E0 = None if E0 is None else np.asarray(E0, dtype=float)
+    opciones = dict(method=method, corte=corte, theta=theta, max_bytes=max_bytes)
+
+    def fuerzas(conU):
+        """Fuerzas en las posiciones r (y la energía potencial, si conU)."""
+        Qr = ChargeSet.desdeArreglos(q, r, Q.cuerpos)
+        if conU:
+            U, F = energia.energiaYFuerzas(Qr, **opciones)
+        else:
+            U, F = None, energia.fuerzas(Qr, **opciones)
+        if E0 is not None:
+            F += q[:, None] * E0
+            if conU:
+                U -= q @ (r @ E0)
+        return U, F
+
+    def cuadro(paso, U):
+        K = 0.5 * np.sum(m[moviles] * np.einsum('ij,ij->i', v[moviles], v[moviles])) \
+            if energias else None
+        return Cuadro(paso * dt, paso, r.copy(), v.copy(), U, K)
+
+    U, F = fuerzas(energias)
+    yield cuadro(0, U)
+    # v(t + dt/2) = v (1 - gamma dt/2) + F/m dt/2; r += v dt;
+    # v(t + dt) = (v(t + dt/2) + F/m dt/2) / (1 + gamma dt/2).
+    medio = 0.5 * dt * inversa[:, None]
+    frenado = 0.5 * amortiguamiento * dt
+    for paso in range(1, pasos + 1):
+        if frenado:
+            v *= 1 - frenado
+        v += medio * F
+        r += dt * v
+        guardar = paso % cada == 0
+        U, F = fuerzas(energias and guardar)
+        v += medio * F
+        if frenado:
+            v /= 1 + frenado
+        if guardar:
+            yield cuadro(paso, U)
+
+
+@perfil.medido
+def simular(Q, masas, dt, pasos, cada=1, archivo=None, velocidades=False, out=None,
+            **params):
+    """
+    Trayectoria completa de las cargas Q en un arreglo.
+
+    Parameters
+    ----------
+    Q, masas, dt, pasos, cada :
+        Como en trayectoria.
+    archivo : str (opcional)
+        Si no se pasa out, el resultado se crea como un .npy mapeado en
+        memoria en este archivo (np.load(archivo, mmap_mode='r') lo lee), que
+        se escribe cuadro por cuadro.
+    velocidades : bool (opcional)
+        Guarda también las velocidades.
+    out : array (opcional)
+        Arreglo de la forma del resultado, por ejemplo un np.memmap, donde
+        escribir la trayectoria.
+    **params :
+        Los demás parámetros de trayectoria (v0, fijas, E0, ...).
+
+    Returns
+    -------
+    array (pasos // cada + 1, N, 3), o (pasos // cada + 1, 2, N, 3) con las
+    posiciones y las velocidades. El cuadro i corresponde a t = i cada dt.
+    """
+    N = len(nucleo.cargas(Q))
+    forma = (pasos // cada + 1,) + ((2,) if velocidades else ()) + (N, 3)
+    if out is None:
+        if archivo is None:
+            out = np.empty(forma)
+        else:
+            out = np.lib.format.open_memmap(archivo, mode='w+', dtype=float, shape=forma)
+    elif np.shape(out) != forma:
+        raise ValueError(f"out debe tener forma {forma}, no {np.shape(out)}")
+    for i, c in enumerate(trayectoria(Q, masas, dt, pasos, cada=cada, **params)):
+        if velocidades:
+            out[i, 0] = c.r
+            out[i, 1] = c.v
+        else:
+            out[i] = c.r
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
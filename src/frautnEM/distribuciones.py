@@ -0,0 +1,466 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Distribuciones continuas de carga: segmento, anillo, disco y esfera.
+
+Reemplazan a los miles de cargas puntuales con que se aproximaría un cuerpo
+cargado. El segmento, el anillo (con las integrales elípticas completas,
+calculadas con la media aritmético-geométrica) y la esfera tienen
+expresiones cerradas; el disco se integra como una suma de anillos con
+cuadratura de Gauss-Legendre adaptativa, intervalo por intervalo y punto
+por punto, hasta la tolerancia pedida.
+
+Se mezclan con las cargas puntuales en Q:
+
+    Q = [[1e-9, 0, 0, 2], Segmento((0, 0, -1), (0, 0, 1), 1e-9)]
+
+y Ef, V y los gráficos suman su campo al de las cargas puntuales.
+"""
+
+import numpy as np
+
+from . import nucleo
+
+
+# Nodos de la cuadratura de Gauss-Legendre en cada intervalo.
+ORDEN = 8
+
+# Subdivisiones máximas de un intervalo de la cuadratura.
+PROFUNDIDAD = 40
+
+# Puntos por bloque en la cuadratura (acota la memoria de los temporarios).
+_PUNTOS = 4096
+
+# Cerca del eje del anillo (rho**2 < _EJE * (a**2 + z**2)) se usa el
+# desarrollo de primer orden de E_rho, que ahí es más preciso.
+_EJE = 1e-8
+
+
+class Distribucion:
+    """
+    Base de las distribuciones continuas de carga.
+
+    Las subclases definen carga, centro, caja, contorno() (lista de
+    polilíneas (k, 3) para dibujar el cuerpo) y _campo(P), que devuelve el
+    potencial y el campo en los puntos P (M, 3).
+    """
+
+    def campo(self, P, calcV=False, calcE=True):
+        """
+        Potencial y campo eléctrico en los puntos P (M, 3).
+
+        Returns
+        -------
+        V : array (M,) o None
+        E : array (M, 3) o None
+        """
+        P = np.asarray(P, dtype=float).reshape(-1, 3)
+        V, E = self._campo(P)
+        return (V if calcV else None), (E if calcE else None)
+
+    @property
+    def dipolo(self):
+        """Momento dipolar respecto del origen, en C.m (todas son simétricas)."""
+        return self.carga * self.centro
+
+    def __repr__(self):
+        args = ', '.join(f'{n}={np.asarray(v).tolist()!r}' for n, v in self._parametros())
+        return f'{type(self).__name__}({args})'
+
+
+class Segmento(Distribucion):
+    """
+    Segmento recto con densidad lineal de carga uniforme.
+
+    Parameters
+    ----------
+    a, b : array (3,)
+        Extremos, en metros.
+    densidad : float
+        Densidad lineal de carga, en C/m.
+    """
+
+    def __init__(self, a, b, densidad):
+        self.a = np.asarray(a, dtype=float)
+        self.b = np.asarray(b, dtype=float)
+        self.densidad = float(densidad)
+
+    def _parametros(self):
+        return (('a', self.a), ('b', self.b), ('densidad', self.densidad))
+
+    @property
+    def largo(self):
+        return float(np.linalg.norm(self.b - self.a))
+
+    @property
+    def carga(self):
+        return self.densidad * self.largo
+
+    @property
+    def centro(self):
+        return (self.a + self.b) / 2
+
+    @property
+    def caja(self):
+        return np.stack((np.minimum(self.a, self.b), np.maximum(self.a, self.b)))
+
+    def contorno(self, n=64):
+        return [np.stack((self.a, self.b))]
+
+    def _campo(self, P):
+        L = self.largo
+        u = (self.b - self.a) / L
+        d = P - self.a
+        s = d @ u
+        rv = d - s[:, None] * u
+        rho2 = np.einsum('ij,ij->i', rv, rv)
+        # Coordenadas de los extremos a lo largo del segmento, respecto del
+        # pie de la perpendicular por el punto, y distancias a ellos.
+        t1, t2 = -s, L - s
+        r1, r2 = np.sqrt(rho2 + t1*t1), np.sqrt(rho2 + t2*t2)
+        kl = nucleo.k * self.densidad
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # V = k l ln((t2 + r2) / (t1 + r1)), escrito sin restas que se
+            # cancelen: t + r = rho**2 / (r - t) si t < 0, y del lado de b se
+            # usa la forma equivalente ln((r1 - t1) / (r2 - t2)).
+            def suma(t, r):
+                return np.where(t >= 0, t + r, rho2 / (r - t))
+
+            def resta(t, r):
+                return np.where(t <= 0, r - t, rho2 / (r + t))
+
+            V = kl * np.where(s <= L / 2, np.log(suma(t2, r2)) - np.log(suma(t1, r1)),
+                              np.log(resta(t1, r1)) - np.log(resta(t2, r2)))
+            Ez = kl * (1/r2 - 1/r1)
+            # Componente perpendicular: k l (t2/r2 - t1/r1) / rho, que si los
+            # extremos están del mismo lado se reescribe sin cancelaciones.
+            mismo = t1 * t2 > 0
+            f = np.where(mismo, (t2*t2 - t1*t1) / ((t2*r1 + t1*r2) * r1 * r2),
+                         (t2/r2 - t1/r1) / rho2)
+        E = kl * f[:, None] * rv + Ez[:, None] * u
+        return V, E
+
+
+def elipticas(m):
+    """
+    Integrales elípticas completas K(m) y E(m), de parámetro m = k**2, con la
+    media aritmético-geométrica. Para m = 1, K es infinito.
+    """
+    m = np.asarray(m, dtype=float)
+    a = np.ones_like(m)
+    b = np.sqrt(np.clip(1 - m, 0, None))
+    suma = m / 2
+    potencia = 0.5
+    for _ in range(PROFUNDIDAD):
+        c = (a - b) / 2
+        if not (c > 1e-17 * a).any():
+            break
+        a, b = (a + b) / 2, np.sqrt(a * b)
+        potencia *= 2
+        suma = suma + potencia * c * c
+    with np.errstate(divide='ignore'):
+        K = np.pi / (2 * a)
+    K = np.where(m >= 1, np.inf, K)
+    E = np.where(m >= 1, 1.0, K * (1 - suma))
+    return K, E
+
+
+def _anillo(rho, z, a, q):
+    """
+    Potencial y componentes (rho, z) del campo de un anillo de radio a y
+    carga q, en coordenadas cilíndricas respecto de su centro y su eje.
+    """
+    d2 = (a + rho)**2 + z*z
+    D = (a - rho)**2 + z*z
+    d = np.sqrt(d2)
+    K, E = elipticas(4 * a * rho / d2)
+    c = nucleo.k * q / np.pi
+    with np.errstate(divide='ignore', invalid='ignore'):
+        V = 2 * c * K / d
+        Ez = 2 * c * z * E / (d * D)
+        Er = c / (rho * d) * (K - (a*a - rho*rho + z*z) / D * E)
+        # Cerca del eje el corchete se cancela: E_rho = rho V0''(z) / 2.
+        R2 = a*a + z*z
+        eje = nucleo.k * q * rho * (2*z*z - a*a) / (2 * R2**2.5)
+    Er = np.where(rho*rho < _EJE * R2, eje, Er)
+    return V, Er, Ez
+
+
+class _Axial(Distribucion):
+    """Base de las distribuciones con simetría de revolución."""
+
+    def __init__(self, centro, radio, densidad, normal=(0, 0, 1)):
+        self.centro = np.asarray(centro, dtype=float)
+        self.radio = float(radio)
+        self.densidad = float(densidad)
+        normal = np.asarray(normal, dtype=float)
+        self.normal = normal / np.linalg.norm(normal)
+
+    def _parametros(self):
+        return (('centro', self.centro), ('radio', self.radio),
+                ('densidad', self.densidad), ('normal', self.normal))
+
+    @property
+    def caja(self):
+        lado = self.radio * np.sqrt(np.clip(1 - self.normal**2, 0, None))
+        return np.stack((self.centro - lado, self.centro + lado))
+
+    def contorno(self, n=64):
+        u = np.cross(self.normal, np.eye(3)[np.abs(self.normal).argmin()])
+        u /= np.linalg.norm(u)
+        v = np.cross(self.normal, u)
+        t = np.linspace(0, 2 * np.pi, n + 1)[:, None]
+        return [self.centro + self.radio * (np.cos(t) * u + np.sin(t) * v)]
+
+    def _campo(self, P):
+        d = P - self.centro
+        z = d @ self.normal
+        rv = d - z[:, None] * self.normal
+        rho = np.sqrt(np.einsum('ij,ij->i', rv, rv))
+        V, Er, Ez = self._local(rho, z)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            radial = np.where(rho[:, None] > 0, rv / rho[:, None], 0)
+            return V, Er[:, None] * radial + Ez[:, None] * self.normal
+
+
+class Anillo(_Axial):
+    """
+    Anillo con densidad lineal de carga uniforme.
+
+    Parameters
+    ----------
+    centro : array (3,)
+    radio : float
+    densidad : float
+        Densidad lineal de carga, en C/m.
+    normal : array (3,) (opcional)
+        Dirección del eje del anillo; por defecto, z.
+    """
+
+    @property
+    def carga(self):
+        return 2 * np.pi * self.radio * self.densidad
+
+    def _local(self, rho, z):
+        return _anillo(rho, z, self.radio, self.carga)
+
+
+class Disco(_Axial):
+    """
+    Disco con densidad superficial de carga uniforme.
+
+    Se integra como suma de anillos concéntricos, con cuadratura de
+    Gauss-Legendre adaptativa sobre el radio del anillo.
+
+    Parameters
+    ----------
+    centro : array (3,)
+    radio : float
+    densidad : float
+        Densidad superficial de carga, en C/m².
+    normal : array (3,) (opcional)
+        Dirección del eje del disco; por defecto, z.
+    tol : float (opcional)
+        Error relativo admitido en cada punto.
+    """
+
+    def __init__(self, centro, radio, densidad, normal=(0, 0, 1), tol=1e-8):
+        super().__init__(centro, radio, densidad, normal)
+        self.tol = float(tol)
+
+    def _parametros(self):
+        return super()._parametros() + (('tol', self.tol),)
+
+    @property
+    def carga(self):
+        return np.pi * self.radio**2 * self.densidad
+
+    def _local(self, rho, z):
+        R, sigma = self.radio, self.densidad
+
+        def anillos(rho, z, a):
+            return np.stack(_anillo(rho, z, a, 2 * np.pi * a * sigma))
+
+        # La escala del error admitido: el potencial y el campo de la carga
+        # total a la distancia del punto, que nunca se anulan.
+        r2 = rho*rho + z*z + R*R
+        kq = np.abs(nucleo.k * self.carga)
+        escala = np.stack((kq / np.sqrt(r2), kq / r2, kq / r2))
+        res = np.empty((3, len(rho)))
+        # Sobre el disco hay expresión cerrada: V = 4 k sigma R E(rho**2/R**2);
+        # E_z salta en 4 pi k sigma y se toma el promedio, 0.
+        sobre = (z == 0) & (rho < R)
+        K, E = elipticas((rho[sobre] / R)**2)
+        c = 4 * nucleo.k * sigma * R
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res[0, sobre] = c * E
+            res[1, sobre] = np.where(rho[sobre] > 0, c * (K - E) / rho[sobre], 0)
+        res[2, sobre] = 0
+        fuera = np.nonzero(~sobre)[0]
+        for i in range(0, len(fuera), _PUNTOS):
+            s = fuera[i:i + _PUNTOS]
+            res[:, s] = integrar(anillos, (rho[s], z[s]), 0, R, rho[s], self.tol, escala[:, s])
+        return res
+
+
+class Esfera(_Axial):
+    """
+    Superficie esférica con densidad superficial de carga uniforme.
+
+    Parameters
+    ----------
+    centro : array (3,)
+    radio : float
+    densidad : float
+        Densidad superficial de carga, en C/m².
+    """
+
+    def __init__(self, centro, radio, densidad):
+        super().__init__(centro, radio, densidad)
+
+    def _parametros(self):
+        return (('centro', self.centro), ('radio', self.radio), ('densidad', self.densidad))
+
+    @property
+    def carga(self):
+        return 4 * np.pi * self.radio**2 * self.densidad
+
+    @property
+    def caja(self):
+        return np.stack((self.centro - self.radio, self.centro + self.radio))
+
+    def contorno(self, n=64):
+        # Tres circunferencias máximas: la proyección sobre cualquier plano
+        # de coordenadas contiene el contorno.
+        t = np.linspace(0, 2 * np.pi, n + 1)
+        c, s, o = np.cos(t), np.sin(t), np.zeros_like(t)
+        return [self.centro + self.radio * np.stack(p, axis=-1)
+                for p in ((c, s, o), (c, o, s), (o, c, s))]
+
+    def _campo(self, P):
+        d = P - self.centro
+        r = np.sqrt(np.einsum('ij,ij->i', d, d))
+        kq = nucleo.k * self.carga
+        fuera = r >= self.radio
+        with np.errstate(divide='ignore', invalid='ignore'):
+            V = np.where(fuera, kq / r, kq / self.radio)
+            E = np.where(fuera[:, None], kq * d / r[:, None]**3, 0)
+        return V, E
+
+
+def integrar(f, args, a, b, cortes, tol, escala):
+    """
+    Integral de f en [a, b] para cada punto, con cuadratura de Gauss-Legendre
+    adaptativa.
+
+    Parameters
+    ----------
+    f : callable
+        f(*args, t), con args de forma (K, 1) y t de forma (K, ORDEN),
+        devuelve un arreglo (C, K, ORDEN) con las C componentes del integrando.
+    args : tuple de arrays (M,)
+        Datos de cada punto.
+    a, b : float
+        Límites de integración.
+    cortes : array (M,)
+        Donde el integrando de cada punto tiene un pico (si está en (a, b),
+        el intervalo se parte allí desde el comienzo).
+    tol : float
+        Error relativo admitido.
+    escala : array (C, M)
+        Magnitud de referencia de cada componente, para el error relativo.
+
+    Returns
+    -------
+    array (C, M)
+    """
+    x, w = np.polynomial.legendre.leggauss(ORDEN)
+    M = len(cortes)
+    args = [np.asarray(v, dtype=float) for v in args]
+
+    def cuadratura(i, lo, hi):
+        medio, mitad = ((hi + lo) / 2)[:, None], ((hi - lo) / 2)[:, None]
+        y = f(*(v[i][:, None] for v in args), medio + mitad * x)
+        return (y * w).sum(axis=-1) * mitad[:, 0]
+
+    # Intervalos iniciales: [a, b] o, si el pico está adentro, [a, corte] y [corte, b].
+    cortes = np.asarray(cortes, dtype=float)
+    adentro = (cortes > a) & (cortes < b)
+    todos = np.arange(M)
+    i = np.concatenate((todos, todos[adentro]))
+    lo = np.concatenate((np.full(M, float(a)), cortes[adentro]))
+    hi = np.concatenate((np.where(adentro, cortes, b), np.full(adentro.sum(), float(b))))
+    estimado = cuadratura(i, lo, hi)
+    total = np.zeros((len(escala), M))
+
+    for nivel in range(PROFUNDIDAD):
+        if len(i) == 0:
+            break
+        c = (lo + hi) / 2
+        izq, der = cuadratura(i, lo, c), cuadratura(i, c, hi)
+        mitades = izq + der
+        with np.errstate(invalid='ignore'):
+            ok = (np.abs(mitades - estimado) <= tol * escala[:, i]).all(axis=0)
+        # Los puntos sobre el cuerpo (integrando no finito) no se refinan.
+        ok |= ~np.isfinite(mitades).all(axis=0)
+        if nivel == PROFUNDIDAD - 1:
+            ok[:] = True
+        np.add.at(total.T, i[ok], mitades[:, ok].T)
+        sigue = ~ok
+        i = np.concatenate((i[sigue], i[sigue]))
+        lo, hi = np.concatenate((lo[sigue], c[sigue])), np.concatenate((c[sigue], hi[sigue]))
+        estimado = np.concatenate((izq[:, sigue], der[:, sigue]), axis=1)
+    return total
+
+
+def aDatos(cuerpos):
+    """
+    Las distribuciones cuerpos como lista de diccionarios con el nombre de
+    la clase y sus parámetros, que se puede guardar como JSON.
+    """
+    return [dict(tipo=type(c).__name__, **{n: np.asarray(v).tolist() for n, v in c._parametros()})
+            for c in cuerpos]
+
+
+def desdeDatos(datos):
+    """Las distribuciones guardadas con aDatos, reconstruidas."""
+    tipos = {c.__name__: c for c in (Segmento, Anillo, Disco, Esfera)}
+    cuerpos = []
+    for d in datos:
+        d = dict(d)
+        tipo = d.pop('tipo')
+        if tipo not in tipos:
+            raise ValueError(f"distribución desconocida: {tipo!r}")
+        cuerpos.append(tipos[tipo](**d))
+    return tuple(cuerpos)
+
+
+def campo(P, cuerpos, calcV=False, calcE=True):
+    """
+    Suma del potencial y el campo de las distribuciones cuerpos en los puntos
+    P (M, 3), con la misma interfaz que nucleo.campo (para paralelo.campo).
+    """
+    V = np.zeros(len(P)) if calcV else None
+    E = np.zeros((len(P), 3)) if calcE else None
+    for c in cuerpos:
+        Vc, Ec = c.campo(P, calcV, calcE)
+        if calcV:
+            V += Vc
+        if calcE:
+            E += Ec
+    return V, E
+
@@ -0,0 +1,354 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Energía potencial electrostática de un sistema de cargas y fuerza sobre
+cada carga.
+
+    U = 1/2 sum_i q_i V_i,    F_i = q_i E_i,
+
+donde V_i y E_i son el potencial y el campo en la carga i de todas las
+demás (sin la interacción de cada carga consigo misma). Dos métodos:
+
+'directo' : todos los pares, con el núcleo de Ef y V (nucleo.campo) por
+    bloques de max_bytes; exacto, de costo N².
+'celdas' : separa 1/r como en malla. La parte erfc(r/sigma)/r se suma
+    exactamente para los pares a menos del radio de corte, que se buscan
+    con una lista de celdas de ese lado (solo las celdas vecinas); la parte
+    suave, de largo alcance, se resuelve en una malla con FFT y se le
+    descuenta la de cada carga consigo misma. De costo del orden de N para
+    cargas repartidas de modo parejo. La malla limita la precisión: el
+    error en la energía, relativo a 1/2 sum_i |q_i V_i| (U puede ser mucho
+    menor, por cancelación), es de hasta 3e-3 con pocas cargas (dos cargas
+    a unos pasos de malla, por ejemplo) y de 2e-4 desde unas mil; el de las
+    fuerzas, relativo a la mayor, de hasta 2e-2 y 1e-3, respectivamente.
+    Conviene desde unas mil cargas.
+'octree' : Barnes-Hut (ver Octree), con ángulo de apertura theta, evaluado
+    en las propias cargas; de costo N log N.
+
+    U, F = energiaYFuerzas(Q, method='celdas')
+"""
+
+import numpy as np
+
+from . import distribuciones
+from . import malla
+from . import nucleo
+from . import perfil
+from .cargas import ChargeSet
+from .octree import Octree
+
+
+# Nodos de la malla por carga en el método de celdas, si no se da el corte:
+# más nodos acortan el corte y la suma de pares, pero agrandan la FFT.
+_NODOS_POR_CARGA = 2
+
+# Bytes por par de cargas en la suma de corto alcance (índices y temporarios).
+_BYTES_PAR = 160
+
+# Desplazamientos de los nodos de depósito (los de malla) y celdas vecinas,
+# de lado la mitad del corte, de la mitad de adelante (cada par de celdas
+# se visita una vez). Con celdas de medio corte se revisa un volumen de
+# 7.8 corte³ por carga en lugar de 13.5 corte³.
+_NODOS = np.array(malla._NODOS)
+
+_VECINAS = np.array([d for d in np.ndindex(5, 5, 5)
+                     if tuple(np.subtract(d, 2)) > (0, 0, 0)]) - 2
+
+
+@perfil.medido
+def energia(Q, method='directo', corte=None, theta=0.5, max_bytes=None):
+    """
+    Energía potencial electrostática del sistema de cargas, en joules.
+
+    Parameters
+    ----------
+    Q : list o ChargeSet
+        Cargas de la forma [q, x, y, z]. Si incluye distribuciones continuas
+        (ver distribuciones), se suma la energía de las cargas puntuales en
+        su potencial, pero no la de las distribuciones entre sí.
+    method : 'directo' (por defecto), 'celdas' u 'octree'
+        Ver el módulo. 'celdas' es aproximado: la energía tiene un error
+        relativo (a 1/2 sum_i |q_i V_i|) de hasta 3e-3 con pocas cargas y
+        2e-4 desde unas mil, y las fuerzas, relativo a la mayor, de hasta
+        2e-2 y 1e-3; 'octree' depende de theta.
+    corte : float (opcional)
+        Radio de corte del método 'celdas', en metros. Por defecto, el que
+        da unos dos nodos de malla por carga en la caja de las cargas (la
+        malla tiene un paso de corte/8).
+    theta : float (opcional)
+        Ángulo de apertura del método 'octree'.
+    max_bytes : int (opcional)
+        Memoria máxima para los temporarios de cada bloque (64 MiB por
+        defecto) y, en 'celdas', para la malla: sin corte se elige uno que
+        entre; si el corte dado la hace más grande, ValueError.
+
+    Returns
+    -------
+    float
+    """
+    return _calcular(Q, True, False, method, corte, theta, max_bytes)[0]
+
+
+@perfil.medido
+def fuerzas(Q, method='directo', corte=None, theta=0.5, max_bytes=None):
+    """
+    Fuerza sobre cada carga puntual, en newtons: array (N, 3).
+
+    Los parámetros son los de energia. Las distribuciones continuas de Q
+    actúan sobre las cargas puntuales, pero no se calcula la fuerza sobre
+    ellas.
+    """
+    return _calcular(Q, False, True, method, corte, theta, max_bytes)[1]
+
+
+@perfil.medido
+def energiaYFuerzas(Q, method='directo', corte=None, theta=0.5, max_bytes=None):
+    """
+    Energía (float) y fuerzas (array (N, 3)) juntas, en un único recorrido de
+    los pares. Los parámetros son los de energia.
+    """
+    return _calcular(Q, True, True, method, corte, theta, max_bytes)
+
+
+def _calcular(Q, calcU, calcF, method, corte, theta, max_bytes):
+    Q = ChargeSet.desde(Q)
+    C = nucleo.cargas(Q)
+    if method == 'directo':
+        U, F = _directo(C, calcU, calcF, max_bytes)
+    elif method == 'celdas':
+        U, F = _celdas(C, calcU, calcF, corte, max_bytes)
+    elif method == 'octree':
+        U, F = _octree(C, calcU, calcF, theta, max_bytes)
+    else:
+        raise ValueError(f"method debe ser 'directo', 'celdas' u 'octree', no {method!r}")
+    if Q.cuerpos and len(C):
+        V, E = distribuciones.campo(C[:, 1:], Q.cuerpos, calcU, calcF)
+        if calcU:
+            U += C[:, 0] @ V
+        if calcF:
+            F += C[:, 0, None] * E
+    return U, F
+
+
+def _directo(C, calcU, calcF, max_bytes):
+    """Energía y fuerzas sumando todos los pares, sin los de cada carga consigo misma."""
+    perfil.contar(len(C), len(C))
+    V, E = nucleo.campo(C[:, 1:], C, calcU, calcF, max_bytes, excluir=0)
+    U = 0.5 * (C[:, 0] @ V) if calcU else None
+    F = C[:, 0, None] * E if calcF else None
+    return U, F
+
+
+def _octree(C, calcU, calcF, theta, max_bytes):
+    """Energía y fuerzas con el octree de las cargas, evaluado en ellas mismas."""
+    perfil.contar(len(C), len(C))
+    V, _, E, _ = Octree(C).campo(C[:, 1:], theta, calcU, calcF, max_bytes, excluir=True)
+    U = 0.5 * (C[:, 0] @ V) if calcU else None
+    F = C[:, 0, None] * E if calcF else None
+    return U, F
+
+
+def _celdas(C, calcU, calcF, corte, max_bytes):
+    """Energía y fuerzas con corto alcance por celdas y largo alcance en una malla."""
+    N = len(C)
+    U = 0.0 if calcU else None
+    F = np.zeros((N, 3)) if calcF else None
+    if N < 2:
+        return U, F
+    if max_bytes is None:
+        max_bytes = nucleo.MAX_BYTES
+    P = C[:, 1:]
+    lo = P.min(axis=0)
+    extension = P.max(axis=0) - lo
+    h = _paso(extension, N, max_bytes) if corte is None else corte / (2 * malla.CORTE)
+    sigma = 2 * h
+    rc = malla.CORTE * sigma
+    n = _nodos(extension, h)
+    if np.prod(n) * malla.BYTES_NODO > max_bytes:
+        raise ValueError(f'Con corte={corte} la malla de {" x ".join(map(str, n))} nodos '
+                         f'necesita unos {np.prod(n) * malla.BYTES_NODO} bytes, más que '
+                         f'max_bytes={int(max_bytes)}: usar un corte mayor o más max_bytes.')
+
+    Uc = _corto_alcance(C, F, lo, rc, sigma, max_bytes)
+    if calcU:
+        U += Uc
+
+    # Largo alcance: la malla cubre a las cargas con dos nodos de margen para
+    # los pesos de Lagrange, corrida medio paso para que las cargas de una
+    # caja plana queden entre nodos, donde la derivada de los pesos es
+    # simétrica.
+    hs = np.full(3, h)
+    o = lo - 2.5 * h
+    Vm, _ = malla.resolver(malla.depositar(C, o, hs, n), hs, sigma, True, False, max_bytes)
+    Ul = _largo_alcance(C[:, 0], (P - o) / h, Vm, h, sigma, F, max_bytes)
+    if calcU:
+        U += Ul
+    return U, F
+
+
+def _paso(extension, N, max_bytes):
+    """
+    Paso de la malla para unos _NODOS_POR_CARGA nodos por carga en la caja
+    (en los ejes en que no es plana), sin que la malla supere max_bytes.
+    """
+    ejes = extension > 0
+    if not ejes.any():
+        return 1.0
+    d = ejes.sum()
+    h = (np.prod(extension[ejes]) / (_NODOS_POR_CARGA * N)) ** (1 / d)
+    # Se agranda h hasta que los nodos quepan.
+    while np.prod(_nodos(extension, h)) * malla.BYTES_NODO > max_bytes:
+        h *= 1.1
+    return h
+
+
+def _nodos(extension, h):
+    """Nodos por eje de la malla de paso h para una caja de lados extension."""
+    return np.ceil(extension / h + 0.5).astype(int) + 5
+
+
+def _largo_alcance(q, s, Vm, h, sigma, F, max_bytes):
+    """
+    Energía de la parte suave, con el potencial Vm de la malla en los nodos
+    de las cargas q en las posiciones s (en pasos); suma sus fuerzas a F (si
+    no es None), en su lugar.
+
+    A cada carga se le descuenta su propio potencial de malla (el de sus 64
+    nodos de depósito en esos mismos nodos), que es más exacto que el límite
+    k q erf(r/sigma)/r para r -> 0. Las fuerzas son el gradiente exacto de
+    esa energía respecto de las posiciones (a través de los pesos de
+    Lagrange), de modo que no hay fuerza de una carga sobre sí misma y la
+    energía se conserva al integrar el movimiento.
+    """
+    a = np.stack(np.meshgrid(_NODOS, _NODOS, _NODOS, indexing='ij'), axis=-1).reshape(-1, 3)
+    R = h * np.sqrt(((a[:, None] - a[None]) ** 2).sum(axis=-1))
+    G = np.full(R.shape, 2 / (sigma * np.sqrt(np.pi)))
+    G[R > 0] = malla.erf(R[R > 0] / sigma) / R[R > 0]
+    G *= nucleo.k
+    desplazamiento = np.ravel_multi_index(tuple(a.T + 1), Vm.shape)
+    Vplano = Vm.reshape(-1)
+
+    energia = 0.0
+    m = max(int(max_bytes) // (8 * 8 * len(a)), 1)
+    for i in range(0, len(q), m):
+        qi = q[i:i+m]
+        i0, w = malla.pesos(s[i:i+m])
+        # Potencial de malla y propio en los 64 nodos de cada carga.
+        Vn = Vplano[np.ravel_multi_index(tuple(i0.T - 1), Vm.shape)[:, None] + desplazamiento]
+        W = _producto(w[:, 0], w[:, 1], w[:, 2])
+        Vn -= qi[:, None] * (W @ G)
+        energia += 0.5 * np.sum(qi * np.einsum('na,na->n', W, Vn))
+        if F is not None:
+            dw = _derivadas(s[i:i+m] - i0) / h
+            for e in range(3):
+                factores = [dw[:, e] if d == e else w[:, d] for d in range(3)]
+                F[i:i+m, e] -= qi * np.einsum('na,na->n', _producto(*factores), Vn)
+    return energia
+
+
+def _producto(wx, wy, wz):
+    """Pesos de los 64 nodos, (N, 64), como producto de los de cada eje (N, 4)."""
+    return (wx[:, :, None, None] * wy[:, None, :, None] * wz[:, None, None, :]).reshape(len(wx), -1)
+
+
+def _derivadas(f):
+    """Derivadas de los pesos de Lagrange de malla.pesos respecto de f: (N, 3, 4)."""
+    return np.stack((-(3*f*f - 6*f + 2) / 6,
+                     (3*f*f - 4*f - 1) / 2,
+                     -(3*f*f - 2*f - 2) / 2,
+                     (3*f*f - 1) / 6), axis=-1)
+
+
+def _corto_alcance(C, F, lo, rc, sigma, max_bytes):
+    """
+    Energía de la parte erfc(r/sigma)/r de los pares a menos de rc; suma sus
+    fuerzas a F (si no es None), en su lugar.
+    """
+    N = len(C)
+    # Celdas de lado rc/2, guardadas solo las ocupadas: las cargas se ordenan
+    # por celda y cada celda es un tramo (inicio, cuenta) del orden.
+    celda = ((C[:, 1:] - lo) // (rc / 2)).astype(np.int64)
+    forma = tuple(celda.max(axis=0) + 1)
+    clave = np.ravel_multi_index(tuple(celda.T), forma)
+    orden = np.argsort(clave, kind='stable')
+    llaves, inicio, cuenta = np.unique(clave[orden], return_index=True, return_counts=True)
+    q, x, y, z = (np.ascontiguousarray(c) for c in C[orden].T)
+    kq = nucleo.k * q
+
+    # Pares de celdas: cada celda consigo misma y con sus vecinas de adelante.
+    ocupadas = np.stack(np.unravel_index(llaves, forma), axis=-1)
+    a, b = [np.arange(len(llaves))], [np.arange(len(llaves))]
+    for d in _VECINAS:
+        vecina = ocupadas + d
+        ok = ((vecina >= 0) & (vecina < forma)).all(axis=1)
+        kv = np.ravel_multi_index(tuple(vecina[ok].T), forma)
+        pos = np.minimum(np.searchsorted(llaves, kv), len(llaves) - 1)
+        hay = llaves[pos] == kv
+        a.append(np.flatnonzero(ok)[hay])
+        b.append(pos[hay])
+    a, b = np.concatenate(a), np.concatenate(b)
+
+    # Cada par de celdas se parte en tramos de filas de a, de modo que cada
+    # tramo tenga a lo sumo m pares de cargas.
+    m = max(int(max_bytes) // _BYTES_PAR, 1)
+    nb = cuenta[b]
+    filas = np.maximum(m // nb, 1)
+    tramos = -(-cuenta[a] // filas)
+    t = np.repeat(np.arange(len(a)), tramos)
+    desde = (np.arange(len(t)) - np.repeat(np.cumsum(tramos) - tramos, tramos)) * filas[t]
+    ia = inicio[a[t]] + desde
+    na = np.minimum(cuenta[a[t]] - desde, filas[t])
+    ib, nb = inicio[b[t]], nb[t]
+    mismas = a[t] == b[t]
+
+    energia = 0.0
+    pares = 0
+    Fo = np.zeros((3, N)) if F is not None else None
+    c = 2 / (sigma * np.sqrt(np.pi))
+    total = na * nb
+    fin = np.cumsum(total)
+    j0 = 0
+    while j0 < len(t):
+        # Tramos consecutivos hasta completar m pares (al menos uno).
+        j1 = max(int(np.searchsorted(fin, fin[j0] - total[j0] + m, 'right')), j0 + 1)
+        cuantos = total[j0:j1]
+        p = np.repeat(np.arange(j0, j1), cuantos)
+        local = np.arange(len(p)) - np.repeat(np.cumsum(cuantos) - cuantos, cuantos)
+        i = ia[p] + local // nb[p]
+        j = ib[p] + local % nb[p]
+        # Dentro de una misma celda, cada par una sola vez y sin i == j.
+        usar = ~mismas[p] | (i < j)
+        i, j = i[usar], j[usar]
+        r = [eje[i] - eje[j] for eje in (x, y, z)]
+        r2 = r[0] * r[0] + r[1] * r[1] + r[2] * r[2]
+        cerca = np.flatnonzero(r2 < rc * rc)
+        i, j, r2 = i[cerca], j[cerca], r2[cerca]
+        pares += len(i)
+        d = np.sqrt(r2)
+        qq = kq[i] * q[j]
+        ec = malla.erfc(d / sigma)
+        energia += np.sum(qq * ec / d)
+        if Fo is not None:
+            w = qq * (ec / d + c * np.exp(-r2 / sigma**2)) / r2
+            for e in range(3):
+                f = w * r[e][cerca]
+                Fo[e] += np.bincount(i, f, N) - np.bincount(j, f, N)
+        j0 = j1
+    if Fo is not None:
+        F[orden] += Fo.T
+    perfil.contar(pares, 1)
+    return energia
@@ -0,0 +1,210 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Campo sobre una grilla fija que se actualiza al modificar algunas cargas.
+
+Como el campo es lineal en las cargas, al cambiar k de ellas basta restar
+su aporte anterior y sumar el nuevo: cada modificación cuesta M*k en lugar
+de M*N. Ambos aportes se calculan en una sola llamada al núcleo, con la
+carga anterior cambiada de signo.
+
+Las distribuciones continuas (ver frautnEM.distribuciones) no se modifican:
+su aporte se calcula una sola vez y se guarda aparte.
+
+    G = FieldGrid(X, Y, 0*X, Q)
+    G.mover(0, 0.5, 0, 0)
+    Ei, Ej, Ek = G.E
+"""
+
+import numpy as np
+
+from . import distribuciones
+from . import nucleo
+from .cargas import ChargeSet
+from .resultados import FieldResult
+
+
+class FieldGrid:
+    """
+    Potencial y campo acumulados de un sistema de cargas en puntos fijos.
+
+    Parameters
+    ----------
+    X, Y, Z : array
+        Puntos de campo, en metros (cualquier forma compatible).
+    Q : list o ChargeSet
+        Q = [
+            [q1,x1,y1,z1],
+            ...
+            [qN,xN,yN,zN]
+        ]
+        Puede incluir distribuciones continuas, que quedan fijas: los
+        índices de mover, cambiarCarga, actualizar y quitar son los de las
+        cargas puntuales.
+    calcV, calcE : bool (opcional)
+        Qué magnitudes mantener.
+    max_bytes : int (opcional)
+        Memoria máxima de los temporarios del núcleo, ver Ef.
+    """
+
+    def __init__(self, X, Y, Z, Q, calcV=True, calcE=True, max_bytes=None):
+        self.X, self.Y, self.Z = np.broadcast_arrays(X, Y, Z)
+        self.shape, self.P = nucleo.puntos(X, Y, Z)
+        self.calcV, self.calcE = calcV, calcE
+        self.max_bytes = max_bytes
+        Q = ChargeSet.desde(Q)
+        self._C = np.array(Q.C)
+        self._cuerpos = ()
+        self._fijo = (np.zeros(len(self.P)) if calcV else None,
+                      np.zeros((len(self.P), 3)) if calcE else None)
+        self._agregarCuerpos(Q.cuerpos)
+        self.recalcular()
+
+    def recalcular(self):
+        """Recalcula todo el campo (descarta el error de redondeo acumulado)."""
+        self._V, self._E = nucleo.campo(self.P, self._C, self.calcV, self.calcE,
+                                        self.max_bytes)
+        self._sumarFijo()
+
+    def _agregarCuerpos(self, cuerpos):
+        """Suma el aporte de las distribuciones cuerpos al aporte fijo; devuelve ese aporte."""
+        if not cuerpos:
+            return None, None
+        V, E = distribuciones.campo(self.P, cuerpos, self.calcV, self.calcE)
+        if self.calcV:
+            self._fijo[0][:] += V
+        if self.calcE:
+            self._fijo[1][:] += E
+        self._cuerpos += tuple(cuerpos)
+        return V, E
+
+    def _sumarFijo(self, puntos=slice(None)):
+        if not self._cuerpos:
+            return
+        if self.calcV:
+            self._V[puntos] += self._fijo[0][puntos]
+        if self.calcE:
+            self._E[puntos] += self._fijo[1][puntos]
+
+    def _sumar(self, C, puntos=None):
+        """Suma el aporte de las cargas C en todos los puntos (o en los índices puntos)."""
+        if puntos is None:
+            nucleo.campo(self.P, C, self.calcV, self.calcE, self.max_bytes,
+                         out=(self._V, self._E), acumular=True)
+            return
+        V, E = nucleo.campo(self.P[puntos], C, self.calcV, self.calcE, self.max_bytes)
+        if self.calcV:
+            self._V[puntos] += V
+        if self.calcE:
+            self._E[puntos] += E
+
+    def _corregir(self):
+        # Si una carga estuvo sobre un punto de la grilla, allí quedó inf o nan
+        # y la resta no lo deshace: esos puntos se recalculan completos.
+        malo = np.zeros(len(self.P), dtype=bool)
+        if self.calcV:
+            malo |= ~np.isfinite(self._V)
+        if self.calcE:
+            malo |= ~np.isfinite(self._E).all(axis=1)
+        if malo.any():
+            puntos = np.nonzero(malo)[0]
+            if self.calcV:
+                self._V[puntos] = 0
+            if self.calcE:
+                self._E[puntos] = 0
+            self._sumar(self._C, puntos)
+            self._sumarFijo(puntos)
+
+    def actualizar(self, i, nuevas):
+        """
+        Reemplaza las cargas de índices i por nuevas (filas [q, x, y, z]).
+
+        Cuesta M*k para k cargas modificadas.
+        """
+        i = np.atleast_1d(i)
+        nuevas = ChargeSet.desde(nuevas)
+        if nuevas.cuerpos:
+            raise ValueError('Solo se pueden reemplazar cargas puntuales; '
+                             'las distribuciones se agregan con agregar.')
+        nuevas = nuevas.C
+        viejas = self._C[i].copy()
+        viejas[:, 0] *= -1
+        self._C[i] = nuevas
+        self._sumar(np.concatenate((viejas, nuevas)))
+        self._corregir()
+
+    def mover(self, i, x, y, z):
+        """Mueve las cargas de índices i a las posiciones (x, y, z)."""
+        i = np.atleast_1d(i)
+        nuevas = self._C[i].copy()
+        nuevas[:, 1], nuevas[:, 2], nuevas[:, 3] = x, y, z
+        self.actualizar(i, nuevas)
+
+    def cambiarCarga(self, i, q):
+        """Cambia el valor de las cargas de índices i a q (en coulomb)."""
+        i = np.atleast_1d(i)
+        nuevas = self._C[i].copy()
+        nuevas[:, 0] = q
+        self.actualizar(i, nuevas)
+
+    def agregar(self, Q):
+        """Agrega las cargas Q (y sus distribuciones, que quedan fijas)."""
+        Q = ChargeSet.desde(Q)
+        nuevas = Q.C
+        self._C = np.concatenate((self._C, nuevas))
+        self._sumar(nuevas)
+        V, E = self._agregarCuerpos(Q.cuerpos)
+        if self.calcV and V is not None:
+            self._V += V
+        if self.calcE and E is not None:
+            self._E += E
+        self._corregir()
+
+    def quitar(self, i):
+        """Quita las cargas de índices i."""
+        i = np.atleast_1d(i)
+        viejas = self._C[i].copy()
+        viejas[:, 0] *= -1
+        self._C = np.delete(self._C, i, axis=0)
+        self._sumar(viejas)
+        self._corregir()
+
+    @property
+    def Q(self):
+        """Las cargas actuales."""
+        return ChargeSet.desdeArreglos(self._C[:, 0], self._C[:, 1:], self._cuerpos)
+
+    @property
+    def V(self):
+        """Potencial en Volt, con la forma de los puntos."""
+        return None if self._V is None else nucleo.forma(self._V.copy(), self.shape)
+
+    @property
+    def E(self):
+        """Componentes (Ei, Ej, Ek) del campo en N/C, con la forma de los puntos."""
+        if self._E is None:
+            return None
+        return tuple(nucleo.forma(self._E[:, j].copy(), self.shape) for j in range(3))
+
+    def resultado(self, **meta):
+        """Copia del estado actual como FieldResult."""
+        Ei, Ej, Ek = self.E if self.calcE else (None, None, None)
+        return FieldResult(self.X, self.Y, self.Z, V=self.V, Ei=Ei, Ej=Ej, Ek=Ek,
+                           Q=self.Q, meta=meta)
+
+    def __len__(self):
+        return len(self._C)
@@ -0,0 +1,284 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Trazado de líneas de campo eléctrico, sin grilla.
+
+Las líneas parten de pequeñas esferas (o circunferencias, en un plano)
+alrededor de cada carga positiva, en cantidad proporcional a |q|, y se
+integran todas a la vez con Runge-Kutta 4(5) de Dormand-Prince, con paso
+adaptativo propio de cada línea, siguiendo la dirección del campo evaluado
+directamente en cada punto. Una línea termina al llegar a una carga
+negativa, al salir de la caja, en un punto de campo nulo o al superar el
+largo máximo.
+"""
+
+import numpy as np
+
+from . import distribuciones
+from . import multipolos
+from . import nucleo
+from . import perfil
+from .cargas import ChargeSet
+from .octree import Octree
+
+
+# Tablero de Dormand-Prince: nodos intermedios y pesos de orden 5 y 4.
+_A = (
+    (),
+    (1/5,),
+    (3/40, 9/40),
+    (44/45, -56/15, 32/9),
+    (19372/6561, -25360/2187, 64448/6561, -212/729),
+    (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+    (35/384, 0, 500/1113, 125/192, -2187/6784, 11/84),
+)
+_B5 = np.array((35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0))
+_B4 = np.array((5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40))
+
+# Paso máximo, relativo a la diagonal de la caja, para que las polilíneas
+# se vean suaves.
+PASO_MAXIMO = 0.02
+
+
+@perfil.medido
+def lineasDeCampo(Q, n=16, caja=None, plano=None, radio=None, tol=1e-4, largo=None,
+                  pasos=5000, method='directo', theta=0.5, max_bytes=None):
+    """
+    Líneas de campo eléctrico de las cargas Q, como polilíneas.
+
+    Parameters
+    ----------
+    Q : list o ChargeSet
+        Q = [
+            [q1,x1,y1,z1],
+            ...
+            [qN,xN,yN,zN]
+        ]
+    n : int (opcional)
+        Líneas que salen de la carga de mayor |q|; de las demás salen en
+        proporción a |q| (al menos una). Si no hay cargas positivas, las
+        líneas se trazan hacia atrás desde las negativas (y se devuelven
+        invertidas, en el sentido del campo). Las líneas parten
+        solo de cargas puntuales, pero siguen también el campo de las
+        distribuciones continuas de Q.
+    caja : array (2, 3) (opcional)
+        [[xmin, ymin, zmin], [xmax, ymax, zmax]]. Por defecto, la caja de
+        las cargas con un margen igual a su tamaño (al menos 1 m).
+    plano : tuple (opcional)
+        (eje, valor), por ejemplo ('z', 0): las líneas salen de
+        circunferencias en ese plano, alrededor de las cargas que están en
+        él, y siguen solo las componentes del campo en el plano (como
+        streamplot).
+    radio : float (opcional)
+        Radio de las esferas de partida y de llegada a las cargas. Por
+        defecto, 1% de la diagonal de la caja.
+    tol : float (opcional)
+        Error por paso admitido, relativo a la diagonal de la caja.
+    largo : float (opcional)
+        Largo máximo de cada línea; por defecto, tres diagonales de la caja.
+    pasos : int (opcional)
+        Cantidad máxima de pasos.
+    method, theta, max_bytes : (opcional)
+        Cálculo del campo: 'directo', 'octree' o 'multipolo', ver Ef.
+
+    Returns
+    -------
+    list de arrays (k, 3)
+        Los puntos de cada línea, en el sentido del campo.
+    """
+    Q = ChargeSet.desde(Q)
+    if caja is None:
+        caja = Q.caja
+        margen = np.maximum((caja[1] - caja[0]).max(), 1)
+        caja = np.stack((caja[0] - margen, caja[1] + margen))
+    caja = np.asarray(caja, dtype=float)
+    diagonal = np.linalg.norm(caja[1] - caja[0])
+    if radio is None:
+        radio = 0.01 * diagonal
+    if largo is None:
+        largo = 3 * diagonal
+    normal = None if plano is None else 'xyz'.index(plano[0])
+
+    C = Q.C
+    if normal is not None:
+        # Solo las cargas del plano son fuentes y sumideros de las líneas.
+        enPlano = np.abs(C[:, normal + 1] - plano[1]) < radio
+    else:
+        enPlano = np.ones(len(C), dtype=bool)
+    sentido = 1 if (Q.positivas & enPlano).any() else -1
+    fuentes = C[(sentido * C[:, 0] > 0) & enPlano]
+    sumideros = C[(sentido * C[:, 0] < 0) & enPlano][:, 1:]
+    if len(fuentes) == 0:
+        return []
+
+    y = _semillas(fuentes, n, radio, normal)
+    if normal is not None:
+        y[:, normal] = plano[1]
+    campo = _campo(Q, method, theta, max_bytes)
+
+    def direccion(P):
+        E = campo(P)
+        if normal is not None:
+            E[:, normal] = 0
+        modulo = np.sqrt(np.einsum('ij,ij->i', E, E))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            d = sentido * E / modulo[:, None]
+        nulo = ~np.isfinite(d).all(axis=1) | (modulo == 0)
+        d[nulo] = 0
+        return d, nulo
+
+    L = len(y)
+    ids = np.arange(L)
+    h = np.full(L, radio)
+    hmax = PASO_MAXIMO * diagonal
+    recorrido = np.zeros(L)
+    historia = [(ids, y.copy())]
+    k1, terminadas = direccion(y)
+    atol = tol * diagonal
+
+    for _ in range(pasos):
+        vivas = ~terminadas
+        ids, y, h, recorrido, k1 = ids[vivas], y[vivas], h[vivas], recorrido[vivas], k1[vivas]
+        if len(ids) == 0:
+            break
+        # No saltear un sumidero en un paso.
+        if len(sumideros):
+            dist = _distanciaMinima(y, sumideros, max_bytes)
+            h = np.minimum(h, np.maximum(dist, radio))
+        k = [k1]
+        for a in _A[1:]:
+            yi = y + h[:, None] * sum(aj * kj for aj, kj in zip(a, k) if aj)
+            ki, _ = direccion(yi)
+            k.append(ki)
+        y5 = yi  # La última etapa se evalúa en la solución de orden 5.
+        err = h * np.linalg.norm(sum((b5 - b4) * ki for b5, b4, ki in zip(_B5, _B4, k)), axis=1)
+        ok = err <= atol
+        factor = np.clip(0.9 * (atol / np.maximum(err, 1e-300))**0.2, 0.2, 5)
+        recorrido = recorrido + np.where(ok, h, 0)
+        anterior = y
+        y = np.where(ok[:, None], y5, y)
+        k1 = np.where(ok[:, None], k[-1], k1)
+        h = np.minimum(h * factor, hmax)
+
+        # Terminaciones (solo de los pasos aceptados): fuera de la caja (se
+        # corta el último tramo en el borde), demasiado largas, en un punto
+        # de campo nulo o en un sumidero.
+        fuera = ok & ((y < caja[0]) | (y > caja[1])).any(axis=1)
+        if fuera.any():
+            y[fuera] = _recortar(anterior[fuera], y[fuera], caja)
+        historia.append((ids[ok], y[ok]))
+        terminadas = ok & (fuera | (recorrido > largo) | (np.abs(k1).sum(axis=1) == 0))
+        if len(sumideros):
+            j, dist = _masCercano(y, sumideros, max_bytes)
+            llega = ok & (dist < radio)
+            historia.append((ids[llega], sumideros[j[llega]]))
+            terminadas |= llega
+
+    todos = np.concatenate([i for i, _ in historia])
+    puntos = np.concatenate([p for _, p in historia])
+    orden = np.argsort(todos, kind='stable')
+    cortes = np.cumsum(np.bincount(todos, minlength=L))[:-1]
+    # Las líneas trazadas hacia atrás, desde las negativas, se invierten.
+    return [l[::sentido] for l in np.split(puntos[orden], cortes) if len(l) > 1]
+
+
+def _semillas(fuentes, n, radio, normal):
+    """Puntos de partida sobre esferas (o circunferencias) alrededor de las fuentes."""
+    q = np.abs(fuentes[:, 0])
+    cantidad = np.maximum(np.rint(n * q / q.max()).astype(int), 1)
+    semillas = []
+    for c, m in zip(fuentes[:, 1:], cantidad):
+        i = np.arange(m) + 0.5
+        if normal is None:
+            # Puntos de Fibonacci, casi uniformes sobre la esfera.
+            fi = np.arccos(1 - 2 * i / m)
+            th = np.pi * (1 + 5**0.5) * i
+            d = np.stack((np.cos(th) * np.sin(fi), np.sin(th) * np.sin(fi), np.cos(fi)), axis=-1)
+        else:
+            th = 2 * np.pi * i / m
+            u, v = (e for e in range(3) if e != normal)
+            d = np.zeros((m, 3))
+            d[:, u], d[:, v] = np.cos(th), np.sin(th)
+        semillas.append(c + radio * d)
+    return np.concatenate(semillas)
+
+
+def _recortar(p0, p1, caja):
+    """Punto donde el segmento p0 -> p1 (p0 dentro de la caja) sale de ella."""
+    d = p1 - p0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(p1 > caja[1], (caja[1] - p0) / d, np.inf)
+        t = np.minimum(t, np.where(p1 < caja[0], (caja[0] - p0) / d, np.inf))
+    t = np.clip(t.min(axis=1), 0, 1)
+    return p0 + t[:, None] * d
+
+
+def _campo(Q, method, theta, max_bytes):
+    """Función que devuelve el campo (M, 3) en los puntos P (M, 3)."""
+    if method == 'directo':
+        C = Q.C
+        trabajo = nucleo.Trabajo.para(64 * 1024, len(C), max_bytes)
+        puntuales = lambda P: nucleo.campo(P, C, False, True, max_bytes, trabajo=trabajo)[1]
+    elif method == 'octree':
+        arbol = Octree(Q)
+        puntuales = lambda P: arbol.campo(P, theta, False, True, max_bytes)[2]
+    elif method == 'multipolo':
+        desarrollo = multipolos.Desarrollo(Q)
+        puntuales = lambda P: desarrollo.campo(P, False, True, max_bytes)[1]
+    else:
+        raise ValueError(f"method debe ser 'directo', 'octree' o 'multipolo', no {method!r}")
+    N = len(Q.C) + len(Q.cuerpos)
+
+    def campo(P):
+        perfil.contar(len(P), N)
+        E = puntuales(P)
+        if Q.cuerpos:
+            E = E + distribuciones.campo(P, Q.cuerpos)[1]
+        return E
+
+    return campo
+
+
+def _masCercano(P, S, max_bytes=None):
+    """
+    Índice y distancia del punto de S más cercano a cada punto de P.
+
+    Las distancias se calculan por bloques de pares, como en nucleo.campo,
+    con a lo sumo max_bytes de temporarios.
+    """
+    M, N = len(P), len(S)
+    m, n = nucleo.bloques(M, N, max_bytes, temporarios=2)
+    j = np.zeros(M, dtype=int)
+    d2 = np.full(M, np.inf)
+    for a in range(0, M, m):
+        for b in range(0, N, n):
+            d = np.subtract.outer(P[a:a+m, 0], S[b:b+n, 0])
+            bloque = d * d
+            for c in (1, 2):
+                np.subtract.outer(P[a:a+m, c], S[b:b+n, c], out=d)
+                d *= d
+                bloque += d
+            k = bloque.argmin(axis=1)
+            minimo = bloque[np.arange(len(k)), k]
+            mejor = minimo < d2[a:a+m]
+            j[a:a+m][mejor] = k[mejor] + b
+            d2[a:a+m][mejor] = minimo[mejor]
+    return j, np.sqrt(d2)
+
+
+def _distanciaMinima(P, S, max_bytes=None):
+    return _masCercano(P, S, max_bytes)[1]
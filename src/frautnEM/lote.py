@@ -0,0 +1,166 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Gráficos en lote, en archivos, sin pantalla.
+
+Cada trabajo es un diccionario con el nombre del gráfico de puntuales, sus
+argumentos y el archivo a escribir (PNG, SVG o lo que admita savefig según
+la extensión):
+
+    trabajos = [
+        {'grafico': 'plotEfvector3d', 'Q': Q, 'params': {'w': 20}, 'archivo': 'campo.png'},
+        {'grafico': 'equipotencialesPuntuales', 'Q': Q, 'params': {'EF': True},
+         'archivo': 'equipotenciales.svg'},
+        {'grafico': 'plotEfVector', 'args': (Q, X), 'archivo': 'vectores.png'},
+    ]
+    informe = renderizar(trabajos, workers=4)
+
+Los trabajos se reparten en un pool de procesos con el backend Agg. Cada
+proceso dibuja siempre en la misma Figure, que no pasa por pyplot: se vacía
+antes de cada gráfico y después de guardarlo, de modo que no se acumulan
+figuras ni estado de pyplot por más trabajos que haya.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.figure import Figure
+
+from . import paralelo
+from . import puntuales
+from . import volumen
+from .resultados import FieldResult
+
+
+# Gráficos cuyo campo se calcula aparte, para medirlo: la función que
+# devuelve el FieldResult que el gráfico acepta en lugar de Q.
+_CALCULOS = {'plotEf': 'calcularEf',
+             'plotEfvector3d': 'calcularEfvector3d',
+             'equipotencialesPuntuales': 'calcularEquipotenciales'}
+
+# La figura que reutiliza cada proceso.
+_figura = None
+
+
+def renderizar(trabajos, workers=None, dpi=100):
+    """
+    Dibuja los trabajos en sus archivos.
+
+    Parameters
+    ----------
+    trabajos : list de dict
+        Cada uno con las claves:
+        grafico : nombre de un gráfico de puntuales ('plotEf',
+            'plotEfvector3d', 'equipotencialesPuntuales', 'plotEfVector',
+            'plotEfcontribuciones', 'plotEfVectorHilo').
+        args : tuple con los argumentos posicionales del gráfico, o Q
+            cuando el único es la distribución de cargas.
+        params : dict (opcional) con los demás parámetros del gráfico.
+        archivo : str, donde se guarda la figura.
+        dpi : (opcional) resolución de este trabajo.
+    workers : int (opcional)
+        Procesos del pool (ver paralelo.trabajadores); con 1 (por defecto)
+        se dibuja en este proceso, también sin pyplot.
+    dpi : float (opcional)
+        Resolución de las imágenes.
+
+    Returns
+    -------
+    list de dict
+        Por cada trabajo, en el mismo orden: archivo, grafico, calculo y
+        dibujo (segundos de cálculo del campo y de dibujo y guardado) y
+        error (None, o el mensaje si el trabajo falló; los demás siguen).
+        El cálculo es el del FieldResult de plotEf, plotEfvector3d y
+        equipotencialesPuntuales, que se hace antes de dibujar, más el de
+        las funciones de campo recibidas como argumento; el de los demás
+        gráficos, de pocos puntos, queda en el dibujo.
+    """
+    trabajos = [dict(t, dpi=t.get('dpi', dpi)) for t in trabajos]
+    n = min(paralelo.trabajadores(workers), max(len(trabajos), 1))
+    if n == 1:
+        return [_renderizar(t) for t in trabajos]
+    with ProcessPoolExecutor(n, initializer=_iniciar) as pool:
+        return list(pool.map(_renderizar, trabajos))
+
+
+def _iniciar():
+    """Inicializa un proceso del pool: sin pantalla."""
+    matplotlib.use('Agg', force=True)
+
+
+def _renderizar(trabajo):
+    """Un trabajo: calcula, dibuja en la figura del proceso y la guarda."""
+    global _figura
+    if _figura is None:
+        _figura = Figure()
+    informe = {'archivo': trabajo['archivo'], 'grafico': trabajo['grafico'],
+               'calculo': 0.0, 'dibujo': 0.0, 'error': None}
+    reloj = _Reloj()
+    try:
+        grafico = getattr(puntuales, trabajo['grafico'])
+        params = dict(trabajo.get('params', {}), figura=_figura, mostrar=False)
+        args = trabajo['args'] if 'args' in trabajo else (trabajo['Q'],)
+        # Las funciones de campo que recibe el gráfico (plotEfcontribuciones,
+        # plotEfVectorHilo) se cronometran como cálculo; el Ef de puntuales
+        # no, para que el gráfico lo reconozca y use su camino rápido.
+        args = tuple(_Cronometrada(a, reloj) if callable(a) and a is not puntuales.Ef else a
+                     for a in args)
+
+        inicio = time.perf_counter()
+        args = _calcular(trabajo['grafico'], args, params)
+        informe['calculo'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        reloj.total = 0.0
+        grafico(*args, **params)
+        _figura.savefig(trabajo['archivo'], dpi=trabajo['dpi'])
+        informe['dibujo'] = time.perf_counter() - inicio - reloj.total
+        informe['calculo'] += reloj.total
+    except Exception as e:
+        informe['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        _figura.clear()
+    return informe
+
+
+def _calcular(grafico, args, params):
+    """Los argumentos con el campo ya calculado, si el gráfico lo permite."""
+    calculo = _CALCULOS.get(grafico)
+    if (calculo is None or len(args) != 1
+            or isinstance(args[0], (FieldResult, volumen.Volumen))
+            or (grafico == 'plotEf' and params.get('trazador', False))):
+        return args
+    return (getattr(puntuales, calculo)(args[0], **params),)
+
+
+class _Reloj:
+    total = 0.0
+
+
+class _Cronometrada:
+    """Una función que suma a reloj.total el tiempo de sus llamadas."""
+
+    def __init__(self, funcion, reloj):
+        self.funcion, self.reloj = funcion, reloj
+
+    def __call__(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self.funcion(*args, **kwargs)
+        finally:
+            self.reloj.total += time.perf_counter() - inicio
@@ -0,0 +1,220 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Selección de las flechas a dibujar en gráficos vectoriales grandes.
+
+Separa la resolución del cálculo de la del dibujo: de una grilla (o de los
+planos de corte de una grilla) se elige a lo sumo una cantidad dada de
+puntos, repartidos uniformemente (estratificado) o con más densidad donde
+el campo es más intenso (modulo), y se descartan los que quedan ocultos
+dentro de las esferas de las cargas. Las cargas de un cuerpo extenso
+también se pueden agrupar por celdas, para dibujar una flecha por grupo.
+"""
+
+import numpy as np
+
+from . import nucleo
+
+
+def estratificado(forma, flechas, rng=None):
+    """
+    Índices planos (ordenados) de flechas puntos de una grilla de la forma
+    dada, o de todos si son menos.
+
+    La grilla se divide en K <= flechas bloques casi iguales, con la
+    cantidad de bloques por eje proporcional a su largo, y de cada bloque
+    se toma un punto al azar: la muestra cubre toda la grilla sin los
+    patrones de una decimación regular. Las flechas - K restantes son un
+    segundo punto de otros tantos bloques elegidos al azar.
+    """
+    rng = np.random.default_rng(rng)
+    forma = tuple(int(n) for n in forma)
+    total = int(np.prod(forma))
+    if flechas >= total:
+        return np.arange(total)
+    if flechas <= 0:
+        return np.zeros(0, dtype=np.intp)
+    k = _bloques(forma, flechas)
+    bordes = [np.linspace(0, n, ki + 1).astype(int) for n, ki in zip(forma, k)]
+    inicio = np.meshgrid(*[b[:-1] for b in bordes], indexing='ij')
+    lado = np.meshgrid(*[np.diff(b) for b in bordes], indexing='ij')
+    inicio = np.stack([a.ravel() for a in inicio])
+    lado = np.stack([a.ravel() for a in lado])
+    # Posición al azar dentro de cada bloque, como índice plano local.
+    tamano = lado.prod(axis=0)
+    local = (rng.random(tamano.shape) * tamano).astype(int)
+    idx = [_punto(inicio, lado, local)]
+
+    sobran = flechas - len(tamano)
+    dobles = np.flatnonzero(tamano > 1)
+    if sobran > 0 and len(dobles):
+        b = rng.choice(dobles, min(sobran, len(dobles)), replace=False)
+        # Otro punto del bloque, distinto del primero.
+        otro = (rng.random(len(b)) * (tamano[b] - 1)).astype(int)
+        otro += otro >= local[b]
+        idx.append(_punto(inicio[:, b], lado[:, b], otro))
+    return np.sort(np.concatenate([np.ravel_multi_index(tuple(i), forma) for i in idx]))
+
+
+def _bloques(forma, flechas):
+    """
+    Bloques por eje (a lo sumo el largo de cada eje), proporcionales a los
+    largos, con el mayor producto que no supera flechas.
+    """
+    n = np.array(forma)
+    # Los ejes demasiado cortos para un bloque entero quedan en uno, y la
+    # escala se reparte entre los demás.
+    libres = np.ones(len(n), dtype=bool)
+    while True:
+        escala = (flechas / n[libres].prod()) ** (1 / libres.sum())
+        cortos = libres & (n * escala < 1)
+        if not cortos.any():
+            break
+        libres &= ~cortos
+    k = np.where(libres, np.clip(np.floor(n * escala).astype(int), 1, n), 1)
+    # Se agrega un bloque por vez al eje de bloques más largos, mientras
+    # quepa.
+    while True:
+        candidatos = [i for i in np.argsort(-n / k, kind='stable')
+                      if k[i] < n[i] and k.prod() // k[i] * (k[i] + 1) <= flechas]
+        if not candidatos:
+            return k
+        k[candidatos[0]] += 1
+
+
+def _punto(inicio, lado, local):
+    """Coordenadas (ndim, K) del punto de índice plano local en cada bloque."""
+    coord = np.empty_like(inicio)
+    for e in range(len(lado) - 1, -1, -1):
+        local, resto = np.divmod(local, lado[e])
+        coord[e] = inicio[e] + resto
+    return coord
+
+
+def porModulo(modulo, flechas, rng=None):
+    """
+    Índices de a lo sumo flechas puntos, elegidos con probabilidad creciente
+    con el módulo del campo.
+
+    El peso es log(1 + |E|/mediana(|E|)): favorece las zonas de campo
+    intenso sin que todas las flechas se junten sobre las cargas, donde el
+    módulo diverge.
+    """
+    rng = np.random.default_rng(rng)
+    modulo = np.asarray(modulo, dtype=float).ravel()
+    validos = np.nonzero(np.isfinite(modulo) & (modulo > 0))[0]
+    if flechas >= len(validos):
+        return validos
+    m = modulo[validos]
+    w = np.log1p(m / np.median(m))
+    return np.sort(rng.choice(validos, flechas, replace=False, p=w / w.sum()))
+
+
+def visibles(P, C, radio, max_bytes=None):
+    """
+    Máscara de los puntos P (M, 3) que no están dentro de las esferas de las
+    cargas C, calculada por bloques de pares como en nucleo.campo.
+    """
+    P = np.asarray(P, dtype=float).reshape(-1, 3)
+    R = np.asarray(C, dtype=float).reshape(-1, 4)[:, 1:]
+    ok = np.ones(len(P), dtype=bool)
+    m, n = nucleo.bloques(len(P), len(R), max_bytes, temporarios=2)
+    for a in range(0, len(P), m):
+        for b in range(0, len(R), n):
+            d = np.subtract.outer(P[a:a+m, 0], R[b:b+n, 0])
+            d2 = d * d
+            for e in (1, 2):
+                np.subtract.outer(P[a:a+m, e], R[b:b+n, e], out=d)
+                d *= d
+                d2 += d
+            ok[a:a+m] &= (d2 > radio * radio).all(axis=1)
+    return ok
+
+
+def plano(ejes, eje, valor):
+    """
+    Forma e índices planos del plano de la grilla (con los ejes dados, en el
+    orden de np.mgrid) más cercano a eje = valor, por ejemplo ('z', 0).
+    """
+    forma = tuple(len(e) for e in ejes)
+    i = 'xyz'.index(eje)
+    s = [slice(None)] * 3
+    s[i] = np.abs(np.asarray(ejes[i]) - valor).argmin()
+    ind = np.arange(int(np.prod(forma))).reshape(forma)[tuple(s)]
+    return ind.shape, ind.ravel()
+
+
+def seleccionar(ejes, flechas=None, planos=None, modo='estratificado', modulo=None, rng=None):
+    """
+    Índices planos de los puntos a dibujar de una grilla 3D con los ejes dados.
+
+    Parameters
+    ----------
+    ejes : tuple de 3 arrays
+        Valores de x, y, z de la grilla (en el orden de np.mgrid).
+    flechas : int (opcional)
+        Cantidad máxima de puntos; sin ella se toman todos los candidatos.
+    planos : list de (eje, valor) (opcional)
+        Solo se consideran los puntos de estos planos de corte; las flechas
+        se reparten por igual entre ellos.
+    modo : 'estratificado' o 'modulo'
+        Ver estratificado() y porModulo().
+    modulo : array (opcional)
+        Módulo del campo en toda la grilla (aplanado), para modo='modulo'.
+    """
+    if modo not in ('estratificado', 'modulo'):
+        raise ValueError(f"muestreo debe ser 'estratificado' o 'modulo', no {modo!r}")
+    if modo == 'modulo' and flechas is not None and modulo is None:
+        raise ValueError("muestreo='modulo' requiere el módulo del campo en la grilla")
+    rng = np.random.default_rng(rng)
+    forma = tuple(len(e) for e in ejes)
+    if planos:
+        grupos = [plano(ejes, eje, valor) for eje, valor in planos]
+    else:
+        grupos = [(forma, np.arange(int(np.prod(forma))))]
+    sel = []
+    for f, ind in grupos:
+        if flechas is None:
+            sel.append(ind)
+        elif modo == 'estratificado':
+            sel.append(ind[estratificado(f, max(flechas // len(grupos), 1), rng)])
+        else:
+            sel.append(ind[porModulo(np.asarray(modulo).ravel()[ind],
+                                     max(flechas // len(grupos), 1), rng)])
+    return np.unique(np.concatenate(sel))
+
+
+def agrupar(P, celdas):
+    """
+    Agrupa los puntos P (M, 3) en una grilla de celdas cúbicas, con a lo sumo
+    celdas por eje sobre la caja de los puntos.
+
+    Devuelve la etiqueta (0 a G-1) del grupo de cada punto y la cantidad G
+    de grupos, es decir, de celdas no vacías.
+    """
+    P = np.asarray(P, dtype=float).reshape(-1, 3)
+    if len(P) == 0:
+        return np.zeros(0, dtype=int), 0
+    lo, hi = P.min(axis=0), P.max(axis=0)
+    lado = (hi - lo).max() / celdas
+    if lado == 0:
+        return np.zeros(len(P), dtype=int), 1
+    forma = np.minimum((hi - lo) / lado, celdas - 1).astype(int) + 1
+    ind = np.minimum(((P - lo) / lado).astype(int), forma - 1)
+    _, etiquetas = np.unique(np.ravel_multi_index(tuple(ind.T), forma), return_inverse=True)
+    etiquetas = etiquetas.ravel()
+    return etiquetas, int(etiquetas.max()) + 1
@@ -0,0 +1,283 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Desarrollo multipolar cartesiano de un grupo de cargas.
+
+Con y = s - c la posición de cada carga respecto del centro c y x = r - c
+la del punto de campo,
+
+    V(r) = k * sum_a M_a * a_a(x),     M_a = sum_j q_j * y_j**a,
+
+donde a recorre los multi-índices (a1, a2, a3) con |a| <= p y a_a(x) son
+los coeficientes de Taylor de 1/|x - y| en y = 0, que se obtienen con la
+recurrencia
+
+    |a| |x|**2 a_a - (2|a| - 1) sum_i x_i a_(a-e_i) + (|a| - 1) sum_i a_(a-2e_i) = 0.
+
+Truncar en el orden p equivale a truncar la serie de Legendre en l = p,
+por lo que para t = a/d < 1 (a: radio del grupo, d: distancia al centro)
+vale la cota del error que calcula cota().
+
+Desarrollo aplica el desarrollo de todas las cargas a los puntos lejanos,
+eligiendo el orden y el radio a partir de una tolerancia.
+"""
+
+import numpy as np
+
+from . import nucleo
+
+
+# Orden máximo de Desarrollo.
+ORDEN_MAXIMO = 8
+
+# Error relativo admitido por defecto en Desarrollo.
+TOL = 1e-6
+
+# Costo de evaluar un coeficiente del desarrollo en un punto, relativo al de
+# sumar una carga directamente.
+_COSTO = 4
+
+# Direcciones en que se mide el tamaño de cada orden del desarrollo.
+_DIRECCIONES = 64
+
+
+def indices(p):
+    """Multi-índices (a1, a2, a3) con a1 + a2 + a3 <= p, ordenados por grado."""
+    return [(a1, n - a1 - a3, a3)
+            for n in range(p + 1)
+            for a1 in range(n, -1, -1)
+            for a3 in range(n - a1 + 1)]
+
+
+def momentos(q, y, p, grupo=None, n=None):
+    """
+    Momentos M_a = sum q * y**a para |a| <= p.
+
+    Parameters
+    ----------
+    q : array (N,)
+        Cargas.
+    y : array (N, 3)
+        Posiciones de las cargas respecto del centro del desarrollo.
+    p : int
+        Orden del desarrollo.
+    grupo : array (N,) de enteros (opcional)
+        Grupo al que pertenece cada carga. Si se informa, se devuelven los
+        momentos de los n grupos, de forma (n, nm); si no, de forma (nm,).
+    """
+    M = []
+    for a in indices(p):
+        w = q * y[:, 0]**a[0] * y[:, 1]**a[1] * y[:, 2]**a[2]
+        M.append(w.sum() if grupo is None else np.bincount(grupo, w, n))
+    return np.array(M).T
+
+
+def coeficientes(x, p):
+    """
+    Coeficientes de Taylor a_a(x) de 1/|x - y| para |a| <= p.
+
+    Devuelve un diccionario {a: array (K,)} para los K puntos x de forma (K, 3).
+    """
+    r2 = np.einsum('ki,ki->k', x, x)
+    a = {(0, 0, 0): 1 / np.sqrt(r2)}
+    e = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+    for alfa in indices(p)[1:]:
+        n = sum(alfa)
+        s1 = 0
+        s2 = 0
+        for i in range(3):
+            if alfa[i] >= 1:
+                s1 = s1 + x[:, i] * a[_menos(alfa, e[i])]
+            if alfa[i] >= 2:
+                s2 = s2 + a[_menos(alfa, e[i], 2)]
+        a[alfa] = ((2*n - 1) * s1 - (n - 1) * s2) / (n * r2)
+    return a
+
+
+def evaluar(M, x, p, calcV=False, calcE=True):
+    """
+    Potencial y campo del desarrollo de orden p en los puntos x.
+
+    M es de forma (nm,) o (K, nm) (un juego de momentos por punto); x es de
+    forma (K, 3) y se mide desde el centro del desarrollo.
+    Devuelve V de forma (K,) y E de forma (K, 3) (o None).
+    """
+    a = coeficientes(x, p + 1 if calcE else p)
+    ind = indices(p)
+    M = np.asarray(M)
+    V = E = None
+    if calcV:
+        V = sum(M[..., j] * a[alfa] for j, alfa in enumerate(ind)) * nucleo.k
+    if calcE:
+        E = np.zeros((len(x), 3))
+        e = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+        for j, alfa in enumerate(ind):
+            for i in range(3):
+                E[:, i] += (alfa[i] + 1) * M[..., j] * a[_mas(alfa, e[i])]
+        E *= nucleo.k
+    return V, E
+
+
+def cota(qabs, a, d, p):
+    """
+    Cota del error de truncar en el orden p el desarrollo de un grupo de
+    cargas de carga absoluta qabs y radio a, a distancia d > a del centro.
+
+    Devuelve las cotas del potencial (V) y del módulo del campo (N/C).
+    """
+    t = a / d
+    m = p + 1
+    cV = nucleo.k * qabs * t**m / ((1 - t) * d)
+    cE = nucleo.k * qabs * t**m * ((m + 1) - m*t) / ((1 - t)**2 * d**2)
+    return cV, cE
+
+
+def _menos(alfa, e, n=1):
+    return tuple(ai - n*ei for ai, ei in zip(alfa, e))
+
+
+def _mas(alfa, e):
+    return tuple(ai + ei for ai, ei in zip(alfa, e))
+
+
+class Desarrollo:
+    """
+    Desarrollo multipolar de todas las cargas, para evaluar lejos de ellas.
+
+    Los momentos respecto del centro de la caja de las cargas se calculan
+    una sola vez, hasta el orden máximo. En cada evaluación, para cada orden
+    p se marcan los puntos donde la cota del error (ver cota()) no supera
+    tol veces el tamaño del campo, estimado con el mayor de los términos de
+    orden <= p del desarrollo, y se elige el orden con el que menos cuesta
+    evaluar todos los puntos: con el desarrollo los marcados, que quedan
+    fuera de una esfera alrededor de las cargas, y con la suma directa los
+    demás.
+
+    Parameters
+    ----------
+    Q : list o ChargeSet
+        Cargas de la forma [q, x, y, z].
+    tol : float (opcional)
+        Error relativo admitido.
+    orden : int (opcional)
+        Orden máximo del desarrollo.
+    """
+
+    def __init__(self, Q, tol=TOL, orden=ORDEN_MAXIMO):
+        self.C = nucleo.cargas(Q)
+        self.tol = float(tol)
+        self.orden = int(orden)
+        q, r = self.C[:, 0], self.C[:, 1:]
+        lo, hi = (r.min(axis=0), r.max(axis=0)) if len(r) else (np.zeros(3), np.zeros(3))
+        self.centro = (lo + hi) / 2
+        y = r - self.centro
+        self.radio = float(np.sqrt(np.einsum('ij,ij->i', y, y).max())) if len(r) else 0.0
+        self.qabs = float(np.abs(q).sum())
+        self.M = momentos(q, y, self.orden)
+        self.terminos = self._terminos()
+
+    def _terminos(self):
+        """Tamaño (valor cuadrático medio sobre las direcciones) de cada orden a distancia 1."""
+        i = np.arange(_DIRECCIONES) + 0.5
+        fi, th = np.arccos(1 - 2 * i / _DIRECCIONES), np.pi * (1 + 5**0.5) * i
+        u = np.stack((np.cos(th) * np.sin(fi), np.sin(th) * np.sin(fi), np.cos(fi)), axis=-1)
+        a = coeficientes(u, self.orden)
+        ind = indices(self.orden)
+        terminos = np.zeros(self.orden + 1)
+        for l in range(self.orden + 1):
+            V = sum(self.M[j] * a[alfa] for j, alfa in enumerate(ind) if sum(alfa) == l)
+            terminos[l] = np.sqrt(np.mean(V**2))
+        return terminos
+
+    def elegir(self, d, calcV=False, calcE=True):
+        """
+        Orden del desarrollo y máscara de los puntos, a distancias d del
+        centro, donde se usa.
+        """
+        N = len(self.C)
+        mejor, p, lejos = N * len(d), 0, np.zeros(len(d), dtype=bool)
+        k = nucleo.k
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            valido = self.radio < d
+            refV = np.zeros(len(d))
+            refE = np.zeros(len(d))
+            for l in range(self.orden + 1):
+                refV = np.maximum(refV, k * self.terminos[l] / d**(l + 1))
+                refE = np.maximum(refE, (l + 1) * k * self.terminos[l] / d**(l + 2))
+                cV, cE = cota(self.qabs, self.radio, d, l)
+                ok = valido.copy()
+                if calcV:
+                    ok &= cV <= self.tol * refV
+                if calcE:
+                    ok &= cE <= self.tol * refE
+                n = int(ok.sum())
+                costo = N * (len(d) - n) + _COSTO * len(indices(l + 1)) * n
+                if costo < mejor:
+                    mejor, p, lejos = costo, l, ok
+        return p, lejos
+
+    def lejos(self, d, p, calcV=False, calcE=True):
+        """Máscara de los puntos, a distancias d del centro, donde alcanza el orden p."""
+        k = nucleo.k
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            ok = self.radio < d
+            l = np.arange(p + 1)[:, None]
+            cV, cE = cota(self.qabs, self.radio, d, p)
+            if calcV:
+                refV = (k * self.terminos[:p+1, None] / d**(l + 1)).max(axis=0)
+                ok &= cV <= self.tol * refV
+            if calcE:
+                refE = ((l + 1) * k * self.terminos[:p+1, None] / d**(l + 2)).max(axis=0)
+                ok &= cE <= self.tol * refE
+        return ok
+
+    def campo(self, P, calcV=False, calcE=True, max_bytes=None, p=None):
+        """
+        Potencial y campo en los puntos P (M, 3): con el desarrollo lejos de
+        las cargas y con la suma directa cerca.
+
+        p es el orden del desarrollo; por defecto se elige para estos puntos
+        (ver elegir). Al repartir los puntos en tramos se elige una vez para
+        todos, de modo que cada punto da lo mismo en cualquier tramo.
+
+        Returns
+        -------
+        V : array (M,) o None
+        E : array (M, 3) o None
+        """
+        x = P - self.centro
+        d = np.sqrt(np.einsum('ij,ij->i', x, x))
+        if p is None:
+            p, lejos = self.elegir(d, calcV, calcE)
+        else:
+            lejos = self.lejos(d, p, calcV, calcE)
+        V = np.empty(len(P)) if calcV else None
+        E = np.empty((len(P), 3)) if calcE else None
+        cerca = ~lejos
+        if cerca.any():
+            Vc, Ec = nucleo.campo(P[cerca], self.C, calcV, calcE, max_bytes)
+            if calcV:
+                V[cerca] = Vc
+            if calcE:
+                E[cerca] = Ec
+        if lejos.any():
+            Vl, El = evaluar(self.M[:len(indices(p))], x[lejos], p, calcV, calcE)
+            if calcV:
+                V[lejos] = Vl
+            if calcE:
+                E[lejos] = El
+        return V, E
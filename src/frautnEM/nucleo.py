@@ -0,0 +1,299 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Núcleo de cálculo de los campos de cargas puntuales.
+
+Todas las cargas se evalúan contra todos los puntos en una única operación
+de NumPy. Para acotar la memoria se recorren bloques de puntos y de cargas
+de modo que los temporarios de cada bloque no superen max_bytes.
+"""
+
+import numpy as np
+
+from .cargas import ChargeSet
+
+
+k = 9E9   #Constante de Coulomb en las unidades correspondientes.
+
+# Presupuesto de memoria por defecto para los temporarios de cada bloque.
+MAX_BYTES = 64 * 2**20
+
+# Cantidad de arreglos de tamaño (puntos x cargas) que viven a la vez en un bloque.
+_TEMPORARIOS = 6
+
+# Pares (punto, carga) por bloque y cargas por bloque que mantienen los
+# temporarios dentro de la caché; bloques más grandes son más lentos.
+_PARES = 2**14
+_CARGAS = 4096
+
+
+def cargas(Q):
+    """Devuelve Q como un arreglo de NumPy de forma (N, 4): [q, x, y, z]."""
+    return ChargeSet.desde(Q).C
+
+
+def puntos(x, y, z):
+    """
+    Aplana las coordenadas de los puntos de campo.
+
+    Devuelve la forma común de x, y, z (según las reglas de broadcasting)
+    y un arreglo de forma (M, 3) con los puntos.
+    """
+    x, y, z = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                  np.asarray(y, dtype=float),
+                                  np.asarray(z, dtype=float))
+    P = np.stack((x.ravel(), y.ravel(), z.ravel()), axis=-1)
+    return x.shape, P
+
+
+def bloques(M, N, max_bytes=None, temporarios=_TEMPORARIOS, itemsize=8):
+    """
+    Tamaño de los bloques de puntos y de cargas.
+
+    Cada bloque tiene a lo sumo _PARES pares (punto, carga) y nunca supera
+    max_bytes de temporarios.
+    """
+    if max_bytes is None:
+        max_bytes = MAX_BYTES
+    pares = max(min(int(max_bytes) // (itemsize * temporarios), _PARES), 1)
+    n = max(min(N, _CARGAS, pares), 1)
+    m = max(min(M, pares // n), 1)
+    return m, n
+
+
+class Trabajo:
+    """
+    Espacio de trabajo de campo(): los temporarios de un bloque.
+
+    campo() crea uno en cada llamada; para evaluar muchas veces (por
+    ejemplo, una animación) conviene crearlo una vez con Trabajo.para() y
+    pasarlo en cada llamada, junto con out=, de modo que no se reserve
+    memoria en ningún momento. También guarda las coordenadas de los
+    puntos (ver puntos()), de modo que puntuales.Ef, V y VEf con trabajo=,
+    out= y Q como ChargeSet tampoco reservan memoria.
+
+    Parameters
+    ----------
+    m, n : int
+        Puntos y cargas por bloque.
+    dtype : (opcional)
+        Tipo de los cálculos: float (por defecto) o np.float32.
+    """
+
+    def __init__(self, m, n, dtype=float):
+        self.m, self.n = m, n
+        self.dtype = np.dtype(dtype)
+        self._pares = np.empty((_TEMPORARIOS, m * n), self.dtype)
+        self._fila = np.empty(m, self.dtype)
+        self._P = np.empty((3, 0), self.dtype)
+        self._C = np.empty((4, 0), self.dtype)
+
+    @classmethod
+    def para(cls, M, N, max_bytes=None, dtype=float):
+        """Espacio de trabajo para M puntos y N cargas, dentro de max_bytes."""
+        dtype = np.dtype(dtype)
+        return cls(*bloques(M, N, max_bytes, itemsize=dtype.itemsize), dtype)
+
+    def bloque(self, m, n):
+        """Los temporarios de un bloque de m puntos y n cargas, contiguos."""
+        return [a[:m * n].reshape(m, n) for a in self._pares]
+
+    def fila(self, m):
+        return self._fila[:m]
+
+    def puntos(self, x, y, z):
+        """
+        Como puntos(x, y, z), pero escribe las coordenadas en el espacio de
+        trabajo: devuelve la forma y P (M, 3), una vista que campo() usa sin
+        copiarla.
+        """
+        shape = np.broadcast_shapes(np.shape(x), np.shape(y), np.shape(z))
+        M = int(np.prod(shape))
+        if self._P.shape[1] < M:
+            self._P = np.empty((3, M), self.dtype)
+        Pt = self._P[:, :M]
+        for fila, c in zip(Pt, (x, y, z)):
+            fila.reshape(shape)[...] = c
+        return shape, Pt.T
+
+    def transpuestos(self, P, C):
+        """
+        Copias contiguas de P.T y C.T (con las cargas multiplicadas por k).
+
+        Los arreglos se conservan y solo se agrandan si hace falta. Si P es
+        la vista que devolvió puntos(), no se copia.
+        """
+        if self._C.shape[1] < len(C):
+            self._C = np.empty((4, len(C)), self.dtype)
+        Ct = self._C[:, :len(C)]
+        if P.base is self._P and P.strides[0] == self.dtype.itemsize:
+            Pt = P.T
+        else:
+            if self._P.shape[1] < len(P):
+                self._P = np.empty((3, len(P)), self.dtype)
+            Pt = self._P[:, :len(P)]
+            Pt[...] = P.T
+        Ct[...] = C.T
+        Ct[0] *= k
+        return Pt, Ct
+
+    @property
+    def nbytes(self):
+        return self._pares.nbytes + self._fila.nbytes + self._P.nbytes + self._C.nbytes
+
+
+def campo(P, C, calcV=False, calcE=True, max_bytes=None, out=None, trabajo=None,
+          dtype=None, acumular=False, excluir=None):
+    """
+    Potencial y campo eléctrico de las cargas C en los puntos P.
+
+    Parameters
+    ----------
+    P : array (M, 3)
+        Puntos de campo.
+    C : array (N, 4)
+        Cargas de la forma [q, x, y, z].
+    calcV, calcE : bool
+        Qué magnitudes calcular.
+    max_bytes : int (opcional)
+        Memoria máxima para los temporarios de cada bloque.
+    out : tuple (V, E) (opcional)
+        Arreglos donde escribir los resultados: V de forma (M,) y E de
+        forma (M, 3) o una terna de arreglos (M,) con las componentes
+        (cualquiera puede ser None). Se sobrescriben, o se les suma el
+        resultado si acumular=True.
+    trabajo : Trabajo (opcional)
+        Espacio de trabajo para reutilizar entre llamadas.
+    dtype : (opcional)
+        Tipo de los cálculos y de los resultados que se crean: float (por
+        defecto) o np.float32, con la mitad de memoria y de tráfico, que
+        alcanza para graficar. Si se pasa trabajo, se toma el suyo.
+    excluir : int (opcional)
+        Se omiten los pares (P[i], C[i + excluir]). Con P = C[:, 1:] y
+        excluir=0, el campo en cada carga sin su propia contribución.
+
+    Returns
+    -------
+    V : array (M,) o None
+    E : array (M, 3) o None (o la terna recibida en out)
+    """
+    M, N = len(P), len(C)
+    if trabajo is None:
+        trabajo = Trabajo.para(M, N, max_bytes, float if dtype is None else dtype)
+    dtype = trabajo.dtype
+    V, E = out if out is not None else (None, None)
+    if calcV:
+        if V is None:
+            V = np.zeros(M, dtype)
+        elif not acumular:
+            V[...] = 0
+    else:
+        V = None
+    if calcE:
+        if E is None:
+            E = np.zeros((3, M), dtype).T
+        Ec = _componentes(E, M)
+        if not acumular:
+            for e in Ec:
+                e[...] = 0
+    else:
+        E = None
+    m, n = max(min(trabajo.m, M), 1), max(min(trabajo.n, N), 1)
+    # Coordenadas contiguas para que las restas exteriores sean rápidas; la
+    # constante de Coulomb va en las cargas.
+    Pt, Ct = trabajo.transpuestos(P, C)
+
+    for i in range(0, M, m):
+        px, py, pz = Pt[:, i:i+m]
+        mm = len(px)
+        fila = trabajo.fila(mm)
+        for j in range(0, N, n):
+            q, cx, cy, cz = Ct[:, j:j+n]
+            dx, dy, dz, r2, t, r = trabajo.bloque(mm, len(q))
+            np.subtract.outer(px, cx, out=dx)
+            np.subtract.outer(py, cy, out=dy)
+            np.subtract.outer(pz, cz, out=dz)
+            np.multiply(dx, dx, out=r2)
+            np.multiply(dy, dy, out=t)
+            r2 += t
+            np.multiply(dz, dz, out=t)
+            r2 += t
+            np.sqrt(r2, out=r)
+            if excluir is not None:
+                _excluir(r, r2, i, j, excluir)
+            if calcV:
+                # Un producto escalar por punto (no matriz por vector), para
+                # que cada punto dé lo mismo en cualquier posición del bloque;
+                # einsum no crea copias de los operandos, como matmul.
+                np.divide(1, r, out=t)
+                np.einsum('ij,j->i', t, q, out=fila)
+                V[i:i+m] += fila
+            if calcE:
+                # w = q / r**3
+                w = np.multiply(r, r2, out=r2)
+                np.divide(q, w, out=w)
+                for e, d in zip(Ec, (dx, dy, dz)):
+                    np.einsum('ij,ij->i', d, w, out=fila)
+                    e[i:i+m] += fila
+
+    return V, E
+
+
+def _excluir(r, r2, i, j, d):
+    """
+    Anula los pares (punto i + a, carga i + a + d) del bloque que empieza
+    en el punto i y la carga j, con distancia infinita.
+    """
+    m, n = r.shape
+    a = np.arange(max(i, j - d), min(i + m, j + n - d))
+    r[a - i, a + d - j] = np.inf
+    r2[a - i, a + d - j] = np.inf
+
+
+def contribuciones(p, C):
+    """
+    Campo de cada una de las cargas C, por separado, en el punto p.
+
+    Devuelve un arreglo (N, 3). Las operaciones son las mismas que en
+    campo(), de modo que cada fila coincide con la de evaluar esa carga sola.
+    """
+    Ct = np.array(C.T, dtype=float)
+    q = Ct[0] * k
+    dx, dy, dz = (p[i] - Ct[i + 1] for i in range(3))
+    r2 = dx*dx
+    r2 += dy*dy
+    r2 += dz*dz
+    w = q / (np.sqrt(r2) * r2)
+    return np.stack((dx*w, dy*w, dz*w), axis=-1)
+
+
+def _componentes(E, M):
+    """Las tres componentes de E ((M, 3) o terna de (M,)) como arreglos (M,)."""
+    if isinstance(E, (tuple, list)):
+        Ec = [np.reshape(e, -1) for e in E]
+        if any(not np.shares_memory(a, e) for a, e in zip(Ec, E)):
+            raise ValueError("out: las componentes de E deben ser arreglos contiguos")
+    else:
+        Ec = [E[:, 0], E[:, 1], E[:, 2]]
+    if any(len(e) != M for e in Ec):
+        raise ValueError(f"out: E debe tener {M} puntos")
+    return Ec
+
+
+def forma(a, shape):
+    """Devuelve a con la forma de los puntos de campo (escalar si es 0-d)."""
+    return a.reshape(shape)[()]
@@ -0,0 +1,269 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Evaluación de Barnes-Hut del campo de muchas cargas puntuales.
+
+Las cargas se agrupan en un octree. Un nodo de radio a visto desde un punto
+a distancia d se reemplaza por su desarrollo multipolar si a < theta * d; si
+no, se abre (o, si es una hoja, se suman sus cargas directamente). El costo
+por punto es del orden de log(N) en lugar de N.
+
+El recorrido se hace por niveles sobre listas de pares (punto, nodo), de
+modo que cada nivel es una sola operación de NumPy para todos los puntos.
+"""
+
+import numpy as np
+
+from . import multipolos
+from . import nucleo
+
+
+class Octree:
+    """
+    Octree de un sistema de cargas puntuales.
+
+    Parameters
+    ----------
+    Q : list
+        Q = [
+            [q1,x1,y1,z1],
+            [q2,x2,y2,z2],
+            ...
+            [qN,xN,yN,zN]
+        ]
+    hoja : int (opcional)
+        Cantidad máxima de cargas en una hoja.
+    orden : int (opcional)
+        Orden del desarrollo multipolar de cada nodo (2: hasta cuadrupolo).
+    """
+
+    # Profundidad máxima, para no partir indefinidamente cargas coincidentes.
+    profundidad = 32
+
+    def __init__(self, Q, hoja=16, orden=2):
+        C = nucleo.cargas(Q)
+        self.hoja = hoja
+        self.orden = orden
+        N = len(C)
+        s = C[:, 1:]
+
+        lo, hi = (s.min(axis=0), s.max(axis=0)) if N else (np.zeros(3), np.zeros(3))
+        centros = [(lo + hi)[None] / 2]
+        mitades = [np.array([max((hi - lo).max() / 2, 1e-300)])]
+        inicios = [np.array([0])]
+        cuentas = [np.array([N])]
+        primeros, nhijos = [], []
+        orden_cargas = np.arange(N)
+        total = 1
+
+        # Construcción por niveles: todos los nodos de un nivel se parten a la vez.
+        for nivel in range(self.profundidad):
+            c, h, ini, cnt = centros[-1], mitades[-1], inicios[-1], cuentas[-1]
+            partir = cnt > hoja
+            primero = np.full(len(cnt), -1)
+            nh = np.zeros(len(cnt), dtype=int)
+            if nivel == self.profundidad - 1 or not partir.any():
+                primeros.append(primero)
+                nhijos.append(nh)
+                break
+            nodos = np.nonzero(partir)[0]
+            rep, pos = _expandir(ini[nodos], cnt[nodos])
+            idx = orden_cargas[pos]
+            d = s[idx] >= c[nodos][rep]
+            octante = d[:, 0]*4 + d[:, 1]*2 + d[:, 2]
+            clave = rep*8 + octante
+            ordenado = np.argsort(clave, kind='stable')
+            orden_cargas[pos] = idx[ordenado]
+            claves, hcnt = np.unique(clave[ordenado], return_counts=True)
+            padre = nodos[claves // 8]
+            bits = (claves % 8)[:, None] >> np.array([2, 1, 0]) & 1
+            hini = np.concatenate(([0], np.cumsum(hcnt)[:-1]))
+            # Los hijos de cada nodo quedan contiguos, en el mismo orden de las cargas.
+            _, primer, nh_p = np.unique(padre, return_index=True, return_counts=True)
+            primero[nodos] = total + primer
+            nh[nodos] = nh_p
+            primeros.append(primero)
+            nhijos.append(nh)
+            hh = h[padre] / 2
+            centros.append(c[padre] + (2*bits - 1) * hh[:, None])
+            mitades.append(hh)
+            inicios.append(ini[padre] + hini - _inicio_padre(hini, padre))
+            cuentas.append(hcnt)
+            total += len(hcnt)
+
+        self.C = C[orden_cargas]
+        self.inicio = np.concatenate(inicios)
+        self.cuenta = np.concatenate(cuentas)
+        self.primero = np.concatenate(primeros)
+        self.nhijos = np.concatenate(nhijos)
+        self.mitad = np.concatenate(mitades)
+        self._momentos(np.cumsum([0] + [len(x) for x in cuentas]))
+
+    def _momentos(self, niveles):
+        """Centro, radio, carga absoluta y momentos multipolares de cada nodo."""
+        n = len(self.cuenta)
+        q, s = self.C[:, 0], self.C[:, 1:]
+        self.centro = np.zeros((n, 3))
+        self.radio = np.zeros(n)
+        self.qabs = np.zeros(n)
+        self.M = np.zeros((n, len(multipolos.indices(self.orden))))
+        # Los nodos de un mismo nivel son disjuntos: se calculan todos juntos.
+        for a, b in zip(niveles[:-1], niveles[1:]):
+            nodos = np.arange(a, b)
+            nodos = nodos[self.cuenta[nodos] > 0]
+            if len(nodos) == 0:
+                continue
+            rep, pos = _expandir(self.inicio[nodos], self.cuenta[nodos])
+            qa = np.abs(q[pos])
+            qabs = np.bincount(rep, qa, len(nodos))
+            centro = np.stack([np.bincount(rep, qa * s[pos, i], len(nodos))
+                               for i in range(3)], axis=-1)
+            # Para grupos sin carga se usa el punto medio de sus posiciones.
+            cuenta = self.cuenta[nodos]
+            medio = np.stack([np.bincount(rep, s[pos, i], len(nodos))
+                              for i in range(3)], axis=-1) / cuenta[:, None]
+            vacio = qabs == 0
+            centro[~vacio] /= qabs[~vacio, None]
+            centro[vacio] = medio[vacio]
+            y = s[pos] - centro[rep]
+            dist = np.sqrt(np.einsum('ki,ki->k', y, y))
+            starts = np.concatenate(([0], np.cumsum(cuenta)[:-1]))
+            self.radio[nodos] = np.maximum.reduceat(dist, starts)
+            self.centro[nodos] = centro
+            self.qabs[nodos] = qabs
+            self.M[nodos] = multipolos.momentos(q[pos], y, self.orden, rep, len(nodos))
+
+    def campo(self, P, theta=0.5, calcV=False, calcE=True, max_bytes=None, excluir=False):
+        """
+        Potencial y campo en los puntos P (M, 3), con sus cotas de error.
+
+        Con excluir=True se omiten los pares de punto y carga en la misma
+        posición, para evaluar en las propias cargas sin la interacción de
+        cada una consigo misma.
+
+        Returns
+        -------
+        V, cotaV : array (M,) o None
+        E : array (M, 3) o None
+        cotaE : array (M,) o None
+            Cota superior del módulo del error del campo en cada punto.
+        """
+        M = len(P)
+        V = np.zeros(M) if calcV else None
+        E = np.zeros((M, 3)) if calcE else None
+        cotaV = np.zeros(M) if calcV else None
+        cotaE = np.zeros(M) if calcE else None
+        # Pares por punto estimados para acotar la memoria de las listas.
+        m, _ = nucleo.bloques(M, 64 * max(self.hoja, 8), max_bytes)
+        m = max(m, 1024)
+
+        for i in range(0, M, m):
+            p = P[i:i+m]
+            n = len(p)
+            pt = np.arange(n)
+            nd = np.zeros(n, dtype=int)
+            if len(self.C) == 0:
+                pt = pt[:0]
+            while len(pt):
+                x = p[pt] - self.centro[nd]
+                d = np.sqrt(np.einsum('ki,ki->k', x, x))
+                acepta = self.radio[nd] < theta * d
+                if acepta.any():
+                    a, b = pt[acepta], nd[acepta]
+                    Va, Ea = multipolos.evaluar(self.M[b], x[acepta], self.orden,
+                                                calcV, calcE)
+                    cV, cE = multipolos.cota(self.qabs[b], self.radio[b],
+                                             d[acepta], self.orden)
+                    if calcV:
+                        V[i:i+n] += np.bincount(a, Va, n)
+                        cotaV[i:i+n] += np.bincount(a, cV, n)
+                    if calcE:
+                        for j in range(3):
+                            E[i:i+n, j] += np.bincount(a, Ea[:, j], n)
+                        cotaE[i:i+n] += np.bincount(a, cE, n)
+                pt, nd = pt[~acepta], nd[~acepta]
+                hoja = self.nhijos[nd] == 0
+                if hoja.any():
+                    self._directo(p, pt[hoja], nd[hoja], V, E, i, calcV, calcE, excluir)
+                pt, nd = pt[~hoja], nd[~hoja]
+                rep, nd = _expandir(self.primero[nd], self.nhijos[nd])
+                pt = pt[rep]
+
+        return V, cotaV, E, cotaE
+
+    def _directo(self, p, pt, nd, V, E, i, calcV, calcE, excluir=False):
+        """Suma directa de las cargas de las hojas nd en los puntos pt."""
+        n = len(p)
+        rep, pos = _expandir(self.inicio[nd], self.cuenta[nd])
+        a = pt[rep]
+        c = self.C[pos]
+        r = p[a] - c[:, 1:]
+        r2 = np.einsum('ki,ki->k', r, r)
+        if excluir:
+            distintos = r2 > 0
+            a, c, r, r2 = a[distintos], c[distintos], r[distintos], r2[distintos]
+        if calcV:
+            V[i:i+n] += np.bincount(a, nucleo.k * c[:, 0] / np.sqrt(r2), n)
+        if calcE:
+            w = nucleo.k * c[:, 0] / (r2 * np.sqrt(r2))
+            for j in range(3):
+                E[i:i+n, j] += np.bincount(a, w * r[:, j], n)
+
+    def Ef(self, x, y, z, theta=0.5, cota=False, max_bytes=None):
+        """
+        Componentes del campo eléctrico en N/C, como puntuales.Ef.
+
+        Si cota=True, devuelve además la cota del módulo del error en cada punto.
+        """
+        shape, P = nucleo.puntos(x, y, z)
+        _, _, E, cotaE = self.campo(P, theta, max_bytes=max_bytes)
+        res = tuple(nucleo.forma(E[:, i], shape) for i in range(3))
+        if cota:
+            res = res + (nucleo.forma(cotaE, shape),)
+        return res
+
+    def V(self, x, y, z, theta=0.5, cota=False, max_bytes=None):
+        """
+        Potencial eléctrico en Volt, como puntuales.V.
+
+        Si cota=True, devuelve además la cota del error en cada punto.
+        """
+        shape, P = nucleo.puntos(x, y, z)
+        V, cotaV, _, _ = self.campo(P, theta, calcV=True, calcE=False,
+                                    max_bytes=max_bytes)
+        if cota:
+            return nucleo.forma(V, shape), nucleo.forma(cotaV, shape)
+        return nucleo.forma(V, shape)
+
+
+def _expandir(inicio, cuenta):
+    """
+    Expande los rangos [inicio, inicio + cuenta).
+
+    Devuelve, para cada elemento, el índice del rango al que pertenece y su
+    posición.
+    """
+    rep = np.repeat(np.arange(len(cuenta)), cuenta)
+    desde = np.cumsum(cuenta) - cuenta
+    pos = np.arange(len(rep)) - desde[rep] + np.asarray(inicio)[rep]
+    return rep, pos
+
+
+def _inicio_padre(hini, padre):
+    """Desplazamiento del primer hijo de cada padre dentro de hini."""
+    _, primer = np.unique(padre, return_index=True)
+    return np.repeat(hini[primer], np.diff(np.append(primer, len(padre))))
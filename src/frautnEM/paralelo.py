@@ -0,0 +1,226 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Evaluación del campo en paralelo, repartiendo los puntos en tramos.
+
+Con pool='hilos' cada tramo se escribe directamente en los arreglos de
+salida (NumPy libera el GIL durante las operaciones del núcleo). Con
+pool='procesos' los puntos, los arreglos grandes de entrada y las salidas
+se ponen en memoria compartida: cada proceso lee su tramo y escribe el
+resultado allí, de modo que nada vuelve serializado. La función y los demás
+argumentos (un Octree, un Desarrollo) se serializan una sola vez por
+llamada, también en memoria compartida, y cada proceso los lee una vez y
+los reutiliza en todos sus tramos.
+
+Los pools se crean una vez y se reutilizan entre llamadas; cerrar() los
+termina (se llama sola al salir del programa).
+"""
+
+import atexit
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Tramos por trabajador, para repartir mejor la carga entre ellos.
+_TRAMOS = 4
+
+# Puntos mínimos por tramo; con menos, el reparto cuesta más de lo que ahorra.
+_MINIMO = 4096
+
+# Arreglos de entrada más grandes que esto se pasan en memoria compartida.
+_COMPARTIR = 2**16
+
+_pools = {}
+
+# En cada proceso del pool: la función y los argumentos de la llamada en
+# curso, por nombre de su memoria compartida.
+_leidos = {}
+
+
+def trabajadores(workers):
+    """Cantidad de trabajadores: None es 1; 0 o negativo, todos los núcleos."""
+    if workers is None:
+        return 1
+    workers = int(workers)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def _pool(pool, n):
+    clave = (pool, n)
+    if clave not in _pools:
+        if pool == 'hilos':
+            _pools[clave] = ThreadPoolExecutor(n)
+        elif pool == 'procesos':
+            _pools[clave] = ProcessPoolExecutor(n)
+        else:
+            raise ValueError(f"pool debe ser 'hilos' o 'procesos', no {pool!r}")
+    return _pools[clave]
+
+
+def cerrar():
+    """Termina los pools de hilos y de procesos; se vuelven a crear al usarlos."""
+    pools = list(_pools.values())
+    _pools.clear()
+    for p in pools:
+        p.shutdown(wait=True)
+
+
+atexit.register(cerrar)
+
+
+def tramos(M, workers):
+    """Límites de los tramos de puntos: lista de (inicio, fin)."""
+    n = max(min(workers * _TRAMOS, M // _MINIMO), 1)
+    b = np.linspace(0, M, n + 1).astype(int)
+    return list(zip(b[:-1], b[1:]))
+
+
+def campo(funcion, P, args, calcV, calcE, workers=None, pool='hilos'):
+    """
+    Evalúa funcion(P[a:b], *args) por tramos de puntos, en paralelo.
+
+    Parameters
+    ----------
+    funcion : callable
+        Devuelve (V (m,) o None, E (m, 3) o None) para los m puntos de un
+        tramo. Con pool='procesos' debe poder serializarse (una función
+        de módulo), igual que args.
+    P : array (M, 3)
+        Puntos de campo.
+    args : tuple
+        Demás argumentos de funcion.
+    calcV, calcE : bool
+        Qué magnitudes devuelve funcion.
+    workers : int (opcional)
+        Cantidad de trabajadores, ver trabajadores().
+    pool : 'hilos' o 'procesos'
+
+    Returns
+    -------
+    V : array (M,) o None
+    E : array (M, 3) o None
+    """
+    n = trabajadores(workers)
+    M = len(P)
+    partes = tramos(M, n)
+    if n == 1 or len(partes) == 1:
+        return funcion(P, *args)
+    if pool == 'procesos':
+        return _procesos(funcion, P, args, calcV, calcE, n, partes)
+
+    V = np.empty(M) if calcV else None
+    E = np.empty((M, 3)) if calcE else None
+
+    def tramo(a, b):
+        Vt, Et = funcion(P[a:b], *args)
+        if calcV:
+            V[a:b] = Vt
+        if calcE:
+            E[a:b] = Et
+
+    futuros = [_pool(pool, n).submit(tramo, a, b) for a, b in partes]
+    for f in futuros:
+        f.result()
+    return V, E
+
+
+class _Compartido:
+    """Referencia serializable a un arreglo en memoria compartida."""
+
+    def __init__(self, shm, shape, dtype):
+        self.nombre = shm.name
+        self.shape = shape
+        self.dtype = np.dtype(dtype).str
+
+    def arreglo(self, shm):
+        return np.ndarray(self.shape, self.dtype, buffer=shm.buf)
+
+
+def _compartir(a, memorias):
+    """Copia a en un bloque nuevo de memoria compartida y devuelve su referencia."""
+    a = np.asarray(a)
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    memorias[shm.name] = shm
+    ref = _Compartido(shm, a.shape, a.dtype)
+    ref.arreglo(shm)[...] = a
+    return ref
+
+
+def _procesos(funcion, P, args, calcV, calcE, n, partes):
+    memorias = {}
+    try:
+        return _repartir(funcion, P, args, calcV, calcE, n, partes, memorias)
+    finally:
+        for shm in memorias.values():
+            shm.close()
+            shm.unlink()
+
+
+def _repartir(funcion, P, args, calcV, calcE, n, partes, memorias):
+    M = len(P)
+    refP = _compartir(P, memorias)
+    args = tuple(_compartir(a, memorias)
+                 if isinstance(a, np.ndarray) and a.nbytes > _COMPARTIR else a
+                 for a in args)
+    carga = pickle.dumps((funcion, args), protocol=pickle.HIGHEST_PROTOCOL)
+    refF = _compartir(np.frombuffer(carga, dtype=np.uint8), memorias)
+    refV = _compartir(np.zeros(M), memorias) if calcV else None
+    refE = _compartir(np.zeros((M, 3)), memorias) if calcE else None
+    pool = _pool('procesos', n)
+    futuros = [pool.submit(_tramo, refF, refP, refV, refE, a, b)
+               for a, b in partes]
+    for f in futuros:
+        f.result()
+    V = refV.arreglo(memorias[refV.nombre]).copy() if calcV else None
+    E = refE.arreglo(memorias[refE.nombre]).copy() if calcE else None
+    return V, E
+
+
+def _tramo(refF, refP, refV, refE, a, b):
+    """Un tramo, en un proceso del pool: lee y escribe en memoria compartida."""
+    memorias = {}
+    try:
+        _calcularTramo(refF, refP, refV, refE, a, b, memorias)
+    finally:
+        for shm in memorias.values():
+            shm.close()
+
+
+def _calcularTramo(refF, refP, refV, refE, a, b, memorias):
+    def abrir(ref):
+        if ref.nombre not in memorias:
+            memorias[ref.nombre] = shared_memory.SharedMemory(name=ref.nombre)
+        return ref.arreglo(memorias[ref.nombre])
+
+    if refF.nombre not in _leidos:
+        # Solo se guarda la llamada en curso.
+        _leidos.clear()
+        _leidos[refF.nombre] = pickle.loads(abrir(refF))
+    funcion, args = _leidos[refF.nombre]
+    P = abrir(refP)
+    args = tuple(abrir(x) if isinstance(x, _Compartido) else x for x in args)
+    V, E = funcion(P[a:b], *args)
+    if refV is not None:
+        abrir(refV)[a:b] = V
+    if refE is not None:
+        abrir(refE)[a:b] = E
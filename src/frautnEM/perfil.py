@@ -0,0 +1,266 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Perfil de tiempos, opcional.
+
+Con un Perfil activo, las funciones públicas de puntuales (y
+lineasDeCampo, barrido.evaluar) y las etapas internas de los gráficos
+(grilla, contorno, streamplot, mostrar) registran su tiempo, las
+evaluaciones del campo, los pares (punto, carga) evaluados y, con
+memoria=True, la memoria pico reservada. Cada etapa se identifica por su
+ruta de llamadas, por ejemplo 'plotEf/calcularEf/Ef':
+
+    from frautnEM import perfil
+    with perfil.Perfil(memoria=True) as p:
+        equipotencialesPuntuales(Q, EF=True, mostrar=False)
+    print(p.tabla())
+    p.guardar('perfil.json')
+
+También se puede activar para todo el programa con activarPerfil(). Sin
+perfil activo cada función medida solo comprueba una variable global.
+Se miden las llamadas del hilo que activó el perfil y de los demás hilos
+(cada uno con su propia ruta); los procesos de un pool no se miden.
+"""
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+
+
+class Perfil:
+    """
+    Tiempos, evaluaciones y memoria de cada etapa.
+
+    Parameters
+    ----------
+    memoria : bool (opcional)
+        Mide también la memoria pico de cada etapa con tracemalloc, que
+        hace más lento el código Python mientras el perfil está activo.
+        La medición es correcta solo si se calcula en un único hilo.
+
+    Se usa como administrador de contexto (with Perfil() as p: ...) o con
+    activarPerfil().
+    """
+
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self._etapas = {}
+        self._lock = threading.Lock()
+        self._hilos = threading.local()
+        self._anterior = None
+        self._tracemalloc = False
+
+    def iniciar(self):
+        """Empieza a medir la memoria, si corresponde."""
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc = True
+
+    def detener(self):
+        """Deja de medir la memoria, si la midió este perfil."""
+        if self._tracemalloc:
+            tracemalloc.stop()
+            self._tracemalloc = False
+
+    def __enter__(self):
+        global _activo
+        self._anterior = _activo
+        self.iniciar()
+        _activo = self
+        return self
+
+    def __exit__(self, *excepcion):
+        global _activo
+        _activo = self._anterior
+        self.detener()
+
+    def _pila(self):
+        pila = getattr(self._hilos, 'pila', None)
+        if pila is None:
+            pila = self._hilos.pila = []
+        return pila
+
+    def etapa(self, nombre):
+        """Administrador de contexto que mide la etapa nombre."""
+        return _Etapa(self, nombre)
+
+    def _entrar(self, nombre):
+        pila = self._pila()
+        ruta = pila[-1]['ruta'] + '/' + nombre if pila else nombre
+        memoria = 0
+        if self.memoria and tracemalloc.is_tracing():
+            actual, pico = tracemalloc.get_traced_memory()
+            # El pico hasta aquí es de las etapas de afuera; se reinicia
+            # para medir el de esta.
+            for marco in pila:
+                marco['pico'] = max(marco['pico'], pico)
+            tracemalloc.reset_peak()
+            memoria = actual
+        pila.append({'ruta': ruta, 'inicio': time.perf_counter(), 'hijos': 0.0,
+                     'evaluaciones': 0, 'pares': 0, 'base': memoria, 'pico': memoria})
+
+    def _salir(self):
+        fin = time.perf_counter()
+        pila = self._pila()
+        marco = pila.pop()
+        segundos = fin - marco['inicio']
+        if pila:
+            pila[-1]['hijos'] += segundos
+        reservado = 0
+        if self.memoria and tracemalloc.is_tracing():
+            pico = max(marco['pico'], tracemalloc.get_traced_memory()[1])
+            reservado = pico - marco['base']
+            for m in pila:
+                m['pico'] = max(m['pico'], pico)
+        with self._lock:
+            e = self._etapas.get(marco['ruta'])
+            if e is None:
+                e = self._etapas[marco['ruta']] = {'llamadas': 0, 'segundos': 0.0,
+                                                   'propio': 0.0, 'evaluaciones': 0,
+                                                   'pares': 0, 'bytes': 0}
+            e['llamadas'] += 1
+            e['segundos'] += segundos
+            e['propio'] += segundos - marco['hijos']
+            e['evaluaciones'] += marco['evaluaciones']
+            e['pares'] += marco['pares']
+            e['bytes'] = max(e['bytes'], reservado)
+
+    def contar(self, puntos, cargas, evaluaciones=1):
+        """Suma a las etapas en curso evaluaciones de puntos x cargas cada una."""
+        for marco in self._pila():
+            marco['evaluaciones'] += evaluaciones
+            marco['pares'] += evaluaciones * puntos * cargas
+
+    def estadisticas(self):
+        """
+        Las etapas medidas: dict de ruta a llamadas, segundos (total),
+        propio (sin las etapas internas), evaluaciones y pares (incluidas
+        las de las etapas internas) y bytes (memoria pico por encima de la
+        del comienzo, en la llamada de mayor pico; 0 sin memoria=True).
+        """
+        with self._lock:
+            return {ruta: dict(e) for ruta, e in sorted(self._etapas.items())}
+
+    def json(self, **opciones):
+        """Las estadísticas como texto JSON (opciones de json.dumps)."""
+        return json.dumps(self.estadisticas(), **opciones)
+
+    def guardar(self, archivo):
+        """Guarda las estadísticas en un archivo JSON."""
+        with open(archivo, 'w') as f:
+            f.write(self.json(indent=1))
+
+    def limpiar(self):
+        """Descarta lo medido."""
+        with self._lock:
+            self._etapas.clear()
+
+    def tabla(self):
+        """Las estadísticas como una tabla de texto, con las etapas internas sangradas."""
+        filas = [f"{'etapa':40s} {'llamadas':>8s} {'total [s]':>10s} {'propio [s]':>10s} "
+                 f"{'evaluaciones':>12s} {'pares':>12s} {'MiB':>8s}"]
+        for ruta, e in self.estadisticas().items():
+            nombre = '  ' * ruta.count('/') + ruta.rsplit('/', 1)[-1]
+            filas.append(f"{nombre:40s} {e['llamadas']:8d} {e['segundos']:10.4f} "
+                         f"{e['propio']:10.4f} {e['evaluaciones']:12d} {e['pares']:12.4g} "
+                         f"{e['bytes'] / 2**20:8.1f}")
+        return '\n'.join(filas)
+
+
+class _Etapa:
+    __slots__ = ('perfil', 'nombre')
+
+    def __init__(self, perfil, nombre):
+        self.perfil, self.nombre = perfil, nombre
+
+    def __enter__(self):
+        self.perfil._entrar(self.nombre)
+
+    def __exit__(self, *excepcion):
+        self.perfil._salir()
+
+
+class _Nada:
+    """Etapa sin perfil activo: no hace nada."""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *excepcion):
+        pass
+
+
+_NADA = _Nada()
+
+# Perfil en uso; None si está desactivado (por defecto).
+_activo = None
+
+
+def activarPerfil(memoria=False):
+    """Activa un perfil nuevo para todo el programa y lo devuelve. Ver Perfil."""
+    global _activo
+    if _activo is not None:
+        _activo.detener()
+    _activo = Perfil(memoria)
+    _activo.iniciar()
+    return _activo
+
+
+def desactivarPerfil():
+    """Desactiva el perfil y lo devuelve (o None), con lo medido."""
+    global _activo
+    p, _activo = _activo, None
+    if p is not None:
+        p.detener()
+    return p
+
+
+def perfilActivo():
+    """El perfil en uso, o None."""
+    return _activo
+
+
+def etapa(nombre):
+    """Mide el bloque with como la etapa nombre, si hay un perfil activo."""
+    p = _activo
+    if p is None:
+        return _NADA
+    return _Etapa(p, nombre)
+
+
+def contar(puntos, cargas, evaluaciones=1):
+    """Registra evaluaciones del campo de cargas cargas en puntos puntos."""
+    p = _activo
+    if p is not None:
+        p.contar(puntos, cargas, evaluaciones)
+
+
+def medido(funcion):
+    """Decorador: mide cada llamada a funcion como una etapa con su nombre."""
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def medida(*args, **kwargs):
+        p = _activo
+        if p is None:
+            return funcion(*args, **kwargs)
+        with _Etapa(p, nombre):
+            return funcion(*args, **kwargs)
+
+    return medida
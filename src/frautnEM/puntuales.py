@@ -16,12 +16,31 @@
 
 
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
+
+from . import adaptativo
+from . import cache
+from . import distribuciones
+from . import lineas
+from . import malla
+from . import muestreo
+from . import multipolos
+from . import paralelo
+from . import perfil
+from . import volumen
+from .cargas import ChargeSet
+from .resultados import FieldResult
+from . import nucleo
+from .octree import Octree
+
+
+# Candidatos por flecha al muestrear por módulo un volumen en disco.
+_CANDIDATOS = 8
 
 
 # 20240815
-def Ef(x, y, z, Q):
+@perfil.medido
+def Ef(x, y, z, Q, max_bytes=None, method='directo', theta=0.5, workers=None, pool='hilos',
+       dtype=None, out=None, tol=None, trabajo=None):
     """Calcula las componentes del campo eléctrico en N/C.
     Ingresar valores de x,y,z en metros y q en coulomb.
     Q es una lista de la forma:
@@ -31,21 +50,41 @@ def Ef(x, y, z, Q):
         ...
         [qN,xN,yN,zN]
     ]
+    Q puede incluir distribuciones continuas (Segmento, Anillo, Disco,
+    Esfera, ver distribuciones), cuyo campo se suma con cualquier method.
+    Todas las cargas se evalúan a la vez contra todos los puntos; max_bytes
+    (opcional) limita la memoria de los temporarios (64 MiB por defecto).
+    method : 'directo' (suma de todas las cargas), 'octree' (Barnes-Hut,
+    con ángulo de apertura theta; Q puede ser un Octree ya construido) o
+    'malla' (partícula-malla con FFT; x,y,z deben formar una grilla regular)
+    o 'multipolo' (desarrollo multipolar de todas las cargas en los puntos
+    lejanos, con el orden y el radio que alcanzan para el error relativo
+    tol, 1e-6 por defecto; Q puede ser un multipolos.Desarrollo ya construido).
+    workers (opcional) reparte los puntos en tramos que se evalúan en
+    paralelo en un pool de hilos o, con pool='procesos', de procesos
+    (workers=-1 usa todos los núcleos; 'malla' resuelve la grilla entera y
+    no se reparte; si su malla no entra en max_bytes, se suma directo).
+    dtype=np.float32 (opcional) calcula con la mitad de memoria, suficiente
+    para graficar; out=(Ei, Ej, Ek) (opcional) son arreglos contiguos con la
+    forma de los puntos donde se escribe el resultado, sin crear otros.
+    trabajo (opcional) es un nucleo.Trabajo para reutilizar entre llamadas
+    con method='directo' sin workers (en los demás casos no se usa): con
+    trabajo, out y Q como ChargeSet, una llamada no reserva memoria.
+    La cota del error del octree se obtiene con Octree(Q).Ef(..., cota=True).
     """
-    k = 9E9   #Constante de Coulomb en las unidades correspondientes.
-
-    Ei,Ej,Ek = 0,0,0
-    for qi in Q:
-        r = ((x - qi[1])**2 + (y - qi[2])**2 + (z - qi[3])**2)**(3/2)
-        Ei = Ei + k * qi[0] * (x - qi[1]) / r
-        Ej = Ej + k * qi[0] * (y - qi[2]) / r
-        Ek = Ek + k * qi[0] * (z - qi[3]) / r
+    shape, _, E = _evaluar(x, y, z, Q, False, True, max_bytes, method, theta,
+                           workers, pool, dtype, (None, out), tol, trabajo)
+    if out is not None:
+        return tuple(out)
+    Ei, Ej, Ek = (nucleo.forma(E[:, i], shape) for i in range(3))
 
     return Ei, Ej, Ek
 
 
 # 20240719
-def V(x,y,z,Q):
+@perfil.medido
+def V(x, y, z, Q, max_bytes=None, method='directo', theta=0.5, workers=None, pool='hilos',
+      dtype=None, out=None, tol=None, trabajo=None):
     """Calcula potencial eléctrico en Volt.
     Ingresar valores de x,y,z en metros y q en coulomb.
     Q es una lista de la forma:
@@ -55,34 +94,246 @@ def V(x,y,z,Q):
         ...
         [qN,xN,yN,zN]
     ]
+    Q puede incluir distribuciones continuas (Segmento, Anillo, Disco,
+    Esfera, ver distribuciones), cuyo campo se suma con cualquier method.
+    Todas las cargas se evalúan a la vez contra todos los puntos; max_bytes
+    (opcional) limita la memoria de los temporarios (64 MiB por defecto).
+    method : 'directo' (suma de todas las cargas), 'octree' (Barnes-Hut,
+    con ángulo de apertura theta; Q puede ser un Octree ya construido) o
+    'malla' (partícula-malla con FFT; x,y,z deben formar una grilla regular)
+    o 'multipolo' (desarrollo multipolar de todas las cargas en los puntos
+    lejanos, con el orden y el radio que alcanzan para el error relativo
+    tol, 1e-6 por defecto; Q puede ser un multipolos.Desarrollo ya construido).
+    workers (opcional) reparte los puntos en tramos que se evalúan en
+    paralelo en un pool de hilos o, con pool='procesos', de procesos
+    (workers=-1 usa todos los núcleos; 'malla' resuelve la grilla entera y
+    no se reparte; si su malla no entra en max_bytes, se suma directo).
+    dtype=np.float32 (opcional) calcula con la mitad de memoria, suficiente
+    para graficar; out (opcional) es un arreglo contiguo con la forma de los
+    puntos donde se escribe el resultado, sin crear otro.
+    trabajo (opcional) es un nucleo.Trabajo para reutilizar entre llamadas,
+    como en Ef.
+    """
+    shape, V, _ = _evaluar(x, y, z, Q, True, False, max_bytes, method, theta,
+                           workers, pool, dtype, (out, None), tol, trabajo)
+    if out is not None:
+        return out
+
+    return nucleo.forma(V, shape)
+
+
+@perfil.medido
+def VEf(x, y, z, Q, max_bytes=None, method='directo', theta=0.5, workers=None, pool='hilos',
+        dtype=None, out=None, tol=None, trabajo=None):
+    """Calcula a la vez el potencial en Volt y las componentes del campo en N/C.
+    Los parámetros son los de Ef y V; out=(V, Ei, Ej, Ek) (opcional).
+    Las distancias a las cargas se calculan una sola vez para ambos, y el
+    campo es el analítico (no una derivada numérica del potencial).
+    Devuelve V, Ei, Ej, Ek.
+    """
+    salida = None if out is None else (out[0], tuple(out[1:]))
+    shape, V, E = _evaluar(x, y, z, Q, True, True, max_bytes, method, theta,
+                           workers, pool, dtype, salida, tol, trabajo)
+    if out is not None:
+        return tuple(out)
+    Ei, Ej, Ek = (nucleo.forma(E[:, i], shape) for i in range(3))
+
+    return nucleo.forma(V, shape), Ei, Ej, Ek
+
+
+def _evaluar(x, y, z, Q, calcV, calcE, max_bytes, method, theta, workers=None, pool='hilos',
+             dtype=None, out=None, tol=None, trabajo=None):
+    """
+    Evalúa V y/o E con el método pedido. Devuelve la forma de los puntos, V y E.
+
+    out = (V, (Ei, Ej, Ek)), con la forma de los puntos (cualquiera puede ser
+    None). El método directo sin workers escribe allí sin pasos intermedios;
+    los demás calculan en float y copian. Con trabajo, el método directo sin
+    workers escribe también los puntos en su espacio de trabajo.
+    """
+    serie = paralelo.trabajadores(workers) == 1
+    if trabajo is not None and method == 'directo' and serie:
+        shape, P = trabajo.puntos(x, y, z)
+    else:
+        trabajo = None
+        shape, P = nucleo.puntos(x, y, z)
+    out = _planos(out, len(P))
+    Q = Q if isinstance(Q, (Octree, multipolos.Desarrollo)) else ChargeSet.desde(Q)
+    cuerpos = getattr(Q, 'cuerpos', ())
+    perfil.contar(len(P), len(Q.C) + len(cuerpos))
+    if method == 'directo':
+        C = nucleo.cargas(Q)
+        if serie:
+            V, E = nucleo.campo(P, C, calcV, calcE, max_bytes, out=out, trabajo=trabajo,
+                                dtype=dtype)
+            _sumarCuerpos(cuerpos, P, V, E, calcV, calcE, workers, pool)
+            return shape, V, E
+        V, E = paralelo.campo(nucleo.campo, P, (C, calcV, calcE, max_bytes, None, None, dtype),
+                              calcV, calcE, workers, pool)
+    elif method == 'octree':
+        arbol = Q if isinstance(Q, Octree) else Octree(Q)
+        V, E = paralelo.campo(_campoOctree, P, (arbol, theta, calcV, calcE, max_bytes),
+                              calcV, calcE, workers, pool)
+    elif method == 'malla':
+        V, E = malla.campo(P, nucleo.cargas(Q), calcV, calcE, max_bytes=max_bytes)
+    elif method == 'multipolo':
+        desarrollo = (Q if isinstance(Q, multipolos.Desarrollo) else
+                      multipolos.Desarrollo(Q, multipolos.TOL if tol is None else tol))
+        p = None
+        if paralelo.trabajadores(workers) > 1:
+            x = P - desarrollo.centro
+            p, _ = desarrollo.elegir(np.sqrt(np.einsum('ij,ij->i', x, x)), calcV, calcE)
+        V, E = paralelo.campo(desarrollo.campo, P, (calcV, calcE, max_bytes, p),
+                              calcV, calcE, workers, pool)
+    else:
+        raise ValueError("method debe ser 'directo', 'octree', 'malla' o 'multipolo', "
+                         f"no {method!r}")
+    _sumarCuerpos(cuerpos, P, V, E, calcV, calcE, workers, pool)
+    if out is not None:
+        if out[0] is not None and calcV:
+            np.copyto(out[0], V, casting='unsafe')
+            V = out[0]
+        if out[1] is not None and calcE:
+            for i, e in enumerate(out[1]):
+                np.copyto(e, E[:, i], casting='unsafe')
+            E = out[1]
+    elif dtype is not None:
+        V = None if V is None else V.astype(dtype, copy=False)
+        E = None if E is None else E.astype(dtype, copy=False)
+    return shape, V, E
+
+
+def _sumarCuerpos(cuerpos, P, V, E, calcV, calcE, workers, pool):
+    """Suma a V y E, en su lugar, el campo de las distribuciones continuas."""
+    if not cuerpos:
+        return
+    Vc, Ec = paralelo.campo(distribuciones.campo, P, (cuerpos, calcV, calcE),
+                            calcV, calcE, workers, pool)
+    if calcV:
+        V += Vc
+    if calcE:
+        for e, c in zip(E if isinstance(E, tuple) else E.T, Ec.T):
+            e += c
+
+
+def _planos(out, M):
+    """out = (V, (Ei, Ej, Ek)) como vistas planas de M puntos (ValueError si no se puede)."""
+    if out is None or (out[0] is None and out[1] is None):
+        return None
+
+    def plano(a):
+        p = np.reshape(a, -1)
+        if p.size != M or not np.shares_memory(p, a):
+            raise ValueError(f"out debe ser un arreglo contiguo de {M} puntos")
+        return p
+
+    V, E = out
+    return (None if V is None else plano(V),
+            None if E is None else tuple(plano(e) for e in E))
+
+
+def _campoOctree(P, arbol, theta, calcV, calcE, max_bytes):
+    V, _, E, _ = arbol.campo(P, theta, calcV, calcE, max_bytes)
+    return V, E
+
+
+def _opciones(params):
+    """Opciones del cálculo del campo que los gráficos pasan a Ef y V."""
+    claves = ('max_bytes', 'method', 'theta', 'workers', 'pool', 'dtype', 'tol')
+    return {clave: params[clave] for clave in claves if clave in params}
+
+
+def _clave(params):
+    """Opciones que cambian el resultado (las de _opciones salvo el paralelismo)."""
+    return {c: v for c, v in _opciones(params).items() if c not in ('workers', 'pool')}
+
+
+def _plt():
+    """
+    matplotlib.pyplot, que se importa recién al dibujar.
+
+    Así importar este módulo para calcular (Ef, V, en los procesos de un
+    pool) solo carga NumPy, y no elige un backend de matplotlib.
+    """
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _figura(params, figsize, proyeccion=None, **opciones):
     """
-    k = 9E9   #Constante de Coulomb en las unidades correspondientes.
+    La figura y los ejes donde dibuja un gráfico.
+
+    Con ax= en params se dibuja en esos ejes; con figura= (una Figure, por
+    ejemplo la que reutiliza frautnEM.lote) se la vacía y se le agregan ejes;
+    si no, se crea una figura nueva de pyplot.
+    """
+    ax = params.get('ax')
+    if ax is not None:
+        return ax.figure, ax
+    fig = params.get('figura')
+    if fig is None:
+        fig = _plt().figure(figsize=figsize, **opciones)
+    else:
+        fig.clear()
+        fig.set_size_inches(figsize)
+        fig.set_facecolor(opciones.get('facecolor', 'white'))
+    return fig, fig.add_subplot(projection=proyeccion)
+
+
+def _mostrar(params):
+    """Muestra la figura con pyplot, salvo con mostrar=False (o ax=, figura=)."""
+    if params.get('mostrar', 'ax' not in params and 'figura' not in params):
+        with perfil.etapa('mostrar'):
+            _plt().show()
+
+
+@perfil.medido
+def calcularEf(Q, **params):
+    """
+    Calcula el campo que muestra plotEf, sin graficarlo.
+
+    Recibe los mismos parámetros de la grilla que plotEf (dx, dy, w) y las
+    opciones del cálculo del campo (ver Ef). Devuelve un FieldResult que
+    plotEf acepta en lugar de Q y que se puede guardar con guardar().
+    """
+
+    dx = params.get('dx', 5)
+    dy = params.get('dy', dx)
+    w = params.get('w', 100)
+
+    Q = ChargeSet.desde(Q)
+    meta = {'tipo': 'plotEf', 'dx': dx, 'dy': dy, 'w': w}
 
-    V = 0
-    for qi in Q:
-        r = ((x - qi[1])**2 + (y - qi[2])**2 + (z - qi[3])**2)**(1/2)
-        V = V + k * qi[0] / r
+    def calcular():
+        # Convirtiendo w a número complejo se incluye el extremo del intervalo en mgrid.
+        with perfil.etapa('grilla'):
+            Y, X = np.mgrid[-dx:dx:w*1j, -dy:dy:w*1j]
+            Z = 0*X
+        Ei, Ej, Ek = Ef(X,Y,Z,Q, **_opciones(params))
+        return FieldResult(X, Y, Z, Ei=Ei, Ej=Ej, Ek=Ek, Q=Q, meta=meta)
 
-    return V
+    return cache.consultar('plotEf', Q, dict(meta, **_clave(params)), calcular)
 
 
 # 20240717
 # TODO: Return axs, add
 # more control over plotting parameters.
 # Add examples in the docstring.
+@perfil.medido
 def plotEf(Q, **params):
     """
     Muestra las líneas de campo eléctrico en 2D.
 
     Parameters
     ----------
-    Q : list
+    Q : list, ChargeSet o FieldResult
         Q = [
             [q1,x1,y1,z1],
             [q2,x2,y2,z2],
             ...
             [qN,xN,yN,zN]
         ]
+        Con un FieldResult de calcularEf no se vuelve a calcular el campo.
     dx : float
         Se produce una grilla con -dx <= x <= dx. Si dy = 0,
         se usan los mismos intervalos para esa variable: -dx <= y <= dx.
@@ -90,56 +341,68 @@ def plotEf(Q, **params):
         La grilla puede tener distintas dimensiones en cada eje.
     w : integer (opcional)
         Cantidad de particiones de cada dimensión en la grilla.
-
+    method, theta, tol, max_bytes, workers, pool, dtype : (opcional)
+        Opciones del cálculo del campo, ver Ef.
+    trazador : bool (opcional)
+        Traza las líneas desde las cargas positivas (ver
+        frautnEM.lineas.lineasDeCampo) en lugar de usar streamplot sobre
+        la grilla, que entonces no se calcula.
+    lineas : int (opcional)
+        Con trazador, líneas que salen de la carga de mayor |q|.
+
+    ax : Axes (opcional)
+        Ejes donde dibujar, en lugar de crear una figura.
     *Además de los parámetros de matplotlib y streamplot, por ejemplo:*
     figsize : tuple
     title : string
     """
 
-    dx = params.get('dx', 5)
-    dy = params.get('dy', dx)
-    w = params.get('w', 100)
+    trazador = params.get('trazador', False)
+    if trazador and not isinstance(Q, FieldResult):
+        Q = ChargeSet.desde(Q)
+        dx = params.get('dx', 5)
+        dy = params.get('dy', dx)
+    else:
+        F = Q if isinstance(Q, FieldResult) else calcularEf(Q, **params)
+        Q, dx, dy = F.Q, F.meta['dx'], F.meta['dy']
 
     figsize = params.get('figsize', (5,5))
     title = params.get('title', 'Líneas de campo')
     linewidth = params.get('linewidth', 0.4)
     density = params.get('density', 0.7)
 
-    # Convirtiendo w a número complejo se incluye el extremo del intervalo en mgrid.
-    w = w * 1j
-    Y, X = np.mgrid[-dx:dx:w, -dy:dy:w]
-    Z = 0*X
-
-    Ei, Ej, Ek = Ef(X,Y,Z,Q)
-
-    fig, axs = plt.subplots(1, 1, figsize=figsize)
-    strm = axs.streamplot(X, Y, Ei, Ej, color='b',
-                        linewidth=linewidth, density=density)
-    for q in Q:
-        qq, xq, yq, zq = q
-        if qq > 0:
-            colorq = 'red'
-        else :
-            colorq = 'green'
-        circ = plt.Circle((xq,yq), dx*0.02, color=colorq)
-        axs.add_patch(circ)
+    fig, axs = _figura(params, figsize)
+    if trazador:
+        # La grilla de calcularEf va de -dy a dy en x y de -dx a dx en y.
+        caja = [[-dy, -dx, -1], [dy, dx, 1]]
+        L = lineas.lineasDeCampo(Q, params.get('lineas', 16), caja, plano=('z', 0),
+                                 **_opcionesLineas(params))
+        _dibujarLineas(axs, L, (1, 2), 'b', linewidth)
+        axs.set_xlim(-dy, dy)
+        axs.set_ylim(-dx, dx)
+    else:
+        with perfil.etapa('streamplot'):
+            strm = axs.streamplot(F.X, F.Y, F.Ei, F.Ej, color='b',
+                                linewidth=linewidth, density=density)
+    _dibujarCargas(axs, Q, dx*0.02)
     axs.set_title(title)
     axs.set_xlabel('$x$ [m]')
     axs.set_ylabel('$y$ [m]')
-    plt.grid()
+    axs.grid()
 
 
-#TODO: add 3d version.
+@perfil.medido
 def plotEfcontribuciones(Ef, Q, x, **params):
     """
-    Muestra los vectores de cada porción de un cuerpo extenso, ¡en 2D!
-    (no usar este código si las cargas están distribuidas en 3D).
+    Muestra los vectores de cada porción de un cuerpo extenso, en 2D (las
+    cargas se proyectan sobre el plano xy) o en 3D. Cada distribución
+    continua de Q aporta un vector, que se dibuja desde su centro.
 
     Parameters
     ----------
     Ef : function
         Una función de un campo vectorial (3 variables que devuelve 3 componentes).
-    Q : list
+    Q : list o ChargeSet
         Q = [
             [q1,x1,y1,z1],
             [q2,x2,y2,z2],
@@ -149,7 +412,7 @@ def plotEfcontribuciones(Ef, Q, x, **params):
     X : tuple
         Posición donde se calcula el campo.
     limites : tuple
-        Lmites de los ejes: [xmin, xmax, ymin, ymax]
+        Lmites de los ejes: [xmin, xmax, ymin, ymax] (y zmin, zmax en 3D).
     scale : float
         Regula la longitud de las flechas.
     r : float
@@ -158,7 +421,17 @@ def plotEfcontribuciones(Ef, Q, x, **params):
         Grosor de las líneas que muestran la dirección.
     in3D : bool
         If True, it produces a 3D graph.
-
+    grupos : int (opcional)
+        Para cuerpos discretizados en muchas cargas: se agrupan en celdas
+        cúbicas, con a lo sumo grupos celdas por eje, y se dibuja una flecha
+        por celda, con la suma de las contribuciones de sus cargas, desde el
+        centro de carga de la celda (ver muestreo.agrupar).
+
+    ax : Axes (opcional)
+        Ejes donde dibujar, en lugar de crear una figura.
+    mostrar : bool (opcional)
+        Si es False no se llama a plt.show(), por ejemplo para guardar la
+        figura; por defecto se muestra salvo que se pase ax.
     *Además de los parámetros de matplotlib y quiver, por ejemplo:*
     length : float
     figsize : tuple
@@ -170,38 +443,23 @@ def plotEfcontribuciones(Ef, Q, x, **params):
     scale = params.get('scale', 1)
     linewidth = params.get('linewidth', 0.5)
     in3D = params.get('in3D', False)
-
-    xmin, xmax, ymin, ymax, zmin, zmax = x[0],x[0],x[1],x[1], x[2], x[2]
-    x_pos = []
-    y_pos = []
-    z_pos = []
-    Ei = []
-    Ej = []
-    Ek = []
-    modulos = []
-    for q in Q:
-        Eii, Ejj, Ekk = Ef(x[0],x[1],x[2],[q])
-        # Elige límites para cuando el parámetro límites no es informado.
-        if q[1] > xmax:
-            xmax = q[1]
-        if q[1] < xmin:
-            xmin = q[1]
-        if q[2] > ymax:
-            ymax = q[2]
-        if q[2] < ymin:
-            ymin = q[2]
-        if q[3] > zmax:
-            zmax = q[3]
-        if q[3] < zmin:
-            zmin = q[3]
-        x_pos = np.concatenate((x_pos,x[0]), axis=None)
-        y_pos = np.concatenate((y_pos,x[1]), axis=None)
-        z_pos = np.concatenate((z_pos,x[2]), axis=None)
-        modulo = np.sqrt(Eii**2 + Ejj**2 + Ekk**2)
-        modulos = np.concatenate((modulos, modulo), axis=None)
-        Ei = np.concatenate((Ei, Eii), axis=None)
-        Ej = np.concatenate((Ej, Ejj), axis=None)
-        Ek = np.concatenate((Ek, Ekk), axis=None)
+    grupos = params.get('grupos')
+
+    Q = ChargeSet.desde(Q)
+    Ei, Ej, Ek = _contribuciones(Ef, Q, x)
+    if Q.cuerpos:
+        # Las distribuciones, como cargas puntuales en sus centros.
+        Q = ChargeSet.desdeArreglos(np.concatenate((Q.q, [c.carga for c in Q.cuerpos])),
+                                    np.concatenate((Q.r, [c.centro for c in Q.cuerpos])))
+    if grupos is not None:
+        Q, Ei, Ej, Ek = _agrupar(Q, (Ei, Ej, Ek), grupos)
+    x_pos = np.full(len(Q), x[0], dtype=float)
+    y_pos = np.full(len(Q), x[1], dtype=float)
+    z_pos = np.full(len(Q), x[2], dtype=float)
+    modulos = np.sqrt(Ei**2 + Ej**2 + Ek**2)
+
+    # Elige límites para cuando el parámetro límites no es informado.
+    (xmin, ymin, zmin), (xmax, ymax, zmax) = _limites(x, Q)
 
     # Se expanden los límites automáticos:
     xmax = xmax + (xmax - xmin)*0.2
@@ -219,48 +477,103 @@ def plotEfcontribuciones(Ef, Q, x, **params):
     Ek = np.round(Ek/np.max(modulos),3)
 
     if in3D:
-        limites = params.get('limites', [xmin,xmax,ymin,ymax, zmin, zmax])
+        limites = params.get('limites', _separar([xmin,xmax,ymin,ymax, zmin, zmax]))
     else:
-        limites = params.get('limites', [xmin,xmax,ymin,ymax])
+        limites = params.get('limites', _separar([xmin,xmax,ymin,ymax]))
 
     arrwidth = params.get('arrwidth', 0.005*(limites[1]-limites[0]))
     
     # Creating plot
+    from matplotlib.collections import LineCollection
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
     if in3D:
-        pass
+        fig, ax = _figura(params, figsize, '3d')
+
+        # La flecha más larga mide medio ancho del gráfico (con scale=1); los
+        # límites automáticos se agrandan para que se vean las puntas.
+        largo = 0.5*(limites[1]-limites[0])/scale
+        ax.quiver(x_pos, y_pos, z_pos, Ei, Ej, Ek, length=largo)
+        if 'limites' not in params:
+            puntas = np.asarray(x, dtype=float) + largo*np.stack((Ei, Ej, Ek), axis=-1)
+            (xmin, ymin, zmin), (xmax, ymax, zmax) = _limites(limites[::2], puntas)
+            xmax, ymax, zmax = np.maximum((xmax, ymax, zmax), limites[1::2])
+            limites = _separar([xmin, xmax, ymin, ymax, zmin, zmax])
+
+        segmentos = np.zeros((len(Q), 2, 3))
+        segmentos[:, 0] = Q.r
+        segmentos[:, 1] = x[0], x[1], x[2]
+        ax.add_collection3d(Line3DCollection(segmentos, colors='b', linewidths=linewidth,
+                                             linestyles='dashed'))
+        # Puntos en lugar de esferas: con muchas cargas se dibujan mucho más rápido.
+        ax.scatter(Q.x, Q.y, Q.z, c=np.where(Q.positivas, 'red', 'green'), depthshade=False)
+        ax.set_xlabel('$x$ [m]')
+        ax.set_ylabel('$y$ [m]')
+        ax.set_zlabel('$z$ [m]')
+        ax.set_xlim(limites[0], limites[1])
+        ax.set_ylim(limites[2], limites[3])
+        ax.set_zlim(limites[4], limites[5])
     else:
-        fig, ax = plt.subplots(figsize = figsize)
+        fig, ax = _figura(params, figsize)
 
         # ax.quiver(x_pos, y_pos, Ei, Ej, angles='xy', scale_units='xy', scale=scale)
         ax.quiver(x_pos, y_pos, Ei, Ej, scale=scale, width=arrwidth)
 
-        # Necesito un for separado para determinar el tamaño de los círculos.
-        for q in Q:
-            qq, xq, yq, zq = q
-            ax.plot([xq,x[0]], [yq,x[1]], color='b', linewidth=linewidth, linestyle='dashed')
-            if qq > 0:
-                colorq = 'red'
-            else :
-                colorq = 'green'
-            circ = plt.Circle((xq,yq), r, color=colorq)
-            ax.add_patch(circ)
+        # Las líneas y los círculos se dibujan después de conocer el tamaño de los círculos.
+        segmentos = np.zeros((len(Q), 2, 2))
+        segmentos[:, 0, 0], segmentos[:, 0, 1] = Q.x, Q.y
+        segmentos[:, 1] = x[0], x[1]
+        ax.add_collection(LineCollection(segmentos, colors='b', linewidths=linewidth,
+                                         linestyles='dashed'))
+        _dibujarCargas(ax, Q, r)
         # ax.set_title(title)
         ax.set_xlabel('$x$ [m]')
         ax.set_ylabel('$y$ [m]')
+        ax.axis(limites)
 
-    ax.axis(limites)
     ax.set_title(title)
-    plt.show()
+    _mostrar(params)
     # plt.close()
 
+
+def _separar(limites):
+    """
+    Los límites [min, max, ...] de los ejes, con los iguales (por ejemplo,
+    z con todas las cargas en un plano) separados en un 10% del mayor rango.
+    """
+    lim = np.array(limites, dtype=float).reshape(-1, 2)
+    rango = lim[:, 1] - lim[:, 0]
+    margen = 0.1 * rango.max() if rango.max() > 0 else 1.0
+    lim[rango == 0] += (-margen, margen)
+    return lim.ravel().tolist()
+
+
+def _agrupar(Q, E, celdas):
+    """
+    Agrupa las cargas Q y sus contribuciones E (terna de arreglos (N,)) en
+    celdas (ver muestreo.agrupar).
+
+    Cada grupo es una carga con la carga total de sus cargas, ubicada en su
+    centro de carga (pesado con |q|), y su contribución es la suma de las
+    contribuciones de sus cargas.
+    """
+    etiquetas, G = muestreo.agrupar(Q.r, celdas)
+    suma = lambda w: np.bincount(etiquetas, weights=w, minlength=G)
+    q = np.abs(Q.q)
+    peso = suma(q)
+    # Si las cargas de un grupo suman |q| = 0, se toma el centro geométrico.
+    w = np.where(peso[etiquetas] > 0, q, 1)
+    centro = np.stack([suma(w * c) for c in Q.r.T], axis=-1) / suma(w)[:, None]
+    return (ChargeSet.desdeArreglos(suma(Q.q), centro),) + tuple(suma(e) for e in E)
+
 # 20240819
+@perfil.medido
 def plotEfVector(Q, X, **params):
     """
     Muestra los vectores del campo en 2D usando pyplot.quiver.
 
     Parameters
     ----------
-    Q : list
+    Q : list o ChargeSet
         Q = [
             [q1,x1,y1,z1],
             [q2,x2,y2,z2],
@@ -274,6 +587,11 @@ def plotEfVector(Q, X, **params):
     scale : float
         Regula la longitud de las flechas.
 
+    ax : Axes (opcional)
+        Ejes donde dibujar, en lugar de crear una figura.
+    mostrar : bool (opcional)
+        Si es False no se llama a plt.show(), por ejemplo para guardar la
+        figura; por defecto se muestra salvo que se pase ax.
     *Además de los parámetros de matplotlib y quiver, por ejemplo:*
     length : float
     figsize : tuple
@@ -284,51 +602,24 @@ def plotEfVector(Q, X, **params):
     title = params.get('title', "Algunos vectores de campo eléctrico")
     scale = params.get('scale', 1)
 
-    xmin, xmax, ymin, ymax = 0,0,0,0
-    x_pos = []
-    y_pos = []
-    Ei = []
-    Ej = []
-    for x in X:
-        Eii, Ejj, Ekk = Ef(x[0],x[1],x[2],Q)
-
-        # Elige límites para cuando el parámetro límites no es informado.
-        if x[0] > xmax:
-            xmax = x[0]
-        if x[0] < xmin:
-            xmin = x[0]
-        if x[1] > ymax:
-            ymax = x[1]
-        if x[1] < ymin:
-            ymin = x[1]
-        x_pos = np.concatenate((x_pos,x[0]), axis=None)
-        y_pos = np.concatenate((y_pos,x[1]), axis=None)
-        N = np.sqrt(Eii**2 + Ejj**2)*1.5
-        Ei = np.concatenate((Ei, Eii/N), axis=None)
-        Ej = np.concatenate((Ej, Ejj/N), axis=None)
+    Q = ChargeSet.desde(Q)
+    P = _puntos(X)
+    Eii, Ejj, Ekk = _enPuntos(Ef, P, Q)
+    (xmin, ymin, _), (xmax, ymax, _) = _limites((0, 0, 0), P)
+    x_pos, y_pos = P[:, 0], P[:, 1]
+    N = np.sqrt(Eii**2 + Ejj**2)*1.5
+    Ei, Ej = Eii/N, Ejj/N
 
     # Creating plot
-    fig, ax = plt.subplots(figsize = figsize)
+    fig, ax = _figura(params, figsize)
     ax.quiver(x_pos, y_pos, Ei, Ej, angles='xy', scale_units='xy', scale=scale)
 
-    for q in Q:
-        qq, xq, yq, zq = q
-        # Elige límites para cuando el parámetro límites no es informado.
-        if xq > xmax:
-            xmax = xq
-        if xq < xmin:
-            xmin = xq
-        if yq > ymax:
-            ymax = yq
-        if yq < ymin:
-            ymin = yq
-
-        if qq > 0:
-            colorq = 'red'
-        else :
-            colorq = 'green'
-        circ = plt.Circle((xq,yq), np.max(np.abs(X))*0.02, color=colorq)
-        ax.add_patch(circ)
+    # Elige límites para cuando el parámetro límites no es informado.
+    if len(Q):
+        (xqmin, yqmin, _), (xqmax, yqmax, _) = Q.caja
+        xmin, xmax = min(xmin, xqmin), max(xmax, xqmax)
+        ymin, ymax = min(ymin, yqmin), max(ymax, yqmax)
+    _dibujarCargas(ax, Q, np.max(np.abs(X))*0.02)
     # ax.set_title(title)
     ax.set_xlabel('$x$ [m]')
     ax.set_ylabel('$y$ [m]')
@@ -342,11 +633,12 @@ def plotEfVector(Q, X, **params):
     limites = params.get('limites', [xmin,xmax,ymin,ymax])
     ax.axis(limites)
     ax.set_title(title)
-    plt.show()
+    _mostrar(params)
     # plt.close()
 
 
 # 20240703
+@perfil.medido
 def plotEfVectorHilo(Ehilo, E, Lambda, Q, X, **params):
     """
     Muestra los vectores del campo en 2D calculados con dos métodos distintos.
@@ -361,7 +653,7 @@ def plotEfVectorHilo(Ehilo, E, Lambda, Q, X, **params):
         Una función de un campo vectorial (3 variables que devuelve 3 componentes).
     Lambda: float
         Densidad lineal de carga del segmento, en C/m.
-    Q : list
+    Q : list o ChargeSet
         Q = [
             [q1,x1,y1,z1],
             [q2,x2,y2,z2],
@@ -375,6 +667,11 @@ def plotEfVectorHilo(Ehilo, E, Lambda, Q, X, **params):
     scale : float
         Regula la longitud de las flechas.
 
+    ax : Axes (opcional)
+        Ejes donde dibujar, en lugar de crear una figura.
+    mostrar : bool (opcional)
+        Si es False no se llama a plt.show(), por ejemplo para guardar la
+        figura; por defecto se muestra salvo que se pase ax.
     *Además de los parámetros de matplotlib y quiver, por ejemplo:*
     length : float
     figsize : tuple
@@ -385,61 +682,30 @@ def plotEfVectorHilo(Ehilo, E, Lambda, Q, X, **params):
     title = params.get('title', "Algunos vectores del campo eléctrico de un segmento.")
     scale = params.get('scale', 1)
 
-    xmin, xmax, ymin, ymax = 0,0,0,0
-    x_pos = []
-    y_pos = []
-    Ei = []
-    Ej = []
-    for x in X:
-        Eii, Ejj, Ekk = E(x[0],x[1],x[2],Q)
-
-        # Elige límites para cuando el parámetro límites no es informado.
-        if x[0] > xmax:
-            xmax = x[0]
-        if x[0] < xmin:
-            xmin = x[0]
-        if x[1] > ymax:
-            ymax = x[1]
-        if x[1] < ymin:
-            ymin = x[1]
-        x_pos = np.concatenate((x_pos,x[0]), axis=None)
-        y_pos = np.concatenate((y_pos,x[1]), axis=None)
-        N = np.sqrt(Eii**2 + Ejj**2)*1.5
-        Ei = np.concatenate((Ei, Eii/N), axis=None)
-        Ej = np.concatenate((Ej, Ejj/N), axis=None)
-
-    Eihilo = []
-    Ejhilo = []
-    for x in X:
-        Eii, Ejj, Ekk = Ehilo(x[0],x[1],x[2],Lambda)
-        N = np.sqrt(Eii**2 + Ejj**2)*1.5
-        Eihilo = np.concatenate((Eihilo, Eii/N), axis=None)
-        Ejhilo = np.concatenate((Ejhilo, Ejj/N), axis=None)
+    Q = ChargeSet.desde(Q)
+    P = _puntos(X)
+    Eii, Ejj, Ekk = _enPuntos(E, P, Q)
+    (xmin, ymin, _), (xmax, ymax, _) = _limites((0, 0, 0), P)
+    x_pos, y_pos = P[:, 0], P[:, 1]
+    N = np.sqrt(Eii**2 + Ejj**2)*1.5
+    Ei, Ej = Eii/N, Ejj/N
+
+    Eii, Ejj, Ekk = _enPuntos(Ehilo, P, Lambda)
+    N = np.sqrt(Eii**2 + Ejj**2)*1.5
+    Eihilo, Ejhilo = Eii/N, Ejj/N
 
 
     # Creating plot
-    fig, ax = plt.subplots(figsize = figsize)
+    fig, ax = _figura(params, figsize)
     ax.quiver(x_pos, y_pos, Ei, Ej, angles='xy', scale_units='xy', scale=scale)
     ax.quiver(x_pos, y_pos, Eihilo, Ejhilo, angles='xy', scale_units='xy', scale=scale, color='blue')
 
-    for q in Q:
-        qq, xq, yq, zq = q
-        # Elige límites para cuando el parámetro límites no es informado.
-        if xq > xmax:
-            xmax = xq
-        if xq < xmin:
-            xmin = xq
-        if yq > ymax:
-            ymax = yq
-        if yq < ymin:
-            ymin = yq
-
-        if qq > 0:
-            colorq = 'red'
-        else :
-            colorq = 'green'
-        circ = plt.Circle((xq,yq), np.max(np.abs(X))*0.02, color=colorq)
-        ax.add_patch(circ)
+    # Elige límites para cuando el parámetro límites no es informado.
+    if len(Q):
+        (xqmin, yqmin, _), (xqmax, yqmax, _) = Q.caja
+        xmin, xmax = min(xmin, xqmin), max(xmax, xqmax)
+        ymin, ymax = min(ymin, yqmin), max(ymax, yqmax)
+    _dibujarCargas(ax, Q, np.max(np.abs(X))*0.02)
     # ax.set_title(title)
     ax.set_xlabel('$x$ [m]')
     ax.set_ylabel('$y$ [m]')
@@ -453,11 +719,147 @@ def plotEfVectorHilo(Ehilo, E, Lambda, Q, X, **params):
     limites = params.get('limites', [xmin,xmax,ymin,ymax])
     ax.axis(limites)
     ax.set_title(title)
-    plt.show()
+    _mostrar(params)
     # plt.close()
 
 
+def _puntos(X):
+    """Las posiciones X (lista de [x, y, z]) como arreglo (M, 3)."""
+    return np.asarray(X, dtype=float).reshape(-1, 3)
+
+
+def _enPuntos(f, P, *args):
+    """
+    Componentes de f(x, y, z, *args) en todos los puntos P (M, 3).
+
+    Se evalúa f una sola vez con todos los puntos; si f solo acepta
+    escalares (con math.sqrt, por ejemplo, da TypeError, y con un if sobre
+    las coordenadas, ValueError), se evalúa punto por punto. Cualquier otro
+    error de f se propaga.
+    """
+    try:
+        E = f(P[:, 0], P[:, 1], P[:, 2], *args)
+    except (TypeError, ValueError):
+        E = [f(x[0], x[1], x[2], *args) for x in P]
+        return [np.concatenate([e[i] for e in E], axis=None) for i in range(3)]
+    return [np.broadcast_to(np.asarray(e, dtype=float), (len(P),)) for e in E]
+
+
+def _contribuciones(f, Q, x):
+    """
+    Campo de cada carga de Q en el punto x, como tres arreglos (N,), seguido
+    del de cada distribución continua de Q.
+
+    Con el Ef de este módulo todas las contribuciones de las cargas
+    puntuales salen de una sola evaluación; con otra función, se la llama
+    carga por carga (y cuerpo por cuerpo).
+    """
+    if f is Ef:
+        x = np.asarray(x, dtype=float)
+        E = nucleo.contribuciones(x, Q.C)
+        if Q.cuerpos:
+            E = np.concatenate([E] + [c.campo(x)[1] for c in Q.cuerpos])
+        return E.T
+    E = [f(x[0], x[1], x[2], [q]) for q in list(Q) + list(Q.cuerpos)]
+    return [np.concatenate([e[i] for e in E], axis=None) for i in range(3)]
+
+
+def _limites(x, P):
+    """
+    Caja [[xmin, ymin, zmin], [xmax, ymax, zmax]] que contiene al punto x y
+    a los puntos (o cargas) P.
+    """
+    x = np.asarray(x, dtype=float)
+    if len(P) == 0:
+        return np.stack((x, x))
+    caja = P.caja if isinstance(P, ChargeSet) else np.stack((P.min(axis=0), P.max(axis=0)))
+    return np.stack((np.minimum(x, caja[0]), np.maximum(x, caja[1])))
+
+
+@perfil.medido
+def calcularEfvector3d(Q, **params):
+    """
+    Calcula el campo que muestra plotEfvector3d, sin graficarlo.
+
+    Recibe los mismos parámetros de la grilla que plotEfvector3d (dx, dy, dz,
+    w) y las opciones del cálculo del campo (ver Ef). Devuelve un FieldResult
+    que plotEfvector3d acepta en lugar de Q.
+    """
+
+    dx = params.get('dx', 6)
+    dy = params.get('dy', dx)
+    dz = params.get('dz', dx)
+    w = params.get('w', 100)
+
+    Q = ChargeSet.desde(Q)
+    meta = {'tipo': 'plotEfvector3d', 'dx': dx, 'dy': dy, 'dz': dz, 'w': w}
+
+    def calcular():
+        # Convirtiendo w a número complejo se incluye el extremo del intervalo en mgrid.
+        with perfil.etapa('grilla'):
+            X, Y, Z = np.mgrid[-dx:dx:w*1j, -dy:dy:w*1j, -dz:dz:w*1j]
+        Ei, Ej, Ek = Ef(X,Y,Z,Q, **_opciones(params))
+        return FieldResult(X, Y, Z, Ei=Ei, Ej=Ej, Ek=Ek, Q=Q, meta=meta)
+
+    return cache.consultar('plotEfvector3d', Q, dict(meta, **_clave(params)), calcular)
+
+
+@perfil.medido
+def calcularVolumen(archivo, Q, calcV=False, calcE=True, memoria=None, **params):
+    """
+    Calcula el campo de plotEfvector3d en un volumen en disco (ver volumen).
+
+    La grilla (dx, dy, dz, w) es la de calcularEfvector3d, pero se recorre
+    por losas de planos x que ocupan a lo sumo memoria bytes (256 MiB por
+    defecto), y cada losa se escribe directamente en el archivo: el volumen
+    puede ser mucho más grande que la memoria. Con dtype=np.float32 el
+    archivo ocupa la mitad.
+
+    Parameters
+    ----------
+    archivo : str
+        Archivo a crear (se sobrescribe si existe).
+    Q : list o ChargeSet
+        Cargas, como en Ef.
+    calcV, calcE : bool
+        Qué magnitudes calcular y guardar.
+    memoria : int (opcional)
+        Memoria máxima de cada losa.
+    dx, dy, dz, w, method, theta, tol, max_bytes, workers, pool, dtype : (opcional)
+        Parámetros de la grilla y del cálculo del campo, ver plotEfvector3d.
+
+    Returns
+    -------
+    volumen.Volumen
+        Abierto para lectura; plotEfvector3d lo acepta en lugar de Q.
+    """
+    dx = params.get('dx', 6)
+    dy = params.get('dy', dx)
+    dz = params.get('dz', dx)
+    w = params.get('w', 100)
+
+    Q = ChargeSet.desde(Q)
+    opciones = _opciones(params)
+    componentes = ('V',) * calcV + ('Ei', 'Ej', 'Ek') * calcE
+    meta = {'tipo': 'plotEfvector3d', 'dx': dx, 'dy': dy, 'dz': dz, 'w': w}
+    vol = volumen.Volumen.crear(archivo, (w, w, w), (-dx, -dy, -dz), (dx, dy, dz), componentes,
+                                params.get('dtype') or float, Q, meta)
+
+    def evaluar(x, y, z, out):
+        if calcV and calcE:
+            VEf(x, y, z, Q, out=out, **opciones)
+        elif calcV:
+            V(x, y, z, Q, out=out[0], **opciones)
+        else:
+            Ef(x, y, z, Q, out=out, **opciones)
+
+    vol.llenar(evaluar, memoria)
+    del vol
+    return volumen.Volumen(archivo)
+
+
 # 20240819
+@perfil.medido
 def plotEfvector3d(Q, **params):
     """
     Muestra los vectores del campo de un sistema de cargas puntuales
@@ -465,72 +867,252 @@ def plotEfvector3d(Q, **params):
 
     Parameters
     ----------
-    Q : list
+    Q : list, ChargeSet, FieldResult o volumen.Volumen
         Q = [
             [q1,x1,y1,z1],
             [q2,x2,y2,z2],
             ...
             [qN,xN,yN,zN]
         ]
+        Con un FieldResult de calcularEfvector3d no se vuelve a calcular el campo.
+        De un Volumen de calcularVolumen solo se leen las flechas a dibujar
+        (4096 si no se indican flechas ni cortes); debe tener Ei, Ej y Ek.
     dx,dy,dz : float
         Se produce una grilla con -dx <= x <= dx, -dy <= y <= dy, -dz <= z <= dz.
         Si solo se informa dx, se usa el mismo valor para dy y dz. dx=6 por defecto.
     w : integer (opcional)
         Cantidad de particiones de cada dimensión en la grilla.
+    method, theta, tol, max_bytes, workers, pool, dtype : (opcional)
+        Opciones del cálculo del campo, ver Ef.
     X,Y,Z: 1D, 2D or 3D array-like, optional
         The coordinates of the arrow locations. If dx is given, these are ignored.
-
+    flechas : int (opcional)
+        Cantidad máxima de flechas a dibujar (ver frautnEM.muestreo). Las
+        que quedan dentro de las esferas de las cargas no se dibujan.
+    muestreo : 'estratificado' o 'modulo' (opcional)
+        Cómo elegir las flechas: repartidas uniformemente (por defecto; el
+        campo se calcula solo en ellas) o más densas donde el campo es
+        más intenso (se calcula toda la grilla).
+    cortes : list (opcional)
+        Planos de corte a dibujar, por ejemplo [('z', 0), ('x', 2)]; el
+        campo se calcula solo en ellos.
+    semilla : int (opcional)
+        Semilla del muestreo al azar.
+
+    ax : Axes (opcional)
+        Ejes donde dibujar, en lugar de crear una figura.
     *Además de los parámetros de matplotlib y quiver, por ejemplo:*
     length : float
     figsize : tuple
     title : string
     """
 
-    dx = params.get('dx', 6)
-    dy = params.get('dy', dx)
-    dz = params.get('dz', dx)
-    w = params.get('w', 100)
+    flechas = params.get('flechas')
+    cortes = params.get('cortes')
+    if isinstance(Q, volumen.Volumen):
+        Q.requerir('Ei', 'Ej', 'Ek')
+        if flechas is None and cortes is None:
+            params = dict(params, flechas=volumen.FLECHAS)
+            flechas = volumen.FLECHAS
+    if flechas is None and cortes is None:
+        F = Q if isinstance(Q, FieldResult) else calcularEfvector3d(Q, **params)
+        Q, dx = F.Q, F.meta['dx']
+        X, Y, Z, Ei, Ej, Ek = F.X, F.Y, F.Z, F.Ei, F.Ej, F.Ek
+        resolucion = 100
+    else:
+        Q, dx, (X, Y, Z, Ei, Ej, Ek) = _flechas3d(Q, **params)
+        resolucion = 100 if len(Q) <= 10 else 16
     length = params.get('length', dx * 0.15)
 
     figsize = params.get('figsize', (4,4))
     title = params.get('title', 'Campo eléctrico')
     linewidth = params.get('linewidth', 0.4)
 
-    # Convirtiendo w a número complejo se incluye el extremo del intervalo en mgrid.
-    w = w * 1j
-    X, Y, Z = np.mgrid[-dx:dx:w, -dy:dy:w, -dz:dz:w]
-
-    Ei, Ej, Ek = Ef(X,Y,Z,Q)
-
-    fig, axs = plt.subplots(1, 1, figsize=figsize)
-    axs = fig.add_subplot(projection='3d')
+    fig, axs = _figura(params, figsize, '3d')
     axs.quiver(X, Y, Z, Ei, Ej, Ek, length=length, normalize=True)
 
     # Graficar las cargas.
-    u = np.linspace(0, 2 * np.pi, 100)
-    v = np.linspace(0, np.pi, 100)
+    u = np.linspace(0, 2 * np.pi, resolucion)
+    v = np.linspace(0, np.pi, resolucion)
     xc = dx * 0.04 * np.outer(np.cos(u), np.sin(v))
     yc = dx * 0.04 * np.outer(np.sin(u), np.sin(v))
     zc = dx * 0.04 * np.outer(np.ones(np.size(u)), np.cos(v))
 
-    for q in Q:
-        qq, xq, yq, zq = q
-        if qq > 0:
-            colorq = 'red'
-        else :
-            colorq = 'green'
+    for xq, yq, zq, positiva in zip(Q.x, Q.y, Q.z, Q.positivas):
+        colorq = 'red' if positiva else 'green'
         axs.plot_surface(xc + xq, yc + yq, zc + zq, color=colorq)
+    for c in Q.cuerpos:
+        for l in c.contorno():
+            axs.plot(*l.T, color='red' if c.carga > 0 else 'green', linewidth=2)
     axs.set_title(title)
     axs.set_xlabel('$x$ [m]')
     axs.set_ylabel('$y$ [m]')
-    plt.grid()
+    axs.grid()
+
+def _flechas3d(Q, **params):
+    """
+    Puntos y campo de las flechas de plotEfvector3d con nivel de detalle.
+
+    Devuelve las cargas, dx y (X, Y, Z, Ei, Ej, Ek) de los puntos elegidos,
+    sin los que quedan dentro de las esferas de las cargas.
+    """
+    flechas = params.get('flechas')
+    cortes = params.get('cortes')
+    modo = params.get('muestreo', 'estratificado')
+    rng = np.random.default_rng(params.get('semilla', 0))
+    if isinstance(Q, volumen.Volumen):
+        # Solo se leen del archivo los puntos elegidos; con muestreo='modulo'
+        # se elige entre candidatos repartidos uniformemente, no en todo el volumen.
+        vol, Q, dx = Q, Q.Q, Q.meta.get('dx', float(np.max(np.abs(Q.hi))))
+        if modo == 'modulo' and flechas is not None:
+            ind = muestreo.seleccionar(vol.ejes, flechas * _CANDIDATOS, cortes, rng=rng)
+            *_, E = vol.puntos(ind)
+            modulo = np.sqrt(np.square(E['Ei']) + np.square(E['Ej']) + np.square(E['Ek']))
+            ind = ind[muestreo.porModulo(modulo, flechas, rng)]
+        else:
+            ind = muestreo.seleccionar(vol.ejes, flechas, cortes, rng=rng)
+        X, Y, Z, E = vol.puntos(ind)
+        valores = [X, Y, Z, E['Ei'], E['Ej'], E['Ek']]
+    elif isinstance(Q, FieldResult) or modo == 'modulo':
+        F = Q if isinstance(Q, FieldResult) else calcularEfvector3d(Q, **params)
+        Q, dx = F.Q, F.meta['dx']
+        ejes = (np.asarray(F.X)[:, 0, 0], np.asarray(F.Y)[0, :, 0], np.asarray(F.Z)[0, 0, :])
+        modulo = None
+        if modo == 'modulo':
+            modulo = np.sqrt(np.square(F.Ei) + np.square(F.Ej) + np.square(F.Ek))
+        ind = muestreo.seleccionar(ejes, flechas, cortes, modo, modulo, rng)
+        valores = [np.asarray(a).reshape(-1)[ind] for a in (F.X, F.Y, F.Z, F.Ei, F.Ej, F.Ek)]
+    else:
+        # Solo se calcula el campo en los puntos que se dibujan.
+        Q = ChargeSet.desde(Q)
+        dx = params.get('dx', 6)
+        dy = params.get('dy', dx)
+        dz = params.get('dz', dx)
+        w = params.get('w', 100)
+        ejes = tuple(np.linspace(-d, d, w) for d in (dx, dy, dz))
+        ind = muestreo.seleccionar(ejes, flechas, cortes, modo, rng=rng)
+        X, Y, Z = (e[i] for e, i in zip(ejes, np.unravel_index(ind, (w, w, w))))
+        valores = [X, Y, Z, *Ef(X, Y, Z, Q, **_opciones(params))]
+    P = np.stack(valores[:3], axis=-1)
+    ver = muestreo.visibles(P, Q.C, dx * 0.04)
+    return Q, dx, [a[ver] for a in valores]
+
+
+def _dibujarLineas(ax, L, columnas, color, linewidth):
+    """Dibuja las polilíneas L (de lineasDeCampo) en el plano de columnas, con una flecha en el medio."""
+    from matplotlib.collections import LineCollection
+    u, v = (c - 1 for c in columnas)
+    ax.add_collection(LineCollection([l[:, [u, v]] for l in L], colors=color,
+                                     linewidths=linewidth))
+    for l in L:
+        m = len(l) // 2
+        ax.annotate('', xy=l[m, [u, v]], xytext=l[m - 1, [u, v]],
+                    arrowprops=dict(arrowstyle='->', color=color, lw=linewidth))
+
+
+def _opcionesLineas(params):
+    """Opciones del cálculo del campo que acepta lineasDeCampo."""
+    return {c: v for c, v in _opciones(params).items() if c in ('method', 'theta', 'max_bytes')}
+
+
+def _dibujarCargas(ax, Q, radio, columnas=(1, 2), colores=('red', 'green'), cuerpos=None):
+    """
+    Dibuja las cargas de Q como círculos de radio dado, todas en una colección.
+
+    columnas elige las coordenadas de Q.T que se grafican (1, 2: x, y) y
+    colores, los de las cargas positivas y negativas. Las distribuciones
+    continuas (por defecto, las de Q) se dibujan con su contorno proyectado.
+    """
+    from matplotlib.collections import EllipseCollection, LineCollection
+    color = np.where(Q.positivas, *colores)
+    ax.add_collection(EllipseCollection(2*radio, 2*radio, 0, units='xy',
+                                        offsets=Q.T[list(columnas)].T,
+                                        offset_transform=ax.transData,
+                                        facecolors=color, edgecolors=color))
+    cuerpos = Q.cuerpos if cuerpos is None else cuerpos
+    if cuerpos:
+        ax.add_collection(LineCollection(
+            [l[:, [i - 1 for i in columnas]] for c in cuerpos for l in c.contorno()],
+            colors=[colores[0] if c.carga > 0 else colores[1]
+                    for c in cuerpos for l in c.contorno()],
+            linewidths=2))
 
 # Formatter para agregar V a las etiquetas de las equipotenciales.
 def fmtV(x):
     return f"{x}V"
 
+@perfil.medido
+def calcularEquipotenciales(Q, dim = 1, **params):
+    """
+    Calcula el potencial que grafica equipotencialesPuntuales, sin graficarlo.
+
+    Recibe dim, el plano (x=..., y=... o z=..., z=0 por defecto) y las
+    opciones del cálculo del campo (ver Ef). Devuelve un FieldResult que
+    equipotencialesPuntuales acepta en lugar de Q.
+
+    Con adaptativo=True el plano se muestrea con un quadtree (ver
+    frautnEM.adaptativo) que evalúa el potencial solo cerca de las cargas y
+    donde pasan los niveles (niveles=..., 10 por defecto); los niveles
+    usados y la cantidad de evaluaciones quedan en meta. Las grillas chicas
+    (menos de adaptativo.MINIMO puntos por eje, dim < 1.5) se evalúan
+    completas, que es más rápido.
+
+    Con EF=True (y sin adaptativo) también se calcula el campo eléctrico,
+    junto con el potencial (ver VEf).
+    """
+
+    Q = ChargeSet.desde(Q)
+    plano = 'x' if 'x' in params else 'y' if 'y' in params else 'z'
+    valor = params.get(plano, 0)
+    meta = {'tipo': 'equipotenciales', 'dim': dim, 'plano': plano, 'valor': float(valor)}
+    adaptar = params.get('adaptativo', False)
+    conCampo = params.get('EF', False) and not adaptar
+    if conCampo:
+        meta['EF'] = True
+    if adaptar:
+        lv = params.get('niveles', 10)
+        meta['adaptativo'] = True
+        meta['niveles_pedidos'] = int(lv) if np.isscalar(lv) else [float(v) for v in lv]
+
+    def calcular():
+        with perfil.etapa('grilla'):
+            eje = np.arange(-dim, dim+0.01, 0.01)
+            if plano == 'x':
+                Y, Z = np.meshgrid(eje, eje)
+                X = Y*0 + valor
+            elif plano == 'y':
+                X, Z = np.meshgrid(eje, eje)
+                Y = X*0 + valor
+            else:
+                X, Y = np.meshgrid(eje, eje)
+                Z = X*0 + valor
+        if conCampo:
+            Vmat, Ei, Ej, Ek = VEf(X,Y,Z,Q, **_opciones(params))
+            return FieldResult(X, Y, Z, V=Vmat, Ei=Ei, Ej=Ej, Ek=Ek, Q=Q, meta=meta)
+        if not adaptar:
+            Vmat = V(X,Y,Z,Q, **_opciones(params))
+            return FieldResult(X, Y, Z, V=Vmat, Q=Q, meta=meta)
+
+        # Coordenadas (u, v) del plano, como en meshgrid, y distancia al plano.
+        normal = ' xyz'.index(plano)
+        u, v = (c for c in (1, 2, 3) if c != normal)
+        cargas = np.stack((Q.T[u], Q.T[v], Q.T[normal] - valor), axis=-1)
+
+        def evaluar(pu, pv):
+            P = [None, None, None]
+            P[u - 1], P[v - 1], P[normal - 1] = pu, pv, 0*pu + valor
+            return V(*P, Q, **_opciones(params))
+
+        Vmat, lv, evaluados = adaptativo.potencial(eje, evaluar, cargas, meta['niveles_pedidos'])
+        return FieldResult(X, Y, Z, V=Vmat, Q=Q,
+                           meta=dict(meta, niveles=lv.tolist(), evaluaciones=evaluados))
+
+    return cache.consultar('equipotenciales', Q, dict(meta, **_clave(params)), calcular)
+
+
 # 20240821
 # Esta función puede mejorarse muchísimo, sobre todo respecto a las escalas y unidades.
+@perfil.medido
 def equipotencialesPuntuales(Q, dim = 1, niveles = 10, figsize=(6,6), titulo='Equipotenciales',
                 EF = False, density=0.75, dq=0.02, **params):
     """
@@ -538,103 +1120,112 @@ def equipotencialesPuntuales(Q, dim = 1, niveles = 10, figsize=(6,6), titulo='Eq
 
     Parameters
     ----------
-    Q : list
+    Q : list, ChargeSet o FieldResult
         Q = [
             [q1,x1,y1,z1],
             [q2,x2,y2,z2],
             ...
             [qN,xN,yN,zN]
         ]
+        Con un FieldResult de calcularEquipotenciales (o un corte de un
+        volumen con V) no se vuelve a calcular el potencial (y se ignoran
+        dim y el plano).
     dim : integer (opcional)
         Valores máximos para x,y en cm.
     niveles : list
         Los valores de voltaje de las equipotenciales que se quiere graficar.
-
+    adaptativo : bool (opcional)
+        Muestrea el plano con un quadtree en lugar de la grilla fina
+        completa, ver calcularEquipotenciales.
+    EF : bool (opcional)
+        Agrega las líneas del campo eléctrico, calculado analíticamente
+        junto con el potencial (ver VEf).
+    trazador : bool (opcional)
+        Con EF, traza las líneas desde las cargas positivas del plano (ver
+        frautnEM.lineas.lineasDeCampo) en lugar de usar streamplot.
+    method, theta, tol, max_bytes, workers, pool, dtype : (opcional)
+        Opciones del cálculo del campo, ver Ef.
+
+    ax : Axes (opcional)
+        Ejes donde dibujar, en lugar de crear una figura.
+    mostrar : bool (opcional)
+        Si es False no se llama a plt.show(), por ejemplo para guardar la
+        figura; por defecto se muestra salvo que se pase ax.
     *Además de los parámetros de matplotlib y quiver, por ejemplo:*
     length : float
     figsize : tuple
     title : string
     """
 
-    if 'x' in params:
-        x = params.get('x', 0)
-        y = np.arange(-dim, dim+0.01, 0.01)
-        z = np.arange(-dim, dim+0.01, 0.01)
-        Y, Z = np.meshgrid(y, z)
-        X = Y*0 + x
-        Vmat = V(X,Y,Z,Q) 
-        # Luego de calculados los potenciales,
-        # reutilizo la grilla para las variables que se grafican.
-        X, Y = np.meshgrid(y, z)
-    elif 'y' in params:
-        y = params.get('y', 0)
-        x = np.arange(-dim, dim+0.01, 0.01)
-        z = np.arange(-dim, dim+0.01, 0.01)
-        X, Z = np.meshgrid(x, z)
-        Y = X*0 + y
-        Vmat = V(X,Y,Z,Q) 
-        # Luego de calculados los potenciales,
-        # reutilizo la grilla para las variables que se grafican.
-        X, Y = np.meshgrid(x, z)
-    else:
-        z = params.get('z', 0)
-        x = np.arange(-dim, dim+0.01, 0.01)
-        y = np.arange(-dim, dim+0.01, 0.01)
-        X, Y = np.meshgrid(x, y)
-        Z = X*0 + z
-        Vmat = V(X,Y,Z,Q) 
-
-    # Set the labels for the plane to be displayed.
-    if isinstance(x, float) or isinstance(x, int):
-        xlabel = 'y [m]'
-        ylabel = 'z [m]'
-    elif isinstance(y, float) or isinstance(y, int):
-        xlabel = 'x [m]'
-        ylabel = 'z [m]'
-    elif isinstance(z, float) or isinstance(z, int):
-        xlabel = 'x [m]'
-        ylabel = 'y [m]'
-
-    fig, ax = plt.subplots(1, 1, figsize=figsize,facecolor=(1, 1, 1) )
+    F = Q if isinstance(Q, FieldResult) else calcularEquipotenciales(Q, dim, niveles=niveles,
+                                                                     EF=EF, **params)
+    if F.V is None:
+        raise ValueError("equipotencialesPuntuales necesita el potencial V, que el resultado "
+                         "no tiene (un volumen debe calcularse con calcV=True)")
+    dim, plano, valor = F.meta['dim'], F.meta['plano'], F.meta['valor']
+    Vmat = F.V
+    niveles = F.meta.get('niveles', niveles)
+
+    # Los ejes del gráfico son las dos coordenadas que varían en el plano.
+    columnas = {'x': (2, 3), 'y': (1, 3), 'z': (1, 2)}[plano]
+    X, Y = (getattr(F, 'XYZ'[c - 1]) for c in columnas)
+    xlabel, ylabel = ('xyz'[c - 1] + ' [m]' for c in columnas)
+
+    fig, ax = _figura(params, figsize, facecolor=(1, 1, 1))
     ax.set_title(titulo)
-    for carga in Q:
-        q, xq, yq, zq = carga
-        # Different colors for positive and negative charges.
-        if q>0:
-            color = 'red'
-        else:
-            color = 'blue'
-        # Check if the charge has to be drawn or not.
-        if isinstance(x, float) or isinstance(x, int):
-            if xq == x:
-                circ = plt.Circle((yq,zq), dq*dim, color=color)
-                ax.add_patch(circ)
-        elif isinstance(y, float) or isinstance(y, int):
-            if yq == y:
-                circ = plt.Circle((xq,zq), dq*dim, color=color)
-                ax.add_patch(circ)
-        elif isinstance(z, float) or isinstance(z, int):
-            if zq == z:
-                circ = plt.Circle((xq,yq), dq*dim, color=color)
-                ax.add_patch(circ)
+    # Only the charges on the plane are drawn, red if positive and blue if negative.
+    Q = F.Q
+    i = ' xyz'.index(plano)
+    enPlano = Q.T[i] == valor
+    cuerpos = [c for c in Q.cuerpos if c.caja[0][i - 1] <= valor <= c.caja[1][i - 1]]
+    _dibujarCargas(ax, Q[enPlano], dq*dim, columnas, ('red', 'blue'), cuerpos)
 
     if EF:
-        CS2 = ax.contour(X, Y, Vmat, levels = niveles, colors = 'red', alpha=0.4)
-        E = np.gradient(-1*Vmat)
-        ax.streamplot(X, Y, E[1], E[0], linewidth=1, cmap=plt.cm.inferno,
-              density=density, arrowstyle='->', arrowsize=1.5)
+        with perfil.etapa('contorno'):
+            CS2 = ax.contour(X, Y, Vmat, levels = niveles, colors = 'red', alpha=0.4)
+        if params.get('trazador', False):
+            caja = np.full((2, 3), float(valor))
+            for c in columnas:
+                caja[:, c - 1] = (-dim, dim)
+            L = lineas.lineasDeCampo(Q, params.get('lineas', 16), caja, (plano, valor),
+                                     radio=dq*dim, **_opcionesLineas(params))
+            _dibujarLineas(ax, L, columnas, 'C0', 1)
+        else:
+            Xs, Ys, Eu, Ev = _campoPlano(F, columnas, **_opciones(params))
+            with perfil.etapa('streamplot'):
+                ax.streamplot(Xs, Ys, Eu, Ev, linewidth=1, cmap='inferno',
+                      density=density, arrowstyle='->', arrowsize=1.5)
     else:
-        CS2 = ax.contour(X, Y, Vmat, levels = niveles, colors = 'red', alpha=1)
+        with perfil.etapa('contorno'):
+            CS2 = ax.contour(X, Y, Vmat, levels = niveles, colors = 'red', alpha=1)
     
     ax.clabel(CS2, inline=True, fmt=fmtV, fontsize=10)
 
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.grid()
-    plt.show()
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid()
+    _mostrar(params)
 
     # return Vmat
 
+def _campoPlano(F, columnas, puntos=201, **opciones):
+    """
+    Las coordenadas y componentes del campo en el plano de F, para streamplot.
+
+    Si F no trae el campo (muestreo adaptativo), se calcula en una grilla de
+    a lo sumo puntos x puntos tomada de la de F.
+    """
+    if F.Ei is not None:
+        X, Y, Z, E = F.X, F.Y, F.Z, F.E
+    else:
+        paso = -(-np.shape(F.X)[0] // puntos)
+        X, Y, Z = (np.asarray(a)[::paso, ::paso] for a in (F.X, F.Y, F.Z))
+        E = Ef(X, Y, Z, F.Q, **opciones)
+    XYZ = (X, Y, Z)
+    u, v = (c - 1 for c in columnas)
+    return XYZ[u], XYZ[v], E[u], E[v]
+
+
 # # 20240719
 # # Esta función puede mejorarse muchísimo, sobre todo respecto a las escalas y unidades.
 # def equipotencialesPuntuales(Q, dim = 100, levels = 10, figsize=(6,6), titulo='Equipotenciales',
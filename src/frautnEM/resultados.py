@@ -0,0 +1,132 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Resultados de cálculos de campo, reutilizables y persistentes.
+
+Las funciones calcular... de puntuales devuelven un FieldResult; los gráficos
+lo aceptan en lugar de Q, de modo que el campo se calcula una vez y se
+grafica muchas veces. Se guarda en un .npz sin comprimir, y al cargarlo
+los arreglos se mapean en memoria en lugar de leerse. Las distribuciones
+continuas de Q se guardan como JSON (ver distribuciones.aDatos).
+"""
+
+import json
+import struct
+import zipfile
+
+import numpy as np
+
+from . import distribuciones
+from .cargas import ChargeSet
+
+
+class FieldResult:
+    """
+    Grilla, potencial y campo eléctrico calculados, con sus metadatos.
+
+    Parameters
+    ----------
+    X, Y, Z : array
+        Coordenadas de los puntos de la grilla, en metros.
+    V : array (opcional)
+        Potencial en Volt.
+    Ei, Ej, Ek : array (opcional)
+        Componentes del campo eléctrico en N/C.
+    Q : list o ChargeSet (opcional)
+        Cargas que producen el campo.
+    meta : dict (opcional)
+        Datos del cálculo (tipo de gráfico, parámetros de la grilla, ...);
+        debe poder guardarse como JSON.
+    """
+
+    _arreglos = ('X', 'Y', 'Z', 'V', 'Ei', 'Ej', 'Ek')
+
+    def __init__(self, X, Y, Z, V=None, Ei=None, Ej=None, Ek=None, Q=None, meta=None):
+        self.X, self.Y, self.Z = X, Y, Z
+        self.V = V
+        self.Ei, self.Ej, self.Ek = Ei, Ej, Ek
+        self.Q = ChargeSet.desde(Q if Q is not None else [])
+        self.meta = dict(meta or {})
+
+    @property
+    def E(self):
+        """Las tres componentes del campo, o None si no se calculó."""
+        if self.Ei is None:
+            return None
+        return self.Ei, self.Ej, self.Ek
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los arreglos."""
+        return sum(np.asarray(a).nbytes for a in self._presentes().values())
+
+    def _presentes(self):
+        return {nombre: getattr(self, nombre) for nombre in self._arreglos
+                if getattr(self, nombre) is not None}
+
+    def guardar(self, archivo):
+        """Guarda el resultado en un archivo .npz sin comprimir."""
+        cuerpos = json.dumps(distribuciones.aDatos(self.Q.cuerpos))
+        np.savez(archivo, Q=self.Q.C, cuerpos=np.array(cuerpos),
+                 meta=np.array(json.dumps(self.meta)), **self._presentes())
+
+    @classmethod
+    def cargar(cls, archivo, mmap=True):
+        """
+        Lee un resultado guardado con guardar().
+
+        Si mmap=True, los arreglos de la grilla se mapean en memoria (sólo
+        lectura) en lugar de leerse completos.
+        """
+        with np.load(archivo) as datos:
+            meta = json.loads(str(datos['meta']))
+            cuerpos = json.loads(str(datos['cuerpos'])) if 'cuerpos' in datos.files else []
+            Q = datos['Q']
+            Q = ChargeSet.desdeArreglos(Q[:, 0], Q[:, 1:], distribuciones.desdeDatos(cuerpos))
+            nombres = [n for n in cls._arreglos if n in datos.files]
+            if mmap:
+                arreglos = _mapear(archivo, nombres)
+            else:
+                arreglos = {n: datos[n] for n in nombres}
+        return cls(Q=Q, meta=meta, **arreglos)
+
+    def __repr__(self):
+        nombres = ', '.join(self._presentes())
+        return f"FieldResult({nombres}; forma={np.shape(self.X)}, meta={self.meta!r})"
+
+
+def _mapear(archivo, nombres):
+    """Mapea en memoria los arreglos nombres de un .npz sin comprimir."""
+    arreglos = {}
+    with zipfile.ZipFile(archivo) as zf, open(archivo, 'rb') as f:
+        for nombre in nombres:
+            info = zf.getinfo(nombre + '.npy')
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{archivo}: {nombre} está comprimido y no se puede mapear")
+            # Encabezado local del zip: 30 bytes más el nombre y el campo extra.
+            f.seek(info.header_offset)
+            encabezado = f.read(30)
+            largo_nombre, largo_extra = struct.unpack('<HH', encabezado[26:30])
+            f.seek(info.header_offset + 30 + largo_nombre + largo_extra)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                forma, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                forma, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            arreglos[nombre] = np.memmap(f, dtype=dtype, mode='r', offset=f.tell(),
+                                         shape=forma, order='F' if fortran else 'C')
+    return arreglos
@@ -0,0 +1,270 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Volúmenes de campo en disco, más grandes que la memoria.
+
+Un volumen es una grilla regular 3D con algunas de las componentes V, Ei,
+Ej, Ek, guardada en un único archivo: un encabezado binario de tamaño fijo
+(la forma, los extremos, las componentes, el tipo y dónde empieza cada
+bloque), las cargas puntuales como arreglo (N, 4) de float64, un bloque
+JSON con los metadatos y las distribuciones continuas, y los datos, de
+forma (componentes, nx, ny, nz), que se leen con np.memmap. Se calcula por losas
+de planos x consecutivos (ver puntuales.calcularVolumen), y se lee igual:
+por losas, por cortes planos o en puntos sueltos, sin cargar nunca el
+volumen completo:
+
+    vol = calcularVolumen('campo.vol', Q, dx=6, w=500, dtype=np.float32)
+    for i, F in vol.losas():       # FieldResult de cada losa
+        ...
+    F = vol.corte('z', 0)          # FieldResult del plano z = 0
+    plotEfvector3d(vol, flechas=2000)
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from . import distribuciones
+from .cargas import ChargeSet
+from .resultados import FieldResult
+
+
+# Comienzo de los archivos de volumen; le sigue el resto del encabezado.
+MAGIA = b'\x93FRAUTNEM-VOL'
+
+# Versión del formato del archivo.
+VERSION = 2
+
+# Encabezado tras MAGIA: versión, forma (3), lo (3), hi (3), máscara de las
+# componentes, dtype (texto de numpy), posición y cantidad de las cargas,
+# posición y largo del JSON, y posición de los datos.
+_ENCABEZADO = struct.Struct('<I3Q3d3dI8s5Q')
+
+# Los datos empiezan en un múltiplo de este tamaño.
+_ALINEACION = 64
+
+# Memoria por defecto para cada losa, con sus temporarios.
+MEMORIA = 256 * 2**20
+
+# Bytes por punto de una losa mientras se calcula: las coordenadas, los
+# puntos aplanados y los resultados intermedios de los métodos que copian.
+_BYTES_PUNTO = 96
+
+# Flechas que dibuja plotEfvector3d de un volumen si no se indica otra cosa.
+FLECHAS = 4096
+
+COMPONENTES = ('V', 'Ei', 'Ej', 'Ek')
+
+
+class Volumen:
+    """
+    Volumen de campo guardado en un archivo, mapeado en memoria.
+
+    Parameters
+    ----------
+    archivo : str
+        Archivo creado con Volumen.crear() (o con puntuales.calcularVolumen).
+    modo : 'r' o 'r+' (opcional)
+        Sólo lectura (por defecto) o lectura y escritura.
+
+    Cada componente (vol['Ei'], ...) es un np.memmap de forma (nx, ny, nz),
+    en el orden de np.mgrid; ejes son los valores de x, y, z de la grilla.
+    """
+
+    def __init__(self, archivo, modo='r'):
+        self.archivo = archivo
+        with open(archivo, 'rb') as f:
+            if f.read(len(MAGIA)) != MAGIA:
+                raise ValueError(f"{archivo} no es un volumen de frautnEM")
+            campos = _ENCABEZADO.unpack(f.read(_ENCABEZADO.size))
+            if campos[0] != VERSION:
+                raise ValueError(f"{archivo}: versión {campos[0]} del formato no soportada")
+            forma, lo, hi = campos[1:4], campos[4:7], campos[7:10]
+            mascara, dtype = campos[10], campos[11].rstrip(b'\0').decode('ascii')
+            iQ, N, iJSON, largo, iDatos = campos[12:]
+            f.seek(iQ)
+            C = np.fromfile(f, dtype='<f8', count=4 * N).reshape(N, 4)
+            f.seek(iJSON)
+            extra = json.loads(f.read(largo).decode('utf-8'))
+        self.forma = tuple(forma)
+        self.lo = np.array(lo, dtype=float)
+        self.hi = np.array(hi, dtype=float)
+        self.componentes = tuple(c for b, c in enumerate(COMPONENTES) if mascara >> b & 1)
+        self.dtype = np.dtype(dtype)
+        cuerpos = distribuciones.desdeDatos(extra['cuerpos'])
+        self.Q = ChargeSet.desdeArreglos(C[:, 0], C[:, 1:], cuerpos)
+        self.meta = extra['meta']
+        self._datos = np.memmap(archivo, dtype=self.dtype, mode=modo, offset=iDatos,
+                                shape=(len(self.componentes),) + self.forma)
+
+    @classmethod
+    def crear(cls, archivo, forma, lo, hi, componentes=('Ei', 'Ej', 'Ek'), dtype=float,
+              Q=None, meta=None):
+        """
+        Crea el archivo de un volumen, con los datos sin calcular (ceros).
+
+        Parameters
+        ----------
+        archivo : str
+        forma : tuple (nx, ny, nz)
+            Puntos de la grilla en cada eje.
+        lo, hi : array (3,)
+            Extremos de la grilla, incluidos.
+        componentes : tuple (opcional)
+            Cuáles de V, Ei, Ej, Ek se guardan, en ese orden.
+        dtype : (opcional)
+            float (por defecto) o np.float32, con la mitad del tamaño.
+        Q : list o ChargeSet (opcional)
+            Cargas que producen el campo, con sus distribuciones continuas.
+        meta : dict (opcional)
+            Datos del cálculo; debe poder guardarse como JSON.
+
+        Returns
+        -------
+        Volumen abierto para lectura y escritura.
+        """
+        componentes = tuple(c for c in COMPONENTES if c in componentes)
+        if not componentes:
+            raise ValueError("el volumen debe tener alguna componente de V, Ei, Ej, Ek")
+        forma = tuple(int(n) for n in forma)
+        dtype = np.dtype(dtype)
+        Q = ChargeSet.desde(Q if Q is not None else [])
+        C = np.ascontiguousarray(Q.C, dtype='<f8')
+        texto = json.dumps({'meta': dict(meta or {}),
+                            'cuerpos': distribuciones.aDatos(Q.cuerpos)}).encode('utf-8')
+        iQ = len(MAGIA) + _ENCABEZADO.size
+        iJSON = iQ + C.nbytes
+        iDatos = _alinear(iJSON + len(texto))
+        mascara = sum(1 << b for b, c in enumerate(COMPONENTES) if c in componentes)
+        encabezado = _ENCABEZADO.pack(VERSION, *forma, *(float(v) for v in lo),
+                                      *(float(v) for v in hi), mascara, dtype.str.encode('ascii'),
+                                      iQ, len(C), iJSON, len(texto), iDatos)
+        with open(archivo, 'wb') as f:
+            f.write(MAGIA + encabezado)
+            f.write(C.tobytes())
+            f.write(texto)
+            f.write(b' ' * (iDatos - f.tell()))
+            # El archivo se extiende sin escribir los datos (queda disperso).
+            f.truncate(iDatos + len(componentes) * int(np.prod(forma)) * dtype.itemsize)
+        return cls(archivo, 'r+')
+
+    @property
+    def ejes(self):
+        """Valores de x, y, z de la grilla."""
+        return tuple(np.linspace(a, b, n) for a, b, n in zip(self.lo, self.hi, self.forma))
+
+    @property
+    def nbytes(self):
+        """Tamaño de los datos en el archivo."""
+        return self._datos.nbytes
+
+    def __getitem__(self, nombre):
+        if nombre not in self.componentes:
+            raise KeyError(f"el volumen no tiene {nombre!r}; tiene {self.componentes}")
+        return self._datos[self.componentes.index(nombre)]
+
+    def requerir(self, *nombres):
+        """ValueError si el volumen no tiene alguna de las componentes nombres."""
+        faltan = [n for n in nombres if n not in self.componentes]
+        if faltan:
+            raise ValueError(f"el volumen {self.archivo} no tiene {', '.join(faltan)}; "
+                             f"tiene {', '.join(self.componentes)}")
+
+    def espesor(self, memoria=None):
+        """Planos x por losa para que una losa no supere memoria bytes."""
+        memoria = MEMORIA if memoria is None else memoria
+        plano = self.forma[1] * self.forma[2]
+        return max(min(int(memoria) // (_BYTES_PUNTO * plano), self.forma[0]), 1)
+
+    def llenar(self, evaluar, memoria=None):
+        """
+        Calcula el volumen losa por losa.
+
+        evaluar(x, y, z, out) escribe en out, una lista de arreglos con la
+        forma de los puntos (una vista de cada componente guardada), los
+        valores en los puntos de la grilla x[:, None, None], y[None, :, None],
+        z[None, None, :].
+        """
+        x, y, z = self.ejes
+        e = self.espesor(memoria)
+        for i in range(0, self.forma[0], e):
+            evaluar(x[i:i+e, None, None], y[None, :, None], z[None, None, :],
+                    [c[i:i+e] for c in self._datos])
+        self._datos.flush()
+        return self
+
+    def losa(self, i0, i1):
+        """FieldResult de los planos x de índices i0 a i1 (sin incluir)."""
+        x, y, z = self.ejes
+        X, Y, Z = np.broadcast_arrays(x[i0:i1, None, None], y[None, :, None], z[None, None, :])
+        valores = {c: self[c][i0:i1] for c in self.componentes}
+        return FieldResult(X, Y, Z, Q=self.Q, meta=dict(self.meta, losa=[int(i0), int(i1)]),
+                           **valores)
+
+    def losas(self, espesor=None, memoria=None):
+        """
+        Recorre el volumen por losas: genera (i0, FieldResult) de cada una.
+
+        espesor es la cantidad de planos x por losa; por defecto, los que
+        caben en memoria bytes (ver espesor()).
+        """
+        e = espesor if espesor is not None else self.espesor(memoria)
+        for i in range(0, self.forma[0], e):
+            yield i, self.losa(i, i + e)
+
+    def corte(self, eje, valor):
+        """
+        FieldResult del plano de la grilla más cercano a eje = valor.
+
+        Las coordenadas son 2D, como las de meshgrid de las dos que varían
+        en el plano, de modo que equipotencialesPuntuales lo acepta (si el
+        volumen tiene V).
+        """
+        i = 'xyz'.index(eje)
+        ejes = self.ejes
+        k = int(np.abs(ejes[i] - valor).argmin())
+        s = [slice(None)] * 3
+        s[i] = k
+        u, v = (ejes[j] for j in range(3) if j != i)
+        A, B = np.meshgrid(u, v)
+        XYZ = [A, B]
+        XYZ.insert(i, np.full_like(A, ejes[i][k]))
+        valores = {c: np.array(self[c][tuple(s)].T) for c in self.componentes}
+        meta = dict(self.meta, tipo='equipotenciales', plano=eje, valor=float(ejes[i][k]),
+                    dim=float(np.max(np.abs(np.concatenate((self.lo, self.hi))))))
+        return FieldResult(*XYZ, Q=self.Q, meta=meta, **valores)
+
+    def puntos(self, ind):
+        """
+        Coordenadas y componentes guardadas en los puntos de índices planos
+        ind (ordenados, para leer el archivo en orden).
+
+        Devuelve X, Y, Z y un diccionario con las componentes.
+        """
+        ind = np.asarray(ind, dtype=np.intp)
+        X, Y, Z = (e[i] for e, i in zip(self.ejes, np.unravel_index(ind, self.forma)))
+        return X, Y, Z, {c: np.asarray(self[c].reshape(-1)[ind]) for c in self.componentes}
+
+    def __repr__(self):
+        return (f"Volumen({self.archivo!r}; forma={self.forma}, "
+                f"componentes={self.componentes}, dtype={self.dtype})")
+
+
+def _alinear(posicion):
+    """La primera posición múltiplo de _ALINEACION desde posicion."""
+    return -(-posicion // _ALINEACION) * _ALINEACION
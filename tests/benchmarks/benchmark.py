@@ -0,0 +1,301 @@
+#     frautnEM is a set of library functions to be used in courses of electromagnetism.
+#     Copyright (C) 2024  Edgardo Palazzo (epalazzo@fra.utn.edu.ar)
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Mediciones de rendimiento de los núcleos y de los gráficos.
+
+    python tests/benchmarks/benchmark.py --rapido --salida tests/benchmarks/base.json
+    python tests/benchmarks/benchmark.py --rapido --base tests/benchmarks/base.json
+
+Los tiempos solo se pueden comparar en la misma máquina, por lo que no hay
+una base en el repositorio: cada uno guarda la suya (los base*.json de esta
+carpeta no se versionan), ver README.md.
+
+Cada caso se mide en todas las combinaciones de su barrido (cantidad de
+cargas N, resolución w o dim, dtype), con cargas al azar de semilla fija en
+el plano z = 0. Los tiempos son el menor de varias repeticiones; la
+memoria pico de cada fase se mide aparte, en una ejecución con tracemalloc.
+En los gráficos se separan el cálculo (la función calcular... del gráfico)
+y el dibujo, que se hace en una Figure sin pyplot y se guarda como PNG en
+memoria, sin pantalla. El caso 'importacion' mide, en un proceso nuevo,
+cuánto tarda import frautnEM.puntuales y si carga matplotlib.
+
+Los resultados se escriben en JSON y, con --base, se comparan con los de
+una ejecución anterior: un tiempo o una memoria que supera el de la base en
+más de la tolerancia es una regresión, y el programa termina con código 1.
+Si la base se midió en otro entorno (otra máquina o versión de Python o de
+NumPy) se avisa, porque los tiempos no son comparables.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# El paquete se usa desde el árbol de fuentes, sin instalarlo.
+SRC = Path(__file__).resolve().parents[2] / 'src'
+sys.path.insert(0, str(SRC))
+
+from frautnEM import puntuales  # noqa: E402
+
+
+# Repeticiones de cada medición; se informa la menor, la menos afectada
+# por el resto de la máquina.
+REPETICIONES = 3
+
+# Aumento relativo de un tiempo o de una memoria que se considera regresión;
+# en una máquina sin otra carga se puede usar una menor.
+TOLERANCIA = 0.5
+
+# Diferencias menores que estas no son regresiones (ruido de la medición).
+_SEGUNDOS = 2e-3
+_BYTES = 2**20
+
+# Valores que toma cada parámetro de cada caso.
+BARRIDOS = {
+    'Ef': {'N': [10, 100, 1000], 'w': [100, 300], 'dtype': ['float64', 'float32']},
+    'V': {'N': [10, 100, 1000], 'w': [100, 300], 'dtype': ['float64', 'float32']},
+    'plotEf': {'N': [10, 100], 'w': [100, 200], 'dtype': ['float64', 'float32']},
+    'plotEfvector3d': {'N': [2, 10], 'w': [10, 20]},
+    'equipotencialesPuntuales': {'N': [10, 100], 'dim': [1, 2]},
+    'importacion': {},
+}
+
+# Parámetros que identifican una medición, para compararla con la base.
+_PARAMETROS = ('N', 'w', 'dim', 'dtype')
+
+
+def cargas(N, semilla=0):
+    """N cargas al azar de ±1 nC en el cuadrado [-1, 1]² del plano z = 0."""
+    rng = np.random.default_rng(semilla)
+    Q = np.zeros((N, 4))
+    Q[:, 0] = rng.choice((-1e-9, 1e-9), N)
+    Q[:, 1:3] = rng.uniform(-1, 1, (N, 2))
+    return Q
+
+
+def fases(caso, N=None, w=None, dim=None, dtype=None):
+    """
+    Las fases de un caso: lista de (nombre, funcion). Cada funcion recibe el
+    resultado de la anterior (None la primera).
+    """
+    dtype = None if dtype is None else np.dtype(dtype)
+    opciones = {} if dtype is None else {'dtype': dtype}
+    Q = cargas(N) if N is not None else None
+    figura = None
+    if caso.startswith(('plot', 'equipotenciales')):
+        from matplotlib.figure import Figure
+        figura = Figure()
+
+    def dibujar(grafico):
+        def dibujo(F):
+            grafico(F, figura=figura, mostrar=False)
+            figura.savefig(io.BytesIO(), format='png')
+            figura.clear()
+        return dibujo
+
+    if caso in ('Ef', 'V'):
+        eje = np.linspace(-1.5, 1.5, w)
+        X, Y = np.meshgrid(eje, eje)
+        funcion = getattr(puntuales, caso)
+        return [('calculo', lambda _: funcion(X, Y, 0, Q, **opciones))]
+    if caso == 'plotEf':
+        return [('calculo', lambda _: puntuales.calcularEf(Q, dx=1.5, w=w, **opciones)),
+                ('dibujo', dibujar(puntuales.plotEf))]
+    if caso == 'plotEfvector3d':
+        return [('calculo', lambda _: puntuales.calcularEfvector3d(Q, dx=1.5, w=w, **opciones)),
+                ('dibujo', dibujar(puntuales.plotEfvector3d))]
+    if caso == 'equipotencialesPuntuales':
+        return [('calculo', lambda _: puntuales.calcularEquipotenciales(Q, dim, **opciones)),
+                ('dibujo', dibujar(puntuales.equipotencialesPuntuales))]
+    if caso == 'importacion':
+        return [('importacion', lambda _: _importar())]
+    raise ValueError(f"caso desconocido: {caso!r}")
+
+
+def medir(caso, repeticiones=REPETICIONES, **parametros):
+    """
+    Mide un caso con los parámetros dados (ver BARRIDOS).
+
+    Devuelve un dict con el caso, sus parámetros, el menor tiempo de cada
+    fase (tiempos) y su memoria pico por encima de la del comienzo de la
+    fase (memoria), en bytes.
+    """
+    pasos = fases(caso, **parametros)
+    tiempos = {nombre: [] for nombre, _ in pasos}
+    for _ in range(repeticiones):
+        r = None
+        for nombre, funcion in pasos:
+            inicio = time.perf_counter()
+            r = funcion(r)
+            tiempos[nombre].append(time.perf_counter() - inicio)
+        if caso == 'importacion':
+            # Sin el arranque del intérprete del proceso nuevo.
+            tiempos['importacion'][-1] = r['tiempo']
+    resultado = dict(caso=caso, **parametros,
+                     tiempos={n: min(t) for n, t in tiempos.items()})
+    if caso == 'importacion':
+        resultado['matplotlib'] = r['matplotlib']
+        return resultado
+
+    memoria = {}
+    tracemalloc.start()
+    try:
+        r = None
+        for nombre, funcion in pasos:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            r = funcion(r)
+            memoria[nombre] = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    resultado['memoria'] = memoria
+    return resultado
+
+
+def _importar():
+    """Tiempo de import frautnEM.puntuales en un proceso nuevo y si carga matplotlib."""
+    codigo = ("import json, sys, time\n"
+              "t = time.perf_counter()\n"
+              "import frautnEM.puntuales\n"
+              "t = time.perf_counter() - t\n"
+              "print(json.dumps({'tiempo': t, 'matplotlib': "
+              "any(m.split('.')[0] == 'matplotlib' for m in sys.modules)}))\n")
+    variables = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [str(SRC)] + [p for p in [os.environ.get('PYTHONPATH')] if p]))
+    salida = subprocess.run([sys.executable, '-c', codigo], env=variables, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(salida)
+
+
+def ejecutar(casos=None, repeticiones=REPETICIONES, rapido=False, informar=None):
+    """
+    Mide los casos (por defecto, todos los de BARRIDOS) en todo su barrido.
+
+    Con rapido=True se toma solo el primer valor de cada parámetro.
+    informar(resultado) (opcional) se llama con cada medición al terminarla.
+    Devuelve un dict con el entorno y la lista de resultados, listo para
+    guardar como JSON.
+    """
+    resultados = []
+    for caso in casos or BARRIDOS:
+        barrido = BARRIDOS[caso]
+        valores = [v[:1] if rapido else v for v in barrido.values()]
+        for combinacion in itertools.product(*valores):
+            resultado = medir(caso, repeticiones, **dict(zip(barrido, combinacion)))
+            resultados.append(resultado)
+            if informar is not None:
+                informar(resultado)
+    return {'entorno': entorno(), 'repeticiones': repeticiones, 'resultados': resultados}
+
+
+def entorno():
+    """Datos de la máquina y de las versiones, para interpretar los resultados."""
+    import matplotlib
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__, 'plataforma': platform.platform(),
+            'procesador': platform.processor(), 'nucleos': os.cpu_count()}
+
+
+def _clave(resultado):
+    return (resultado['caso'],) + tuple(resultado.get(p) for p in _PARAMETROS)
+
+
+def comparar(actual, base, tolerancia=TOLERANCIA):
+    """
+    Regresiones de actual respecto de base (dicts de ejecutar()).
+
+    Devuelve una lista de textos, una por cada tiempo o memoria que supera
+    el de la base en más de la fracción tolerancia (y en más que el ruido
+    de la medición), o por cada importación que pasó a cargar matplotlib.
+    Las mediciones que no están en ambos se ignoran.
+    """
+    anteriores = {_clave(r): r for r in base['resultados']}
+    regresiones = []
+    for r in actual['resultados']:
+        b = anteriores.get(_clave(r))
+        if b is None:
+            continue
+        nombre = _nombre(r)
+        for magnitud, ruido, unidad in (('tiempos', _SEGUNDOS, 's'), ('memoria', _BYTES, 'B')):
+            for fase, valor in r.get(magnitud, {}).items():
+                anterior = b.get(magnitud, {}).get(fase)
+                if (anterior is not None and valor > anterior * (1 + tolerancia)
+                        and valor - anterior > ruido):
+                    regresiones.append(f"{nombre} {magnitud}[{fase}]: "
+                                       f"{valor:.4g} {unidad} (base {anterior:.4g} {unidad})")
+        if r.get('matplotlib') and not b.get('matplotlib'):
+            regresiones.append(f"{nombre}: import frautnEM.puntuales carga matplotlib")
+    return regresiones
+
+
+def _nombre(resultado):
+    parametros = ', '.join(f"{p}={resultado[p]}" for p in _PARAMETROS if p in resultado)
+    return f"{resultado['caso']}({parametros})"
+
+
+def _linea(resultado):
+    tiempos = '  '.join(f"{f} {t * 1e3:9.2f} ms" for f, t in resultado['tiempos'].items())
+    memoria = '  '.join(f"{f} {m / 2**20:7.1f} MiB"
+                        for f, m in resultado.get('memoria', {}).items())
+    return f"{_nombre(resultado):50s} {tiempos}  {memoria}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python tests/benchmarks/benchmark.py',
+                                     description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--casos', nargs='+', choices=list(BARRIDOS),
+                        help='casos a medir (por defecto, todos)')
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--rapido', action='store_true',
+                        help='solo el primer valor de cada parámetro')
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--base', help='resultados JSON anteriores con los que comparar')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar(args.casos, args.repeticiones, args.rapido,
+                          informar=lambda r: print(_linea(r), flush=True))
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultados, f, indent=1)
+    if args.base:
+        with open(args.base) as f:
+            base = json.load(f)
+        if base.get('entorno') != resultados['entorno']:
+            print('AVISO: la base se midió en otro entorno; los tiempos no son comparables.')
+            print('  base:  ', base.get('entorno'))
+            print('  actual:', resultados['entorno'])
+        regresiones = comparar(resultados, base, args.tolerancia)
+        for r in regresiones:
+            print('REGRESIÓN', r)
+        if regresiones:
+            return 1
+        print('Sin regresiones respecto de', args.base)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
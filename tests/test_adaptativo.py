@@ -0,0 +1,43 @@
+"""El muestreo adaptativo del potencial da las mismas franjas que la grilla completa."""
+
+import numpy as np
+import pytest
+
+from frautnEM import adaptativo
+from frautnEM import puntuales
+
+
+def cargas(N, semilla):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([rng.choice((-1e-9, 1e-9), N) * rng.uniform(0.5, 1.5, N),
+                            rng.uniform(-1, 1, (N, 2)), rng.uniform(-0.2, 0.2, N)])
+
+
+@pytest.mark.parametrize('N, semilla', [(2, 0), (5, 1), (30, 2)])
+def test_mismas_franjas(N, semilla):
+    Q = cargas(N, semilla)
+    denso = puntuales.calcularEquipotenciales(Q, 3)
+    F = puntuales.calcularEquipotenciales(Q, 3, adaptativo=True)
+    assert F.meta['evaluaciones'] < denso.V.size
+    lv = np.asarray(F.meta['niveles'])
+    np.testing.assert_allclose(lv, adaptativo.niveles(10, denso.V.min(), denso.V.max()))
+    assert np.array_equal(np.searchsorted(lv, F.V), np.searchsorted(lv, denso.V))
+
+
+def test_grilla_chica_completa():
+    Q = cargas(30, 3)
+    denso = puntuales.calcularEquipotenciales(Q, 1)
+    F = puntuales.calcularEquipotenciales(Q, 1, adaptativo=True)
+    assert len(F.V) < adaptativo.MINIMO
+    assert F.meta['evaluaciones'] == denso.V.size
+    np.testing.assert_array_equal(F.V, denso.V)
+
+
+@pytest.mark.parametrize('n, vmin, vmax', [(10, -3.7, 12.2), (5, 0.013, 0.0871),
+                                           (20, 4e5, 4.0003e5), (7, -2e-9, -1e-9), (10, 1.0, 1.0)])
+def test_niveles_como_contour(n, vmin, vmax):
+    pytest.importorskip('matplotlib')
+    from matplotlib.figure import Figure
+    Z = np.linspace(vmin, vmax, 12).reshape(3, 4)
+    CS = Figure().add_subplot().contour(Z, levels=n)
+    np.testing.assert_array_equal(adaptativo.niveles(n, vmin, vmax), CS.levels)
@@ -0,0 +1,56 @@
+"""Barridos de parámetros contra la evaluación de cada configuración."""
+
+import numpy as np
+import pytest
+
+from frautnEM import barrido
+from frautnEM import puntuales
+
+
+def configuraciones(K, N, semilla):
+    rng = np.random.default_rng(semilla)
+    Qs = np.zeros((K, N, 4))
+    Qs[..., 0] = rng.uniform(-1e-9, 1e-9, (K, N))
+    Qs[..., 1:] = rng.uniform(-1, 1, (K, N, 3))
+    return Qs
+
+
+def malla():
+    x, y = np.meshgrid(np.linspace(-2, 2, 21), np.linspace(-2, 2, 17))
+    return x, y, np.zeros_like(x)
+
+
+def uno_por_uno(x, y, z, Qs):
+    # Sin las cargas nulas, como las evaluaría cada configuración sola.
+    return np.stack([np.stack(puntuales.VEf(x, y, z, C[C[:, 0] != 0])) for C in Qs])
+
+
+@pytest.mark.parametrize('max_bytes', [None, 20_000])
+def test_igual_que_cada_configuracion(max_bytes):
+    x, y, z = malla()
+    Qs = configuraciones(7, 12, 0)
+    R = barrido.evaluar(x, y, z, Qs, calcV=True, max_bytes=max_bytes)
+    np.testing.assert_allclose(R, uno_por_uno(x, y, z, Qs), rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize('max_bytes', [None, 20_000])
+def test_cargas_nulas_en_la_grilla(max_bytes):
+    x, y, z = malla()
+    Qs = configuraciones(5, 6, 1)
+    # Configuraciones de menos cargas, completadas con nulas sobre puntos de
+    # la grilla (el origen y otro).
+    Qs[1:, 3:] = 0
+    Qs[3, 5, 1:] = x[4, 7], y[4, 7], 0
+    R = barrido.evaluar(x, y, z, Qs, calcV=True, max_bytes=max_bytes)
+    assert np.isfinite(R).all()
+    np.testing.assert_allclose(R, uno_por_uno(x, y, z, Qs), rtol=1e-10, atol=1e-12)
+
+
+def test_variantes():
+    x, y, z = malla()
+    Q = [[1e-9, 0, 0, 0.5], [-1e-9, 1, 0, 0.5]]
+    r = np.linspace((-1, 0, 1), (1, 0, 1), 4)
+    R = barrido.evaluar(x, y, z, barrido.variantes(Q, 1, r=r))
+    for Ek, ri in zip(R[:, 2], r):
+        np.testing.assert_allclose(Ek, puntuales.Ef(x, y, z, [Q[0], [-1e-9, *ri]])[2],
+                                   rtol=1e-10, atol=1e-12)
@@ -0,0 +1,98 @@
+"""Caché LRU de campos: aciertos, fallos, desalojos y claves."""
+
+import os
+
+import numpy as np
+import pytest
+
+from frautnEM import cache
+from frautnEM import puntuales
+from frautnEM.cache import FieldCache
+from frautnEM.resultados import FieldResult
+
+Q = [[1e-9, 0.013, 0.021, 0], [-1e-9, 0.513, 0.021, 0]]
+
+
+def resultado(n, valor=0.0):
+    x = np.full(n, valor)
+    return FieldResult(x, x, x, V=np.arange(n, dtype=float))
+
+
+@pytest.fixture
+def activo():
+    c = cache.activarCache()
+    yield c
+    cache.desactivarCache()
+
+
+def test_aciertos_y_fallos():
+    c = FieldCache()
+    F = resultado(10)
+    assert c.obtener('a') is None
+    c.guardar('a', F)
+    assert c.obtener('a') is F
+    assert c.obtener('a') is F
+    assert c.obtener('b') is None
+    e = c.estadisticas()
+    assert (e['aciertos'], e['fallos'], e['desalojos'], e['entradas']) == (2, 2, 0, 1)
+    assert e['bytes'] == F.nbytes
+    assert not F.V.flags.writeable
+
+
+def test_desalojo_por_memoria():
+    F = resultado(100)
+    c = FieldCache(max_bytes=3 * F.nbytes)
+    for clave in 'abc':
+        c.guardar(clave, resultado(100))
+    c.obtener('a')                      # 'b' pasa a ser el menos usado.
+    c.guardar('d', resultado(100))
+    assert c.obtener('b') is None
+    assert all(c.obtener(clave) is not None for clave in 'acd')
+    e = c.estadisticas()
+    assert e['desalojos'] == 1 and e['entradas'] == 3
+    assert e['bytes'] <= c.max_bytes
+    # Uno más grande desaloja a varios; uno que no entra no se guarda.
+    c.guardar('e', resultado(250))
+    assert len(c) == 1 and c.estadisticas()['desalojos'] == 4
+    c.guardar('f', resultado(1000))
+    assert c.obtener('f') is None and len(c) == 1
+
+
+def test_clave():
+    clave = FieldCache.clave('plotEf', Q, {'w': 100, 'dx': 5})
+    assert clave == FieldCache.clave('plotEf', [list(q) for q in Q], {'dx': 5, 'w': 100})
+    distintas = {FieldCache.clave('plotEf', Q, {'w': 100, 'dx': 4}),
+                 FieldCache.clave('plotEf', Q, {'w': 100, 'dx': 5, 'method': 'octree'}),
+                 FieldCache.clave('plotEfvector3d', Q, {'w': 100, 'dx': 5}),
+                 FieldCache.clave('plotEf', [[1e-9, 0.013, 0.021, 0], [-1e-9, 0.513, 0.021, 1e-12]],
+                                  {'w': 100, 'dx': 5})}
+    assert clave not in distintas and len(distintas) == 4
+
+
+def test_consultar(activo):
+    F = puntuales.calcularEf(Q, w=10)
+    assert puntuales.calcularEf(Q, w=10) is F
+    assert puntuales.calcularEf(Q, w=10, workers=2) is F
+    assert puntuales.calcularEf(Q, w=11) is not F
+    assert puntuales.calcularEf(Q, w=10, method='octree') is not F
+    e = activo.estadisticas()
+    assert (e['aciertos'], e['fallos']) == (2, 3)
+
+
+def test_disco_sin_temporarios(tmp_path):
+    c = FieldCache(directorio=tmp_path)
+    F = resultado(50)
+    c.guardar('a', F)
+    assert os.listdir(tmp_path) == ['a.npz']
+    G = FieldCache(directorio=tmp_path).obtener('a')
+    np.testing.assert_array_equal(G.V, F.V)
+
+
+def test_disco_error_al_escribir(tmp_path, monkeypatch):
+    def falla(self, archivo):
+        archivo.write(b'a medias')
+        raise OSError('disco lleno')
+    monkeypatch.setattr(FieldResult, 'guardar', falla)
+    with pytest.raises(OSError):
+        FieldCache(directorio=tmp_path).guardar('a', resultado(50))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,66 @@
+"""Movimiento de cargas: conservación de la energía y trayectoria en disco."""
+
+import numpy as np
+import pytest
+
+from frautnEM import dinamica
+from frautnEM import nucleo
+
+# Dos cargas opuestas de 1 µC y 1 g en una órbita elíptica.
+Q = [[1e-6, -0.05, 0, 0], [-1e-6, 0.05, 0, 0]]
+MASA = 1e-3
+
+
+def orbita():
+    """Velocidades iniciales (80% de las de la órbita circular) y período aproximado."""
+    d, mu = 0.1, MASA / 2
+    v = 0.8 * np.sqrt(nucleo.k * 1e-12 / (mu * d))
+    return np.array([[0, -v / 2, 0], [0, v / 2, 0]]), 2 * np.pi * d / v
+
+
+def deriva(dt, pasos):
+    v0, _ = orbita()
+    cuadros = list(dinamica.trayectoria(Q, MASA, dt, pasos, v0=v0, cada=10, energias=True))
+    E = np.array([c.U + c.K for c in cuadros])
+    p = np.array([MASA * c.v.sum(axis=0) for c in cuadros])
+    return np.abs(E - E[0]).max() / abs(E[0]), np.abs(p).max()
+
+
+def test_conservacion_de_la_energia():
+    _, T = orbita()
+    error, p = deriva(T / 1000, 3000)
+    assert error < 3e-4
+    assert p < 1e-15
+    # Velocity-Verlet es de segundo orden: con la mitad del paso, la
+    # oscilación de la energía es unas cuatro veces menor.
+    menor, _ = deriva(T / 2000, 6000)
+    assert 3 < error / menor < 5
+
+
+@pytest.mark.parametrize('velocidades', [False, True])
+def test_simular_en_disco(tmp_path, velocidades):
+    v0, T = orbita()
+    dt, pasos, cada = T / 200, 95, 10
+    archivo = tmp_path / 'tray.npy'
+    R = dinamica.simular(Q, MASA, dt, pasos, cada=cada, archivo=str(archivo),
+                         velocidades=velocidades, v0=v0)
+    forma = (pasos // cada + 1,) + ((2,) if velocidades else ()) + (2, 3)
+    assert isinstance(R, np.memmap) and R.shape == forma
+    leido = np.load(archivo, mmap_mode='r')
+    assert leido.shape == forma
+    cuadros = list(dinamica.trayectoria(Q, MASA, dt, pasos, v0=v0, cada=cada))
+    assert len(cuadros) == forma[0]
+    for i, c in enumerate(cuadros):
+        if velocidades:
+            np.testing.assert_array_equal(leido[i, 0], c.r)
+            np.testing.assert_array_equal(leido[i, 1], c.v)
+        else:
+            np.testing.assert_array_equal(leido[i], c.r)
+
+
+def test_simular_out():
+    with pytest.raises(ValueError):
+        dinamica.simular(Q, MASA, 1e-5, 10, out=np.empty((5, 2, 3)))
+    out = np.empty((11, 2, 3))
+    assert dinamica.simular(Q, MASA, 1e-5, 10, out=out) is out
+    np.testing.assert_array_equal(out[0], np.array(Q)[:, 1:])
@@ -0,0 +1,135 @@
+"""Campo de las distribuciones continuas: fórmulas sobre el eje y discretización fina."""
+
+import numpy as np
+import pytest
+
+from frautnEM import nucleo
+from frautnEM.distribuciones import Anillo, Disco, Esfera, Segmento
+
+k = nucleo.k
+
+# Error relativo admitido, respecto del mayor valor de cada magnitud.
+TOL = 1e-9
+
+
+def comparar(c, P, V0, E0, tol=TOL):
+    V, E = c.campo(P, True, True)
+    np.testing.assert_allclose(V, V0, rtol=0, atol=tol * np.abs(V0).max())
+    np.testing.assert_allclose(E, E0, rtol=0, atol=tol * np.abs(E0).max())
+
+
+def discreto(c, C, P, tol=TOL):
+    """Compara con las cargas puntuales C (N, 4) que discretizan a c."""
+    assert C[:, 0].sum() == pytest.approx(c.carga, rel=1e-12)
+    comparar(c, P, *nucleo.campo(P, C, True, True), tol)
+
+
+def base(normal):
+    """Dos vectores unitarios perpendiculares a normal y entre sí."""
+    n = np.asarray(normal, dtype=float) / np.linalg.norm(normal)
+    u = np.cross(n, np.eye(3)[np.abs(n).argmin()])
+    u /= np.linalg.norm(u)
+    return n, u, np.cross(n, u)
+
+
+def lejos(c, M, distancia, semilla):
+    """M puntos al azar a más de distancia del cuerpo (de su caja, ampliada)."""
+    rng = np.random.default_rng(semilla)
+    lo, hi = c.caja
+    P = rng.uniform(lo - 2, hi + 2, (4 * M, 3))
+    fuera = ((P < lo - distancia) | (P > hi + distancia)).any(axis=1)
+    return P[fuera][:M]
+
+
+def test_segmento_mediatriz_y_eje():
+    L, l = 2.0, 3e-9
+    c = Segmento((0, 0, -1), (0, 0, 1), l)
+    d = np.array([1e-3, 0.1, 1.0, 50.0])
+    P = np.column_stack((d, 0 * d, 0 * d))
+    h = np.hypot(d, L / 2)
+    V0 = k * l * np.log((h + L / 2) / (h - L / 2))
+    E0 = np.column_stack((k * l * L / (d * h), 0 * d, 0 * d))
+    comparar(c, P, V0, E0)
+    s = np.array([1.001, 1.5, 10.0, 1e3])           # Sobre el eje, más allá de b.
+    P = np.column_stack((0 * s, 0 * s, s))
+    V0 = k * l * np.log((s + 1) / (s - 1))
+    E0 = np.column_stack((0 * s, 0 * s, k * l * (1 / (s - 1) - 1 / (s + 1))))
+    comparar(c, P, V0, E0)
+
+
+def test_segmento_discreto():
+    a, b, l = np.array([0.3, -0.2, 0.1]), np.array([-0.5, 0.7, 0.4]), -2e-9
+    c = Segmento(a, b, l)
+    t, w = np.polynomial.legendre.leggauss(400)
+    C = np.column_stack((l * c.largo / 2 * w, a + (b - a) * (t[:, None] + 1) / 2))
+    discreto(c, C, lejos(c, 300, 0.2, 0))
+
+
+@pytest.mark.parametrize('normal', [(0, 0, 1), (1, 2, -0.5)])
+def test_anillo(normal):
+    a, l = 0.4, 2e-9
+    centro = np.array([0.1, -0.3, 0.2])
+    c = Anillo(centro, a, l, normal=normal)
+    n, u, v = base(normal)
+    z = np.array([-3.0, -0.2, 0.0, 1e-4, 0.5, 20.0])
+    P = centro + z[:, None] * n
+    q = 2 * np.pi * a * l
+    V0 = k * q / np.sqrt(z**2 + a**2)
+    comparar(c, P, V0, (k * q * z / (z**2 + a**2)**1.5)[:, None] * n)
+    phi = 2 * np.pi * np.arange(4000) / 4000
+    anillo = centro + a * (np.cos(phi)[:, None] * u + np.sin(phi)[:, None] * v)
+    C = np.column_stack((np.full(4000, q / 4000), anillo))
+    # Puntos fuera de la caja y cerca del eje (donde se usa el desarrollo).
+    P = np.concatenate((lejos(c, 300, 0.1, 1),
+                        centro + 1e-6 * u + np.array([[0.3], [-0.7]]) * n))
+    discreto(c, C, P)
+
+
+@pytest.mark.parametrize('normal', [(0, 0, 1), (-1, 0.5, 1)])
+def test_disco(normal):
+    R, s = 0.5, 1e-9
+    centro = np.array([0.2, 0.1, -0.4])
+    c = Disco(centro, R, s, normal=normal, tol=1e-11)
+    n, u, v = base(normal)
+    z = np.array([-2.0, -0.1, 1e-3, 0.3, 10.0])
+    P = centro + z[:, None] * n
+    V0 = 2 * np.pi * k * s * (np.sqrt(z**2 + R**2) - np.abs(z))
+    Ez = 2 * np.pi * k * s * np.sign(z) * (1 - np.abs(z) / np.sqrt(z**2 + R**2))
+    comparar(c, P, V0, Ez[:, None] * n, 1e-8)
+    # Anillos de Gauss-Legendre en el radio, puntos equiespaciados en el ángulo.
+    t, w = np.polynomial.legendre.leggauss(200)
+    r, w = R * (t + 1) / 2, R / 2 * w
+    phi = 2 * np.pi * np.arange(600) / 600
+    x = r[:, None, None] * (np.cos(phi)[None, :, None] * u + np.sin(phi)[None, :, None] * v)
+    dq = 2 * np.pi * s * r * w / 600
+    C = np.column_stack((np.repeat(dq, 600), centro + x.reshape(-1, 3)))
+    discreto(c, C, lejos(c, 200, 0.2, 2), 1e-8)
+
+
+def test_esfera():
+    R, s = 0.3, -1e-9
+    centro = np.array([0.5, 0.0, -0.2])
+    c = Esfera(centro, R, s)
+    q = 4 * np.pi * R**2 * s
+    rng = np.random.default_rng(3)
+    d = rng.normal(size=(50, 3))
+    d /= np.linalg.norm(d, axis=1)[:, None]
+    r = np.concatenate((rng.uniform(0, 0.9 * R, 25), rng.uniform(1.1 * R, 10, 25)))
+    P = centro + r[:, None] * d
+    fuera = r > R
+    V0 = np.where(fuera, k * q / r, k * q / R)
+    E0 = np.where(fuera[:, None], k * q * d / r[:, None]**2, 0)
+    comparar(c, P, V0, E0)
+    # Gauss-Legendre en cos(theta), equiespaciado en phi: dentro, V constante
+    # y E nulo; fuera, el de una carga puntual.
+    t, w = np.polynomial.legendre.leggauss(200)
+    phi = 2 * np.pi * np.arange(400) / 400
+    seno = np.sqrt(1 - t**2)
+    x = R * np.stack(np.broadcast_arrays(seno[:, None] * np.cos(phi), seno[:, None] * np.sin(phi),
+                                         t[:, None]), axis=-1)
+    C = np.column_stack((np.repeat(2 * np.pi * R**2 * s * w / 400, 400),
+                         centro + x.reshape(-1, 3)))
+    V, E = nucleo.campo(P, C, True, True)
+    lejanos = np.abs(r - R) > 0.1 * R
+    np.testing.assert_allclose(V[lejanos], V0[lejanos], rtol=1e-8)
+    np.testing.assert_allclose(E[lejanos], E0[lejanos], rtol=0, atol=1e-8 * np.abs(E0).max())
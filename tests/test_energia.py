@@ -0,0 +1,52 @@
+"""Precisión del método de celdas de energia, respecto de todos los pares."""
+
+import numpy as np
+import pytest
+
+from frautnEM import energia
+from frautnEM import nucleo
+
+
+def cargas(N, semilla, plano=False):
+    rng = np.random.default_rng(semilla)
+    Q = np.column_stack([rng.choice((-1e-9, 1e-9), N) * rng.uniform(0.5, 1.5, N),
+                         rng.uniform(-1, 1, (N, 3))])
+    if plano:
+        Q[:, 3] = 0
+    return Q
+
+
+def errores(Q):
+    """Errores de U y de F del método de celdas, en las escalas del módulo."""
+    U0, F0 = energia.energiaYFuerzas(Q)
+    U, F = energia.energiaYFuerzas(Q, method='celdas')
+    escala = 0.5 * np.abs(Q[:, 0] * nucleo.campo(Q[:, 1:], Q, True, False, excluir=0)[0]).sum()
+    return abs(U - U0) / escala, np.abs(F - F0).max() / np.abs(F0).max()
+
+
+@pytest.mark.parametrize('direccion', [(1, 0, 0), (1, 1, 0), (1, 1, 1)])
+@pytest.mark.parametrize('d', [0.01, 0.3, 7])
+def test_dos_cargas(d, direccion):
+    r = d * np.array(direccion) / np.linalg.norm(direccion)
+    for q in (1e-9, -1e-9):
+        eU, eF = errores(np.array([[1e-9, 0, 0, 0], [q, *r]]))
+        assert eU < 3e-3
+        assert eF < 2e-2
+
+
+@pytest.mark.parametrize('N, cotaU, cotaF', [(20, 3e-3, 2e-2), (1000, 2e-4, 1e-3),
+                                            (4000, 2e-4, 1e-3)])
+@pytest.mark.parametrize('plano', [False, True])
+def test_cargas_al_azar(N, cotaU, cotaF, plano):
+    eU, eF = errores(cargas(N, N, plano))
+    assert eU < cotaU
+    assert eF < cotaF
+
+
+def test_corte_y_max_bytes():
+    Q = cargas(200, 5)
+    with pytest.raises(ValueError, match='corte'):
+        energia.energia(Q, method='celdas', corte=0.05, max_bytes=2**24)
+    U0 = energia.energia(Q)
+    U = energia.energia(Q, method='celdas', corte=1.0, max_bytes=2**24)
+    assert abs(U - U0) < 1e-2 * abs(U0)
@@ -0,0 +1,49 @@
+"""
+Importar frautnEM no carga matplotlib hasta que se grafica.
+
+Además se acota el tiempo de import frautnEM.puntuales en un proceso nuevo,
+con un margen amplio para no depender de la máquina; el caso 'importacion'
+de tests/benchmarks mide ese tiempo con más detalle.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+
+# Segundos que puede tardar import frautnEM.puntuales (importar
+# matplotlib.pyplot solo, con numpy ya cargado, tarda del orden de 0.4 s).
+TIEMPO = 2.0
+
+PROGRAMA = """
+import sys
+import time
+t = time.perf_counter()
+import frautnEM.puntuales as p
+tiempo = time.perf_counter() - t
+assert 'matplotlib' not in sys.modules, 'matplotlib se importó con frautnEM.puntuales'
+Q = [[1e-9, 0, 0, 0], [-1e-9, 0.5, 0, 0]]
+p.calcularEf(Q)
+p.V(0.1, 0.2, 0.3, Q)
+assert 'matplotlib' not in sys.modules, 'matplotlib se importó al calcular'
+p.calcularEquipotenciales(Q, 3, adaptativo=True)
+assert 'matplotlib' not in sys.modules, 'matplotlib se importó con el muestreo adaptativo'
+p.plotEf(Q, mostrar=False)
+import matplotlib.pyplot as plt
+assert len(plt.gcf().axes) == 1
+print(tiempo)
+"""
+
+
+def test_matplotlib_se_importa_al_graficar():
+    pytest.importorskip('matplotlib')
+    entorno = dict(os.environ, MPLBACKEND='Agg',
+                   PYTHONPATH=os.pathsep.join(filter(None, (str(SRC), os.environ.get('PYTHONPATH')))))
+    r = subprocess.run([sys.executable, '-c', PROGRAMA], env=entorno, capture_output=True,
+                       text=True, timeout=120)
+    assert r.returncode == 0, r.stderr
+    assert float(r.stdout) < TIEMPO
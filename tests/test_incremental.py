@@ -0,0 +1,84 @@
+"""Las modificaciones de FieldGrid dan lo mismo que recalcular todo el campo."""
+
+import numpy as np
+import pytest
+
+from frautnEM import puntuales
+from frautnEM.distribuciones import Anillo
+from frautnEM.incremental import FieldGrid
+
+
+def cargas(N, semilla):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([rng.choice((-1e-9, 1e-9), N) * rng.uniform(0.5, 1.5, N),
+                            rng.uniform(-1, 1, (N, 3))])
+
+
+def grilla():
+    u = np.linspace(-1.5, 1.5, 7)
+    return np.meshgrid(u, u, u + 0.05)
+
+
+def comparar(G):
+    X, Y, Z = G.X, G.Y, G.Z
+    V, Ei, Ej, Ek = puntuales.VEf(X, Y, Z, G.Q)
+    np.testing.assert_allclose(G.V, V, rtol=1e-9, atol=1e-9 * np.abs(V).max())
+    escala = 1e-9 * max(np.abs(E).max() for E in (Ei, Ej, Ek))
+    for a, b in zip(G.E, (Ei, Ej, Ek)):
+        np.testing.assert_allclose(a, b, rtol=1e-9, atol=escala)
+
+
+@pytest.fixture(params=[False, True], ids=['puntuales', 'con_anillo'])
+def G(request):
+    Q = cargas(20, 0).tolist()
+    if request.param:
+        Q.append(Anillo((0.2, -0.1, 0.3), 0.4, 2e-9, normal=(1, 1, 0)))
+    return FieldGrid(*grilla(), Q)
+
+
+def test_inicial(G):
+    comparar(G)
+
+
+def test_mover(G):
+    G.mover([3, 7], [0.1, -0.4], [0.2, 0.9], [-0.3, 0.0])
+    assert np.allclose(G.Q.r[[3, 7]], [[0.1, 0.2, -0.3], [-0.4, 0.9, 0.0]])
+    comparar(G)
+
+
+def test_cambiarCarga(G):
+    G.cambiarCarga(5, -3e-9)
+    assert G.Q.q[5] == -3e-9
+    comparar(G)
+
+
+def test_agregar_y_quitar(G):
+    G.agregar(cargas(4, 1))
+    assert len(G) == 24
+    comparar(G)
+    G.quitar([0, 21])
+    assert len(G) == 22
+    comparar(G)
+
+
+def test_agregar_distribucion(G):
+    G.agregar([[1e-9, 0.3, 0.3, 0.3], Anillo((0, 0, -0.5), 0.3, -1e-9)])
+    assert len(G) == 21
+    comparar(G)
+    G.mover(20, -0.6, 0.1, 0.2)
+    comparar(G)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_carga_sobre_la_grilla(G):
+    # Pasar por un punto de la grilla deja inf allí; al salir se recalcula.
+    x, y, z = G.X.flat[10], G.Y.flat[10], G.Z.flat[10]
+    G.mover(0, x, y, z)
+    assert not np.isfinite(G.V.flat[10])
+    G.mover(0, 0.123, 0.456, 0.789)
+    comparar(G)
+
+
+def test_reemplazar_por_distribucion(G):
+    with pytest.raises(ValueError):
+        G.actualizar(0, [Anillo((0, 0, 0), 0.3, 1e-9)])
@@ -0,0 +1,32 @@
+"""Líneas de campo: sentido de las polilíneas y búsqueda de sumideros."""
+
+import numpy as np
+import pytest
+
+from frautnEM import lineas
+from frautnEM import puntuales
+
+
+@pytest.mark.parametrize('Q', [
+    [[1e-9, 0, 0, 0], [-2e-9, 1, 0, 0]],
+    [[-1e-9, 0, 0, 0], [-2e-9, 1, 0, 0]],
+], ids=['dipolo', 'negativas'])
+@pytest.mark.parametrize('plano', [None, ('z', 0)])
+def test_en_el_sentido_del_campo(Q, plano):
+    L = lineas.lineasDeCampo(Q, 8, plano=plano)
+    assert L
+    for l in L:
+        x, y, z = l[:-1].T
+        E = np.stack(puntuales.Ef(x, y, z, Q), axis=-1)
+        avance = np.einsum('ij,ij->i', E, np.diff(l, axis=0))
+        assert (avance > 0).mean() > 0.99
+
+
+@pytest.mark.parametrize('max_bytes', [None, 4000, 1])
+def test_mas_cercano_por_bloques(max_bytes):
+    rng = np.random.default_rng(0)
+    P, S = rng.random((1000, 3)), rng.random((77, 3))
+    d2 = ((P[:, None] - S[None]) ** 2).sum(axis=-1)
+    j, d = lineas._masCercano(P, S, max_bytes)
+    np.testing.assert_array_equal(j, d2.argmin(axis=1))
+    np.testing.assert_allclose(d, np.sqrt(d2.min(axis=1)), rtol=1e-14)
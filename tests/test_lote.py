@@ -0,0 +1,54 @@
+"""Gráficos en lote: los archivos se escriben y los errores se informan."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+
+from frautnEM import lote  # noqa: E402
+from frautnEM import puntuales  # noqa: E402
+
+Q = [[1e-9, -0.213, 0.117, 0], [-1e-9, 0.287, -0.083, 0]]
+
+
+def trabajos(carpeta):
+    return [
+        {'grafico': 'plotEf', 'Q': Q, 'params': {'w': 8, 'dx': 20},
+         'archivo': str(carpeta / 'campo.png')},
+        {'grafico': 'equipotencialesPuntuales', 'Q': Q, 'params': {'dim': 0.2},
+         'archivo': str(carpeta / 'equipotenciales.svg')},
+        {'grafico': 'noExiste', 'Q': Q, 'archivo': str(carpeta / 'nada.png')},
+        {'grafico': 'plotEfcontribuciones', 'args': (puntuales.Ef, Q, [0.1, 0.2, 0.05]),
+         'archivo': str(carpeta / 'contribuciones.png'), 'dpi': 50},
+    ]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_renderizar(tmp_path, workers):
+    informe = lote.renderizar(trabajos(tmp_path), workers=workers, dpi=40)
+    assert [i['archivo'] for i in informe] == [t['archivo'] for t in trabajos(tmp_path)]
+    error = informe.pop(2)
+    assert error['error'].startswith('AttributeError')
+    assert not (tmp_path / 'nada.png').exists()
+    for i in informe:
+        assert i['error'] is None, i['error']
+        assert Path(i['archivo']).stat().st_size > 0
+        assert i['calculo'] >= 0 and i['dibujo'] > 0
+    assert (tmp_path / 'campo.png').read_bytes().startswith(b'\x89PNG')
+    assert b'<svg' in (tmp_path / 'equipotenciales.svg').read_bytes()
+
+
+def test_figura_reutilizada(tmp_path):
+    lote.renderizar(trabajos(tmp_path)[:2], dpi=40)
+    assert lote._figura is not None and not lote._figura.axes
+
+
+def test_error_no_detiene(tmp_path):
+    malo = {'grafico': 'plotEf', 'Q': Q, 'params': {'w': 8},
+            'archivo': str(tmp_path / 'no' / 'existe' / 'campo.png')}
+    bueno = trabajos(tmp_path)[0]
+    informe = lote.renderizar([malo, bueno], dpi=40)
+    assert informe[0]['error'] is not None and informe[1]['error'] is None
+    assert np.isfinite(informe[0]['calculo'])
@@ -0,0 +1,76 @@
+"""El método partícula-malla reproduce el campo de la suma directa."""
+
+import math
+
+import numpy as np
+import pytest
+
+from frautnEM import malla
+from frautnEM import nucleo
+from frautnEM import puntuales
+
+# Error relativo punto a punto admitido (mediana, percentil 99), con el
+# sigma por defecto; ver la precisión medida en malla.
+TOL_E = (5e-3, 3e-2)
+TOL_V = (1e-3, 5e-2)
+
+
+def cargas(N, semilla):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([rng.choice((-1e-9, 1e-9), N) * rng.uniform(0.5, 1.5, N),
+                            rng.uniform(-1, 1, (N, 3))])
+
+
+def errores(P, C, **opciones):
+    V, E = malla.campo(P, C, True, True, **opciones)
+    V0, E0 = nucleo.campo(P, C, True, True)
+    eV = np.abs(V - V0) / np.abs(V0)
+    eE = np.linalg.norm(E - E0, axis=1) / np.linalg.norm(E0, axis=1)
+    return [(np.median(e), np.percentile(e, 99)) for e in (eV, eE)]
+
+
+def test_erfc():
+    x = np.linspace(0, 26, 100001)
+    np.testing.assert_allclose(malla.erfc(x), [math.erfc(v) for v in x], rtol=1e-14, atol=0)
+    np.testing.assert_allclose(malla.erf(x[1:]), [math.erf(v) for v in x[1:]],
+                               rtol=1e-14, atol=0)
+
+
+@pytest.mark.parametrize('N, semilla', [(30, 0), (400, 1)])
+def test_grilla_3d(N, semilla):
+    u = np.linspace(-1.2, 1.2, 21)
+    _, P = nucleo.puntos(*np.meshgrid(u, u, u + 0.0123))
+    eV, eE = errores(P, cargas(N, semilla))
+    assert eV[0] < TOL_V[0] and eV[1] < TOL_V[1]
+    assert eE[0] < TOL_E[0] and eE[1] < TOL_E[1]
+
+
+def test_plano():
+    u = np.linspace(-1.2, 1.2, 61)
+    X, Y = np.meshgrid(u, u)
+    _, P = nucleo.puntos(X, Y, 0.0123)
+    eV, eE = errores(P, cargas(200, 2))
+    assert eV[0] < TOL_V[0] and eV[1] < TOL_V[1]
+    assert eE[0] < TOL_E[0] and eE[1] < TOL_E[1]
+
+
+def test_sigma_mayor_mas_exacto():
+    u = np.linspace(-1.2, 1.2, 21)
+    _, P = nucleo.puntos(*np.meshgrid(u, u, u + 0.0123))
+    C = cargas(200, 3)
+    h = u[1] - u[0]
+    assert errores(P, C, sigma=3 * h)[1][0] < errores(P, C, sigma=2 * h)[1][0] / 2
+
+
+def test_max_bytes():
+    # Si la malla no entra en max_bytes se suma directamente.
+    u = np.linspace(-1, 1, 21)
+    X, Y, Z = np.meshgrid(u, u, u)
+    Q = cargas(10, 4)
+    directo = puntuales.Ef(X, Y, Z, Q)
+    for a, b in zip(puntuales.Ef(X, Y, Z, Q, method='malla', max_bytes=2**20), directo):
+        np.testing.assert_allclose(a, b, rtol=1e-12)
+    for a, b in zip(puntuales.Ef(X, Y, Z, Q, method='malla', max_bytes=2**26), directo):
+        assert not np.allclose(a, b, rtol=1e-12)
+    with pytest.raises(ValueError, match='max_bytes'):
+        malla.resolver(np.zeros((30, 30, 30)), np.full(3, 0.1), 0.2, max_bytes=2**20)
@@ -0,0 +1,47 @@
+"""Selección de flechas: cantidad, reparto en el espacio y puntos ocultos."""
+
+import numpy as np
+import pytest
+
+from frautnEM import muestreo
+
+
+@pytest.mark.parametrize('forma, flechas', [
+    ((100, 100, 100), 3000), ((100, 100, 100), 2000), ((100, 100), 3000),
+    ((100, 100), 2000), ((7, 300), 50), ((1, 1000), 10), ((2, 2, 500), 30), ((3, 3), 8),
+])
+def test_cantidad(forma, flechas):
+    i = muestreo.estratificado(forma, flechas, rng=0)
+    assert len(i) == flechas
+    assert np.array_equal(i, np.unique(i))
+    assert i.min() >= 0 and i.max() < np.prod(forma)
+    assert np.prod(muestreo._bloques(forma, flechas)) <= flechas
+
+
+def test_todos_o_ninguno():
+    np.testing.assert_array_equal(muestreo.estratificado((4, 5), 20), np.arange(20))
+    np.testing.assert_array_equal(muestreo.estratificado((4, 5), 50), np.arange(20))
+    assert len(muestreo.estratificado((4, 5), 0)) == 0
+
+
+@pytest.mark.parametrize('forma, flechas, partes', [((100, 100), 3000, 10),
+                                                    ((60, 60, 60), 2000, 5)])
+def test_reparto(forma, flechas, partes):
+    # Cada celda (partes por eje) recibe casi la parte que le toca.
+    i = muestreo.estratificado(forma, flechas, rng=1)
+    celda = np.stack(np.unravel_index(i, forma)) * partes // np.array(forma)[:, None]
+    cuenta = np.bincount(np.ravel_multi_index(tuple(celda), (partes,) * len(forma)),
+                         minlength=partes ** len(forma))
+    media = flechas / partes ** len(forma)
+    assert cuenta.min() >= 0.5 * media
+    assert cuenta.max() <= 1.6 * media
+
+
+@pytest.mark.parametrize('max_bytes', [None, 500])
+def test_visibles(max_bytes):
+    rng = np.random.default_rng(0)
+    P = rng.uniform(-1, 1, (2000, 3))
+    C = np.column_stack([np.ones(30), rng.uniform(-1, 1, (30, 3))])
+    d = np.linalg.norm(P[:, None] - C[None, :, 1:], axis=-1)
+    np.testing.assert_array_equal(muestreo.visibles(P, C, 0.2, max_bytes),
+                                  (d > 0.2).all(axis=1))
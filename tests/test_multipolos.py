@@ -0,0 +1,75 @@
+"""El desarrollo multipolar respeta la tolerancia pedida lejos de las cargas."""
+
+import numpy as np
+import pytest
+
+from frautnEM import multipolos
+from frautnEM import nucleo
+
+DISTANCIAS = (2, 3, 5, 10, 30, 100)
+
+
+def cargas(N, semilla, neutras):
+    rng = np.random.default_rng(semilla)
+    q = rng.uniform(0.5, 1.5, N) * 1e-9
+    if neutras:
+        q *= rng.choice((-1, 1), N)
+    return np.column_stack((q, rng.uniform(-1, 1, (N, 3))))
+
+
+def esfera(centro, d, M=300, semilla=0):
+    u = np.random.default_rng(semilla).normal(size=(M, 3))
+    return centro + d * u / np.linalg.norm(u, axis=1)[:, None]
+
+
+def errores(D, P, C, **opciones):
+    """Error absoluto y relativo, punto a punto, de V y de |E|."""
+    V, E = D.campo(P, True, True, **opciones)
+    V0, E0 = nucleo.campo(P, C, True, True)
+    eV, eE = np.abs(V - V0), np.linalg.norm(E - E0, axis=1)
+    return eV, eE, eV / np.abs(V0), eE / np.linalg.norm(E0, axis=1)
+
+
+@pytest.mark.parametrize('neutras', [False, True])
+@pytest.mark.parametrize('tol', [1e-3, 1e-6])
+def test_error_por_orden_y_distancia(tol, neutras):
+    C = cargas(200, 0, neutras)
+    D = multipolos.Desarrollo(C, tol)
+    usados = 0
+    for p in range(multipolos.ORDEN_MAXIMO + 1):
+        for d in DISTANCIAS:
+            P = esfera(D.centro, d)
+            lejos = D.lejos(np.full(len(P), d), p, True, True)
+            _, _, rV, rE = errores(D, P, C, p=p)
+            # Donde se usa el desarrollo, el error relativo al valor en cada
+            # punto no supera tol; en los demás se suma directo.
+            assert (rV[lejos] <= tol).all() and (rE[lejos] <= tol).all()
+            assert (rV[~lejos] < 1e-12).all() and (rE[~lejos] < 1e-12).all()
+            usados += lejos.sum()
+    assert usados > 0
+
+
+@pytest.mark.parametrize('p', [0, 2, 5, 8])
+def test_cota(p):
+    C = cargas(100, 1, True)
+    D = multipolos.Desarrollo(C)
+    for d in (3, 10, 100):
+        P = esfera(D.centro, d, 100, p)
+        V, E = multipolos.evaluar(D.M[:len(multipolos.indices(p))], P - D.centro, p, True, True)
+        V0, E0 = nucleo.campo(P, C, True, True)
+        cV, cE = multipolos.cota(D.qabs, D.radio, d, p)
+        # Más el redondeo de sumar las cargas.
+        assert np.abs(V - V0).max() <= cV + 1e-13 * np.abs(V0).max()
+        assert np.linalg.norm(E - E0, axis=1).max() <= cE + 1e-13 * np.linalg.norm(E0, axis=1).max()
+
+
+@pytest.mark.parametrize('tol', [1e-4, 1e-8])
+def test_eleccion_automatica(tol):
+    C = cargas(3000, 2, False)
+    D = multipolos.Desarrollo(C, tol)
+    P = np.concatenate([esfera(D.centro, d, 100, i) for i, d in enumerate(DISTANCIAS)])
+    x = P - D.centro
+    p, lejos = D.elegir(np.sqrt(np.einsum('ij,ij->i', x, x)), True, True)
+    assert p > 0 and lejos.any()
+    _, _, rV, rE = errores(D, P, C)
+    assert rV.max() <= tol and rE.max() <= tol
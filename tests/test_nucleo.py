@@ -0,0 +1,85 @@
+"""Reutilización de memoria y precisión en float32 del cálculo directo."""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from frautnEM import nucleo
+from frautnEM import puntuales
+from frautnEM.cargas import ChargeSet
+
+
+def cargas(N, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([rng.uniform(-1e-9, 1e-9, N), rng.uniform(-1, 1, (N, 3))])
+
+
+def malla(n):
+    x, y = np.meshgrid(np.linspace(-2, 2, n), np.linspace(-2, 2, n))
+    return x, y, np.full_like(x, 0.3)
+
+
+# Los ufuncs con operandos difundidos usan búferes internos de tamaño fijo
+# (unos 64 kB cada uno), que no dependen de la cantidad de puntos.
+BUFERES = 2**18
+
+
+def pico(f, veces=3):
+    """Máxima memoria reservada (bytes) por veces llamadas a f, tras una previa."""
+    f()
+    tracemalloc.start()
+    for _ in range(veces):
+        f()
+    _, maximo = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return maximo
+
+
+@pytest.mark.parametrize('n', [60, 200])
+def test_campo_sin_reservar_memoria(n):
+    C = cargas(200)
+    _, P = nucleo.puntos(*malla(n))
+    V, E = np.empty(len(P)), np.empty((len(P), 3))
+    trabajo = nucleo.Trabajo.para(len(P), len(C))
+    sin = pico(lambda: nucleo.campo(P, C, True, True, out=(V, E)))
+    con = pico(lambda: nucleo.campo(P, C, True, True, out=(V, E), trabajo=trabajo))
+    assert sin > 3 * BUFERES
+    assert con < BUFERES
+
+
+@pytest.mark.parametrize('n', [60, 200])
+def test_Ef_y_VEf_sin_reservar_memoria(n):
+    Q = ChargeSet(cargas(200))
+    x, y, z = malla(n)
+    V, Ei, Ej, Ek = (np.empty_like(x) for _ in range(4))
+    trabajo = nucleo.Trabajo.para(x.size, len(Q.C))
+    sin = pico(lambda: puntuales.Ef(x, y, z, Q, out=(Ei, Ej, Ek)))
+    con = pico(lambda: puntuales.Ef(x, y, z, Q, out=(Ei, Ej, Ek), trabajo=trabajo))
+    assert sin > 3 * BUFERES
+    assert con < BUFERES
+    assert pico(lambda: puntuales.VEf(x, y, z, Q, out=(V, Ei, Ej, Ek), trabajo=trabajo)) < BUFERES
+    Ei0, Ej0, Ek0 = puntuales.Ef(x, y, z, Q)
+    np.testing.assert_allclose(Ei, Ei0, rtol=1e-12, atol=1e-12 * np.abs(Ei0).max())
+    np.testing.assert_allclose(Ek, Ek0, rtol=1e-12, atol=1e-12 * np.abs(Ek0).max())
+
+
+def test_trabajo_crece_con_los_puntos():
+    Q = ChargeSet(cargas(50))
+    trabajo = nucleo.Trabajo.para(10, len(Q.C))
+    for n in (5, 40, 20):
+        x, y, z = malla(n)
+        np.testing.assert_array_equal(puntuales.V(x, y, z, Q, trabajo=trabajo),
+                                      puntuales.V(x, y, z, Q))
+
+
+def test_float32():
+    C = cargas(500, semilla=3)
+    x, y, z = malla(80)
+    V = puntuales.V(x, y, z, C)
+    E = np.stack(puntuales.Ef(x, y, z, C))
+    V32 = puntuales.V(x, y, z, C, dtype=np.float32)
+    E32 = np.stack(puntuales.Ef(x, y, z, C, dtype=np.float32))
+    assert V32.dtype == np.float32 and E32.dtype == np.float32
+    assert np.abs(V32 - V).max() <= 1e-4 * np.abs(V).max()
+    assert np.abs(E32 - E).max() <= 1e-4 * np.abs(E).max()
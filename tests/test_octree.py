@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from frautnEM import nucleo
+from frautnEM.octree import Octree
+
+
+def cargas(N, semilla):
+    rng = np.random.default_rng(semilla)
+    Q = np.zeros((N, 4))
+    Q[:, 0] = rng.choice((-1e-9, 1e-9), N) * rng.uniform(0.5, 1.5, N)
+    Q[:, 1:] = rng.uniform(-1, 1, (N, 3))
+    return Q
+
+
+def puntos(M, semilla):
+    rng = np.random.default_rng(semilla)
+    return rng.uniform(-2, 2, (M, 3))
+
+
+@pytest.mark.parametrize('theta', [0.2, 0.5, 0.8])
+@pytest.mark.parametrize('N', [10, 300, 2000])
+def test_campo_dentro_de_la_cota(theta, N):
+    Q = cargas(N, N)
+    P = puntos(500, N + 1)
+    V, E = nucleo.campo(P, Q, calcV=True, calcE=True)
+    Vo, cotaV, Eo, cotaE = Octree(Q).campo(P, theta, calcV=True, calcE=True)
+    assert np.all(np.abs(Vo - V) <= cotaV * (1 + 1e-9) + 1e-12 * np.abs(V))
+    errorE = np.linalg.norm(Eo - E, axis=1)
+    assert np.all(errorE <= cotaE * (1 + 1e-9) + 1e-12 * np.linalg.norm(E, axis=1))
+
+
+@pytest.mark.parametrize('theta', [0.3, 0.5, 0.7])
+def test_Ef_y_V(theta):
+    Q = cargas(1000, 7)
+    x, y = np.meshgrid(np.linspace(-1.5, 1.5, 20), np.linspace(-1.5, 1.5, 20))
+    z = np.full_like(x, 0.05)
+    shape, P = nucleo.puntos(x, y, z)
+    V, E = nucleo.campo(P, Q, calcV=True, calcE=True)
+    arbol = Octree(Q)
+
+    Vo, cotaV = arbol.V(x, y, z, theta, cota=True)
+    assert Vo.shape == shape
+    assert np.all(np.abs(Vo.ravel() - V) <= cotaV.ravel() * (1 + 1e-9) + 1e-12 * np.abs(V))
+
+    Ei, Ej, Ek, cotaE = arbol.Ef(x, y, z, theta, cota=True)
+    errorE = np.linalg.norm(np.stack((Ei, Ej, Ek), -1).reshape(-1, 3) - E, axis=1)
+    assert np.all(errorE <= cotaE.ravel() * (1 + 1e-9) + 1e-12 * np.linalg.norm(E, axis=1))
+    # Con theta chico el error es chico en relación con el campo.
+    escala = np.linalg.norm(E, axis=1).max()
+    assert errorE.max() < (0.1 if theta > 0.5 else 0.02) * escala
+
+
+def test_theta_cero_es_la_suma_directa():
+    Q = cargas(200, 3)
+    P = puntos(100, 4)
+    V, E = nucleo.campo(P, Q, calcV=True, calcE=True)
+    Vo, _, Eo, _ = Octree(Q).campo(P, 0.0, calcV=True, calcE=True)
+    np.testing.assert_allclose(Vo, V, rtol=1e-12, atol=1e-12 * np.abs(V).max())
+    np.testing.assert_allclose(Eo, E, rtol=1e-12, atol=1e-12 * np.abs(E).max())
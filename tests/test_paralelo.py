@@ -0,0 +1,90 @@
+import os
+import pickle
+import time
+
+import numpy as np
+import pytest
+
+from frautnEM import paralelo
+from frautnEM import puntuales
+
+
+def cargas(N, semilla=0):
+    rng = np.random.default_rng(semilla)
+    Q = np.zeros((N, 4))
+    Q[:, 0] = rng.choice((-1e-9, 1e-9), N)
+    Q[:, 1:] = rng.uniform(-1, 1, (N, 3))
+    return Q
+
+
+def grilla(w, extension=2):
+    # Más de un tramo por trabajador (ver paralelo._MINIMO).
+    x, y = np.meshgrid(np.linspace(-extension, extension, w),
+                       np.linspace(-extension, extension, w))
+    return x, y, 0.1
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pools():
+    yield
+    paralelo.cerrar()
+
+
+@pytest.mark.parametrize('extension', [2, 20])
+@pytest.mark.parametrize('pool', ['hilos', 'procesos'])
+@pytest.mark.parametrize('method', ['directo', 'octree', 'multipolo'])
+def test_igual_que_en_serie(method, pool, extension):
+    # Con extension=20 el desarrollo multipolar se usa en los puntos lejanos.
+    Q = cargas(300)
+    x, y, z = grilla(130, extension)
+    assert len(paralelo.tramos(x.size, 2)) > 2
+    V1, E1 = puntuales.V(x, y, z, Q, method=method), puntuales.Ef(x, y, z, Q, method=method)
+    V2 = puntuales.V(x, y, z, Q, method=method, workers=2, pool=pool)
+    E2 = puntuales.Ef(x, y, z, Q, method=method, workers=2, pool=pool)
+    assert np.array_equal(V1, V2)
+    for a, b in zip(E1, E2):
+        assert np.array_equal(a, b)
+
+
+def test_argumentos_serializados_una_vez(monkeypatch):
+    Q = cargas(200)
+    x, y, z = grilla(130)
+    llamadas = []
+    dumps = pickle.dumps
+
+    def contar(obj, *args, **kwargs):
+        llamadas.append(type(obj))
+        return dumps(obj, *args, **kwargs)
+
+    monkeypatch.setattr(paralelo.pickle, 'dumps', contar)
+    puntuales.Ef(x, y, z, Q, method='octree', workers=2, pool='procesos')
+    assert len(llamadas) == 1
+
+
+def test_cerrar():
+    Q = cargas(50)
+    x, y, z = grilla(130)
+    puntuales.Ef(x, y, z, Q, workers=2)
+    assert paralelo._pools
+    paralelo.cerrar()
+    assert not paralelo._pools
+    # Se vuelven a crear al usarlos.
+    puntuales.Ef(x, y, z, Q, workers=2)
+    assert paralelo._pools
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 4, reason="requiere al menos 4 núcleos")
+@pytest.mark.parametrize('pool', ['hilos', 'procesos'])
+def test_escala(pool):
+    Q = cargas(400)
+    x, y, z = grilla(400)
+    puntuales.Ef(x, y, z, Q, workers=4, pool=pool)  # Crea el pool.
+
+    def tiempo(workers):
+        inicio = time.perf_counter()
+        puntuales.Ef(x, y, z, Q, workers=workers, pool=pool)
+        return time.perf_counter() - inicio
+
+    serie = min(tiempo(1) for _ in range(3))
+    paralelo4 = min(tiempo(4) for _ in range(3))
+    assert paralelo4 < 0.6 * serie
@@ -0,0 +1,103 @@
+"""Perfil de tiempos: etapas anidadas, conteos y costo sin perfil activo."""
+
+import threading
+import timeit
+
+import numpy as np
+import pytest
+
+from frautnEM import perfil
+from frautnEM import puntuales
+
+
+@perfil.medido
+def interna(n):
+    perfil.contar(n, 3)
+    return n
+
+
+@perfil.medido
+def externa(n):
+    with perfil.etapa('preparar'):
+        perfil.contar(10, 2, evaluaciones=2)
+    return sum(interna(i) for i in range(n))
+
+
+def test_etapas_anidadas():
+    with perfil.Perfil() as p:
+        assert perfil.perfilActivo() is p
+        assert externa(3) == 3
+        externa(1)
+    assert perfil.perfilActivo() is None
+    e = p.estadisticas()
+    assert list(e) == ['externa', 'externa/interna', 'externa/preparar']
+    assert e['externa']['llamadas'] == 2
+    assert e['externa/interna']['llamadas'] == 4
+    assert e['externa/preparar']['llamadas'] == 2
+    # Los conteos se suman a la etapa y a las de afuera.
+    assert e['externa/interna']['evaluaciones'] == 4
+    assert e['externa/interna']['pares'] == 3 * (0 + 1 + 2 + 0)
+    assert e['externa/preparar']['pares'] == 2 * 2 * 10 * 2
+    assert e['externa']['evaluaciones'] == 4 + 2 * 2
+    assert e['externa']['pares'] == 9 + 80
+    for ruta, v in e.items():
+        assert 0 <= v['propio'] <= v['segundos'] + 1e-9
+    hijos = e['externa/interna']['segundos'] + e['externa/preparar']['segundos']
+    assert e['externa']['propio'] == pytest.approx(e['externa']['segundos'] - hijos, abs=1e-6)
+    assert '\n  interna ' in p.tabla()
+
+
+def test_excepcion_cierra_la_etapa():
+    @perfil.medido
+    def falla():
+        raise RuntimeError
+
+    with perfil.Perfil() as p:
+        with pytest.raises(RuntimeError):
+            falla()
+        interna(1)
+    assert set(p.estadisticas()) == {'falla', 'interna'}
+
+
+def test_hilos():
+    with perfil.Perfil() as p:
+        with perfil.etapa('principal'):
+            h = threading.Thread(target=interna, args=(5,))
+            h.start()
+            h.join()
+    # El otro hilo tiene su propia ruta, que no cuelga de la del principal.
+    assert set(p.estadisticas()) == {'principal', 'interna'}
+
+
+def test_activar_y_desactivar(tmp_path):
+    p = perfil.activarPerfil()
+    try:
+        puntuales.Ef(np.linspace(-1, 1, 10) + 0.01, 0.1, 0.2, [[1e-9, 0, 0, 0]])
+    finally:
+        assert perfil.desactivarPerfil() is p
+    assert p.estadisticas()['Ef']['pares'] == 10
+    p.guardar(tmp_path / 'perfil.json')
+    assert 'Ef' in (tmp_path / 'perfil.json').read_text()
+
+
+def test_memoria():
+    with perfil.Perfil(memoria=True) as p:
+        with perfil.etapa('reservar'):
+            a = np.ones(2**20)
+        del a
+    assert p.estadisticas()['reservar']['bytes'] >= 8 * 2**20
+
+
+def test_sin_perfil():
+    assert perfil.perfilActivo() is None
+    assert perfil.etapa('x') is perfil._NADA
+    assert externa(3) == 3
+    # Sin perfil, el decorador solo agrega una llamada y la consulta de una
+    # variable global: mucho menos que un microsegundo por llamada.
+    def cruda(n):
+        return n
+    medida = perfil.medido(cruda)
+    veces = 100000
+    extra = min(timeit.repeat(lambda: medida(1), number=veces, repeat=5)) - \
+        min(timeit.repeat(lambda: cruda(1), number=veces, repeat=5))
+    assert extra / veces < 1e-6
@@ -0,0 +1,50 @@
+"""Funciones auxiliares de los gráficos de puntuales."""
+
+import math
+import warnings
+
+import numpy as np
+import pytest
+
+from frautnEM import puntuales
+
+
+def test_en_puntos_con_funciones_escalares():
+    P = np.random.default_rng(0).uniform(-1, 1, (20, 3))
+    vectorial = lambda x, y, z, k: (k * x, k * y * y, 0 * z + k)
+    escalar = lambda x, y, z, k: (k * x, k * math.pow(y, 2), k)
+    condicional = lambda x, y, z, k: (k * x if x != 0 else 0.0, k * y * y, k)
+    esperado = puntuales._enPuntos(vectorial, P, 2.0)
+    for f in (escalar, condicional):
+        for e, e0 in zip(puntuales._enPuntos(f, P, 2.0), esperado):
+            np.testing.assert_allclose(e, e0, rtol=1e-15)
+
+
+def test_en_puntos_propaga_los_errores():
+    P = np.zeros((3, 3))
+
+    def f(x, y, z):
+        raise KeyError('campo')
+
+    with pytest.raises(KeyError):
+        puntuales._enPuntos(f, P)
+
+
+@pytest.mark.parametrize('in3D', [False, True])
+def test_contribuciones_de_cargas_coplanares(in3D):
+    matplotlib = pytest.importorskip('matplotlib')
+    from matplotlib.figure import Figure
+    matplotlib.use('Agg')
+    fig = Figure()
+    Q = [[1e-9, 0, 0, 0], [2e-9, 1, 0.5, 0], [-1e-9, 0, 1, 0]]
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        puntuales.plotEfcontribuciones(puntuales.Ef, Q, [0.5, 0.5, 0], in3D=in3D, figura=fig)
+    ax = fig.axes[0]
+    limites = [ax.get_xlim(), ax.get_ylim()] + ([ax.get_zlim()] if in3D else [])
+    assert all(b > a for a, b in limites)
+
+
+def test_separar():
+    assert puntuales._separar([0, 2, 1, 1, -1, 3]) == [0, 2, 0.6, 1.4, -1, 3]
+    assert puntuales._separar([5, 5]) == [4, 6]
@@ -0,0 +1,52 @@
+"""Persistencia de resultados con distribuciones continuas."""
+
+import numpy as np
+import pytest
+
+from frautnEM import cache
+from frautnEM import puntuales
+from frautnEM.distribuciones import Anillo, Disco, Esfera, Segmento
+from frautnEM.resultados import FieldResult
+from frautnEM.volumen import Volumen
+
+Q = [[1e-9, 0, 0, 2], [-2e-9, 1, 1, 0],
+     Segmento((0, 0, -1), (0, 0, 1), 1e-9),
+     Disco((1, 0, 0), 0.5, 1e-9, tol=1e-6),
+     Esfera((0, 2, 0), 0.3, 1e-9),
+     Anillo((0, 0, 1), 0.4, -1e-9, normal=(1, 0, 0))]
+
+
+def test_guardar_y_cargar(tmp_path):
+    F = puntuales.calcularEf(Q)
+    F.guardar(tmp_path / 'campo.npz')
+    G = FieldResult.cargar(tmp_path / 'campo.npz')
+    assert G.Q.huella == F.Q.huella
+    assert [repr(c) for c in G.Q.cuerpos] == [repr(c) for c in F.Q.cuerpos]
+    np.testing.assert_array_equal(G.Ei, F.Ei)
+
+
+def test_cache_en_disco(tmp_path):
+    cache.activarCache(directorio=tmp_path)
+    try:
+        F = puntuales.calcularEf(Q)
+        c = cache.activarCache(directorio=tmp_path)
+        G = puntuales.calcularEf(Q)
+    finally:
+        cache.desactivarCache()
+    assert c.estadisticas()['aciertos_disco'] == 1
+    assert G.Q.huella == F.Q.huella
+    assert len(G.Q.cuerpos) == 4
+
+
+def test_volumen(tmp_path):
+    Volumen.crear(tmp_path / 'campo.vol', (2, 2, 2), (0, 0, 0), (1, 1, 1), Q=Q)
+    vol = Volumen(tmp_path / 'campo.vol')
+    assert [repr(c) for c in vol.Q.cuerpos] == [repr(c) for c in puntuales.ChargeSet(Q).cuerpos]
+
+
+@pytest.mark.parametrize('f', [puntuales.Ef, lambda x, y, z, Q: puntuales.Ef(x, y, z, Q)])
+def test_contribuciones_con_cuerpos(f):
+    x = [0.5, 0.5, 0.5]
+    E = puntuales._contribuciones(f, puntuales.ChargeSet(Q), x)
+    assert len(E[0]) == 6
+    np.testing.assert_allclose(np.sum(E, axis=1), puntuales.Ef(*x, Q), rtol=1e-10)
@@ -0,0 +1,98 @@
+"""Formato de los volúmenes en disco."""
+
+import numpy as np
+import pytest
+
+from frautnEM import puntuales
+from frautnEM import volumen
+from frautnEM.volumen import Volumen
+
+
+def cargas(N):
+    rng = np.random.default_rng(N)
+    return np.column_stack([rng.uniform(-1e-9, 1e-9, N), rng.uniform(-1, 1, (N, 3))])
+
+
+@pytest.mark.parametrize('N', [0, 3, 5000])
+def test_encabezado_fijo(tmp_path, N):
+    Q = cargas(N)
+    meta = {'tipo': 'prueba', 'w': 4}
+    Volumen.crear(tmp_path / 'a.vol', (4, 3, 2), (-1, -2, -3), (1, 2, 3), ('Ek', 'V'),
+                  np.float32, Q, meta)
+    vol = Volumen(tmp_path / 'a.vol')
+    assert vol.forma == (4, 3, 2)
+    assert vol.componentes == ('V', 'Ek')
+    assert vol.dtype == np.float32
+    np.testing.assert_array_equal(vol.lo, (-1, -2, -3))
+    np.testing.assert_array_equal(vol.Q.C, Q)
+    assert vol.meta == meta
+    assert vol._datos.offset % volumen._ALINEACION == 0
+    with open(tmp_path / 'a.vol', 'rb') as f:
+        f.seek(len(volumen.MAGIA))
+        campos = volumen._ENCABEZADO.unpack(f.read(volumen._ENCABEZADO.size))
+    # Las cargas empiezan justo después del encabezado, de tamaño fijo.
+    assert campos[12:14] == (len(volumen.MAGIA) + volumen._ENCABEZADO.size, N)
+
+
+def test_calcular_volumen(tmp_path):
+    Q = cargas(4)
+    vol = puntuales.calcularVolumen(tmp_path / 'b.vol', Q, calcV=True, dx=1, w=6,
+                                    memoria=2000)
+    x, y, z = np.meshgrid(*vol.ejes, indexing='ij')
+    V, Ei, Ej, Ek = puntuales.VEf(x, y, z, Q)
+    np.testing.assert_allclose(vol['V'], V, rtol=1e-12)
+    np.testing.assert_allclose(vol['Ej'], Ej, rtol=1e-12)
+
+
+def test_no_es_un_volumen(tmp_path):
+    (tmp_path / 'c.vol').write_bytes(b'otra cosa' * 20)
+    with pytest.raises(ValueError):
+        Volumen(tmp_path / 'c.vol')
+
+
+def test_requerir(tmp_path):
+    vol = Volumen.crear(tmp_path / 'd.vol', (2, 2, 2), (0, 0, 0), (1, 1, 1), ('V',))
+    vol.requerir('V')
+    with pytest.raises(ValueError, match='Ei, Ek'):
+        vol.requerir('Ei', 'V', 'Ek')
+    with pytest.raises(KeyError):
+        vol['Ei']
+
+
+@pytest.fixture
+def figura():
+    pytest.importorskip('matplotlib')
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    return Figure()
+
+
+def test_volumen_solo_campo(tmp_path, figura):
+    Q = cargas(3)
+    vol = puntuales.calcularVolumen(tmp_path / 'e.vol', Q, dx=1, w=5)
+    assert vol.componentes == ('Ei', 'Ej', 'Ek')
+    puntuales.plotEfvector3d(vol, figura=figura, mostrar=False)
+    assert figura.axes
+    F = vol.corte('z', 0)
+    assert F.V is None and F.Ei.shape == (5, 5)
+    with pytest.raises(ValueError, match='calcV=True'):
+        puntuales.equipotencialesPuntuales(F, figura=figura, mostrar=False)
+
+
+def test_volumen_solo_potencial(tmp_path, figura):
+    Q = cargas(3)
+    vol = puntuales.calcularVolumen(tmp_path / 'f.vol', Q, calcV=True, calcE=False, dx=1, w=5)
+    assert vol.componentes == ('V',)
+    with pytest.raises(ValueError, match='Ei, Ej, Ek'):
+        puntuales.plotEfvector3d(vol, figura=figura, mostrar=False)
+    with pytest.raises(ValueError, match='Ei, Ej, Ek'):
+        puntuales.plotEfvector3d(vol, cortes=[('z', 0)], muestreo='modulo', flechas=10,
+                                 figura=figura, mostrar=False)
+    F = vol.corte('x', 0.3)
+    assert F.Ei is None
+    puntuales.equipotencialesPuntuales(F, figura=figura, mostrar=False)
+    figura.clear()
+    # Con EF el campo del plano se calcula a partir de las cargas.
+    puntuales.equipotencialesPuntuales(F, EF=True, figura=figura, mostrar=False)
+    assert figura.axes